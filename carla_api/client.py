@@ -0,0 +1,99 @@
+import time
+import argparse
+from sensor import CameraStream, spawn_camera
+from vehicle import spawn_ego_vehicle
+from utils import LatencyStats, import_carla, print_latency
+
+# Client kamera real-time: sensor.listen -> ring buffer (sensor.py) -> queue drop-oldest -> detector.
+# Detector berjalan di thread utama dan selalu mengambil frame terbaru; jika detector lebih lambat
+# dari sensor, frame lama dibuang sehingga tick simulator tidak pernah tertahan.
+HOST = 'localhost'
+PORT = 2000
+
+def make_detector(model_path=None, imgsz=640, device='cpu', detect_ms=0.0):
+    """Fungsi detect(bgr) -> jumlah deteksi. Tanpa model: simulasi inference selama detect_ms."""
+    if model_path is None:
+        def detect(bgr):
+            if detect_ms > 0:
+                time.sleep(detect_ms / 1000)
+            return 0
+        return detect
+
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    def detect(bgr):
+        return len(model.predict(bgr, imgsz=imgsz, device=device, verbose=False)[0].boxes)
+    return detect
+
+def run_detector(stream, detect, duration):
+    """Konsumsi frame selama duration detik. Return (latency end-to-end, inference, processed)."""
+    end_to_end, inference = LatencyStats(), LatencyStats()
+    processed = 0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        frame = stream.get(timeout=1.0)
+        if frame is None:
+            continue
+        with frame:
+            start = time.perf_counter()
+            detect(frame.bgr)
+            done = time.perf_counter()
+        inference.add(done - start)
+        end_to_end.add(done - frame.received)
+        processed += 1
+    return end_to_end, inference, processed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stream kamera CARLA ke detector dengan queue drop-oldest.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--fake', action='store_true', help="Pakai fake_carla (frame sintetis, tanpa simulator).")
+    parser.add_argument('--width', type=int, default=1600)
+    parser.add_argument('--height', type=int, default=900)
+    parser.add_argument('--fps', type=float, default=20.0, help="Laju sensor (sensor_tick = 1/fps).")
+    parser.add_argument('--duration', type=float, default=10.0, help="Lama streaming (detik).")
+    parser.add_argument('--queue-size', type=int, default=1, help="1 = detector selalu memproses frame terbaru.")
+    parser.add_argument('--model', default=None, help="Model YOLO; kosong = detector simulasi (--detect-ms).")
+    parser.add_argument('--detect-ms', type=float, default=30.0, help="Waktu inference simulasi tanpa --model.")
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--no-vehicle', action='store_true', help="Kamera statis, tanpa kendaraan ego.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    carla = import_carla(args.fake)
+    client = carla.Client(args.host, args.port)
+    client.set_timeout(10.0)
+    world = client.get_world()
+    detect = make_detector(args.model, args.imgsz, args.device, args.detect_ms)
+
+    actors = []
+    stream = None
+    try:
+        vehicle = None if args.no_vehicle else spawn_ego_vehicle(world)
+        if vehicle is not None:
+            actors.append(vehicle)
+        camera = spawn_camera(world, carla, args.width, args.height, args.fps, attach_to=vehicle)
+        actors.append(camera)
+        stream = CameraStream(camera, args.width, args.height, args.queue_size).start()
+        print(f"=== Streaming {args.width}x{args.height} @ {args.fps} fps selama {args.duration} detik "
+              f"({'fake' if args.fake else f'{args.host}:{args.port}'}) ===")
+        end_to_end, inference, processed = run_detector(stream, detect, args.duration)
+    finally:
+        # Hentikan listener & ring buffer sebelum kamera dihapus, juga saat run_detector gagal
+        if stream is not None:
+            stream.stop()
+        for actor in reversed(actors):
+            actor.destroy()
+
+    stats = stream.stats()
+    print(f"\nFrame diterima : {stats['received']}")
+    print(f"Frame diproses : {processed} ({processed / args.duration:.1f} fps)")
+    print(f"Frame dibuang  : {stats['dropped']} (queue penuh), {stats['no_slot']} (slot ring habis)")
+    print_latency("Latency sensor -> deteksi", end_to_end)
+    print_latency("Inference", inference)
+
+if __name__ == "__main__":
+    main()
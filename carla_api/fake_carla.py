@@ -0,0 +1,347 @@
+import time
+import fnmatch
+import threading
+import numpy as np
+
+# Pengganti minimal API CARLA 0.9.x untuk uji offline (tanpa simulator): Client -> World ->
+# blueprint -> spawn_actor, sensor (kamera, LiDAR, radar) yang memanggil callback listen() dengan
+# data sintetis, mode asinkron (thread per sensor pada laju sensor_tick) maupun sinkron (world.tick()).
+# Hanya bagian API yang dipakai carla_api yang ditiru.
+NUM_NPC_VEHICLES = 8
+NUM_NPC_WALKERS = 4
+
+class Vector3D:
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = x, y, z
+
+Location = Vector3D
+
+class Rotation:
+    def __init__(self, pitch=0.0, yaw=0.0, roll=0.0):
+        self.pitch, self.yaw, self.roll = pitch, yaw, roll
+
+class Transform:
+    def __init__(self, location=None, rotation=None):
+        self.location = location or Location()
+        self.rotation = rotation or Rotation()
+
+def compose(parent, child):
+    """Transform dunia dari child relatif terhadap parent (pendekatan: rotasi parent diabaikan kecuali yaw)."""
+    yaw = np.radians(parent.rotation.yaw)
+    c, s = np.cos(yaw), np.sin(yaw)
+    loc = child.location
+    return Transform(
+        Location(parent.location.x + c * loc.x - s * loc.y, parent.location.y + s * loc.x + c * loc.y,
+                 parent.location.z + loc.z),
+        Rotation(parent.rotation.pitch + child.rotation.pitch, parent.rotation.yaw + child.rotation.yaw,
+                 parent.rotation.roll + child.rotation.roll))
+
+class BoundingBox:
+    def __init__(self, location, extent):
+        self.location = location
+        self.extent = extent
+
+class WorldSettings:
+    def __init__(self, synchronous_mode=False, fixed_delta_seconds=None, no_rendering_mode=False):
+        self.synchronous_mode = synchronous_mode
+        self.fixed_delta_seconds = fixed_delta_seconds
+        self.no_rendering_mode = no_rendering_mode
+
+class SensorData:
+    def __init__(self, frame, timestamp, transform, raw_data):
+        self.frame = frame
+        self.timestamp = timestamp
+        self.transform = transform
+        self.raw_data = raw_data
+
+class Image(SensorData):
+    """Seperti carla.Image: raw_data = buffer BGRA (H * W * 4 byte)."""
+
+    def __init__(self, frame, timestamp, width, height, raw_data, transform=None, fov=90.0):
+        super().__init__(frame, timestamp, transform or Transform(), raw_data)
+        self.width = width
+        self.height = height
+        self.fov = fov
+
+class LidarMeasurement(SensorData):
+    """raw_data = float32 (x, y, z, intensity) per titik."""
+
+    def __init__(self, frame, timestamp, transform, raw_data, channels):
+        super().__init__(frame, timestamp, transform, raw_data)
+        self.channels = channels
+
+    def __len__(self):
+        return len(self.raw_data) // 16
+
+class RadarMeasurement(SensorData):
+    """raw_data = float32 (velocity, azimuth, altitude, depth) per deteksi."""
+
+    def __len__(self):
+        return len(self.raw_data) // 16
+
+class ActorBlueprint:
+    def __init__(self, blueprint_id, attributes=None):
+        self.id = blueprint_id
+        self.attributes = dict(attributes or {})
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = str(value)
+
+    def has_attribute(self, key):
+        return key in self.attributes
+
+class BlueprintLibrary:
+    DEFAULTS = {
+        'sensor.camera.rgb': {'image_size_x': '800', 'image_size_y': '600', 'fov': '90', 'sensor_tick': '0.0'},
+        'sensor.camera.depth': {'image_size_x': '800', 'image_size_y': '600', 'fov': '90', 'sensor_tick': '0.0'},
+        'sensor.lidar.ray_cast': {'channels': '32', 'range': '10.0', 'points_per_second': '56000',
+                                  'rotation_frequency': '10.0', 'sensor_tick': '0.0'},
+        'sensor.other.radar': {'horizontal_fov': '30', 'vertical_fov': '30', 'range': '100',
+                               'points_per_second': '1500', 'sensor_tick': '0.0'},
+    }
+
+    def find(self, blueprint_id):
+        return ActorBlueprint(blueprint_id, self.DEFAULTS.get(blueprint_id, {}))
+
+    def filter(self, pattern):
+        return [ActorBlueprint(pattern.replace('*', 'fake'))]
+
+class ActorList(list):
+    def filter(self, pattern):
+        return ActorList(a for a in self if fnmatch.fnmatch(a.type_id, pattern))
+
+class Actor:
+    _next_id = 1
+
+    def __init__(self, world, blueprint, transform, parent=None):
+        self.id = Actor._next_id
+        Actor._next_id += 1
+        self.world = world
+        self.type_id = blueprint.id
+        self.attributes = dict(blueprint.attributes)
+        self.transform = transform
+        self.parent = parent
+        self.is_alive = True
+        self.bounding_box = BoundingBox(Location(0.0, 0.0, 0.75), Vector3D(2.3, 1.0, 0.75))
+        self.speed = 0.0
+
+    def get_transform(self):
+        if self.parent is not None:
+            return compose(self.parent.get_transform(), self.transform)
+        return self.transform
+
+    def set_autopilot(self, enabled=True, *args):
+        self.autopilot = enabled
+        self.speed = 8.0 if enabled else 0.0
+
+    def destroy(self):
+        self.is_alive = False
+        if self in self.world.actors:
+            self.world.actors.remove(self)
+        return True
+
+class Sensor(Actor):
+    """
+    Sensor palsu. Mode asinkron: thread memanggil callback pada laju sensor_tick.
+    Mode sinkron: world.tick() memanggil emit() untuk setiap sensor yang sedang listen.
+    """
+
+    def __init__(self, world, blueprint, transform, parent=None):
+        super().__init__(world, blueprint, transform, parent)
+        tick = float(self.attributes.get('sensor_tick', 0.0))
+        self.interval = tick if tick > 0 else 1.0 / 20
+        self._callback = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.is_listening = False
+        self.frames_emitted = 0
+
+    def measurement(self, frame, timestamp):
+        raise NotImplementedError
+
+    def emit(self, frame, timestamp):
+        callback = self._callback
+        if callback is not None:
+            callback(self.measurement(frame, timestamp))
+            self.frames_emitted += 1
+
+    def listen(self, callback):
+        self._callback = callback
+        self._stop.clear()
+        self.is_listening = True
+        if not self.world.settings.synchronous_mode:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        next_time = time.perf_counter()
+        while not self._stop.is_set():
+            self.emit(self.world.next_frame(), time.perf_counter())
+            next_time += self.interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_time = time.perf_counter()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._callback = None
+        self.is_listening = False
+
+    def destroy(self):
+        self.stop()
+        return super().destroy()
+
+class CameraSensor(Sensor):
+    def __init__(self, world, blueprint, transform, parent=None):
+        super().__init__(world, blueprint, transform, parent)
+        self.width = int(self.attributes.get('image_size_x', 800))
+        self.height = int(self.attributes.get('image_size_y', 600))
+        self.fov = float(self.attributes.get('fov', 90))
+        # Beberapa frame sintetis dibuat sekali lalu dipakai bergantian (agar emitter sendiri tidak jadi bottleneck)
+        base = np.zeros((self.height, self.width, 4), dtype=np.uint8)
+        base[..., 0] = np.linspace(0, 255, self.width, dtype=np.uint8)[None, :]
+        base[..., 1] = np.linspace(0, 255, self.height, dtype=np.uint8)[:, None]
+        base[..., 3] = 255
+        self._patterns = [np.roll(base, shift * 16, axis=1).copy() for shift in range(4)]
+
+    def measurement(self, frame, timestamp):
+        pattern = self._patterns[frame % len(self._patterns)]
+        return Image(frame, timestamp, self.width, self.height, memoryview(pattern).cast('B'),
+                     self.get_transform(), self.fov)
+
+class DepthSensor(CameraSensor):
+    """Depth palsu: semua pixel pada jarak maksimum (1000 m), jadi tidak ada objek yang teroklusi."""
+
+    def __init__(self, world, blueprint, transform, parent=None):
+        super().__init__(world, blueprint, transform, parent)
+        self._patterns = [np.full((self.height, self.width, 4), 255, dtype=np.uint8)]
+
+class LidarSensor(Sensor):
+    def __init__(self, world, blueprint, transform, parent=None):
+        super().__init__(world, blueprint, transform, parent)
+        self.channels = int(self.attributes.get('channels', 32))
+        max_range = float(self.attributes.get('range', 10.0))
+        points = int(float(self.attributes.get('points_per_second', 56000)) /
+                     float(self.attributes.get('rotation_frequency', 10.0)))
+        rng = np.random.default_rng(self.id)
+        self._clouds = []
+        for _ in range(2):
+            azimuth = rng.uniform(-np.pi, np.pi, points)
+            elevation = rng.uniform(np.radians(-30), np.radians(10), points)
+            dist = rng.uniform(2.0, max_range, points)
+            cloud = np.stack([dist * np.cos(elevation) * np.cos(azimuth), dist * np.cos(elevation) * np.sin(azimuth),
+                              dist * np.sin(elevation), rng.uniform(0, 1, points)], axis=1).astype(np.float32)
+            self._clouds.append(cloud)
+
+    def measurement(self, frame, timestamp):
+        cloud = self._clouds[frame % len(self._clouds)]
+        return LidarMeasurement(frame, timestamp, self.get_transform(), memoryview(cloud).cast('B'), self.channels)
+
+class RadarSensor(Sensor):
+    def __init__(self, world, blueprint, transform, parent=None):
+        super().__init__(world, blueprint, transform, parent)
+        points = max(1, int(float(self.attributes.get('points_per_second', 1500)) * self.world.delta_seconds()))
+        rng = np.random.default_rng(self.id)
+        hfov, vfov = np.radians(float(self.attributes.get('horizontal_fov', 30))), np.radians(float(self.attributes.get('vertical_fov', 30)))
+        self._detections = np.stack([rng.uniform(-10, 10, points), rng.uniform(-hfov / 2, hfov / 2, points),
+                                     rng.uniform(-vfov / 2, vfov / 2, points),
+                                     rng.uniform(1, float(self.attributes.get('range', 100)), points)],
+                                    axis=1).astype(np.float32)
+
+    def measurement(self, frame, timestamp):
+        return RadarMeasurement(frame, timestamp, self.get_transform(), memoryview(self._detections).cast('B'))
+
+SENSOR_CLASSES = {
+    'sensor.camera.rgb': CameraSensor,
+    'sensor.camera.depth': DepthSensor,
+    'sensor.lidar.ray_cast': LidarSensor,
+    'sensor.other.radar': RadarSensor,
+}
+
+class World:
+    def __init__(self, npc_vehicles=NUM_NPC_VEHICLES, npc_walkers=NUM_NPC_WALKERS):
+        self._frame = 0
+        self._elapsed = 0.0
+        self._lock = threading.Lock()
+        self.settings = WorldSettings()
+        self.actors = ActorList()
+        # NPC di depan spawn point agar ada objek untuk anotasi
+        for i in range(npc_vehicles):
+            actor = self.spawn_actor(ActorBlueprint('vehicle.fake.npc'), Transform(Location(12.0 + 6.0 * i, -3.5 + 3.5 * (i % 3), 0.5)))
+            actor.set_autopilot(True)
+        for i in range(npc_walkers):
+            walker = self.spawn_actor(ActorBlueprint('walker.pedestrian.0001'), Transform(Location(8.0 + 5.0 * i, 6.0, 0.9)))
+            walker.bounding_box = BoundingBox(Location(0.0, 0.0, 0.0), Vector3D(0.3, 0.3, 0.9))
+
+    def next_frame(self):
+        with self._lock:
+            self._frame += 1
+            return self._frame
+
+    def delta_seconds(self):
+        return self.settings.fixed_delta_seconds or 0.05
+
+    def get_settings(self):
+        s = self.settings
+        return WorldSettings(s.synchronous_mode, s.fixed_delta_seconds, s.no_rendering_mode)
+
+    def apply_settings(self, settings):
+        self.settings = settings
+        return self._frame
+
+    def tick(self, seconds=10.0):
+        frame = self.next_frame()
+        dt = self.delta_seconds()
+        self._elapsed += dt
+        for actor in list(self.actors):
+            if actor.speed and actor.parent is None:
+                actor.transform.location.x += actor.speed * dt
+        for actor in list(self.actors):
+            if isinstance(actor, Sensor) and actor.is_listening:
+                actor.emit(frame, self._elapsed)
+        return frame
+
+    def get_actors(self):
+        return ActorList(self.actors)
+
+    def get_blueprint_library(self):
+        return BlueprintLibrary()
+
+    def get_map(self):
+        return self
+
+    def get_spawn_points(self):
+        return [Transform(Location(float(i), 0.0, 0.5)) for i in range(10)]
+
+    def spawn_actor(self, blueprint, transform, attach_to=None):
+        cls = SENSOR_CLASSES.get(blueprint.id, Actor)
+        actor = cls(self, blueprint, transform, attach_to)
+        self.actors.append(actor)
+        return actor
+
+    def try_spawn_actor(self, blueprint, transform, attach_to=None):
+        return self.spawn_actor(blueprint, transform, attach_to)
+
+class TrafficManager:
+    def set_synchronous_mode(self, enabled):
+        self.synchronous_mode = enabled
+
+class Client:
+    def __init__(self, host='localhost', port=2000):
+        self.host, self.port = host, port
+        self._world = World()
+        self._traffic_manager = TrafficManager()
+
+    def set_timeout(self, seconds):
+        self.timeout = seconds
+
+    def get_world(self):
+        return self._world
+
+    def get_trafficmanager(self, port=8000):
+        return self._traffic_manager
@@ -0,0 +1,367 @@
+import os
+import json
+import time
+import sys
+import queue
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+from vehicle import spawn_ego_vehicle
+from utils import LatencyStats, import_carla, print_latency
+
+# Recorder multi-sensor CARLA dalam mode sinkron. Setiap world.tick() menghasilkan satu frame id;
+# data kamera/LiDAR/radar dengan frame id yang sama diambil dari queue per sensor, lalu diserahkan ke
+# pool writer di background (encode JPEG / PLY / NPY) sehingga loop tick tidak menunggu disk.
+# Satu baris manifest.jsonl per frame: file per sensor, transform sensor & ego, dan box aktor.
+# --label menjalankan auto-label YOLO (carla_to_yolo.py) online di pool writer setelah frame tertulis.
+RAW_DIR = '../data/raw/carla'
+CAMERA_SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts', 'preprocessing', 'camera')
+FPS = 20.0
+JPEG_QUALITY = 95
+MAX_PENDING = 32
+
+# nama -> (blueprint, atribut, posisi relatif kendaraan (x, y, z, pitch, yaw, roll))
+SENSORS = {
+    'camera': ('sensor.camera.rgb', {'image_size_x': 1600, 'image_size_y': 900, 'fov': 70},
+               (1.5, 0.0, 1.6, 0.0, 0.0, 0.0)),
+    # Depth dengan pose & resolusi sama dengan kamera, untuk culling oklusi saat auto-label
+    'depth': ('sensor.camera.depth', {'image_size_x': 1600, 'image_size_y': 900, 'fov': 70},
+              (1.5, 0.0, 1.6, 0.0, 0.0, 0.0)),
+    'lidar': ('sensor.lidar.ray_cast', {'channels': 32, 'range': 100, 'points_per_second': 700000,
+                                        'upper_fov': 10, 'lower_fov': -30},
+              (0.0, 0.0, 1.8, 0.0, 0.0, 0.0)),
+    'radar': ('sensor.other.radar', {'horizontal_fov': 30, 'vertical_fov': 30, 'range': 100,
+                                     'points_per_second': 1500},
+              (2.0, 0.0, 1.0, 0.0, 0.0, 0.0)),
+}
+DEFAULT_SENSORS = ('camera', 'lidar', 'radar')
+ACTOR_FILTERS = ('vehicle.*', 'walker.*')
+
+def transform_to_list(transform):
+    loc, rot = transform.location, transform.rotation
+    return [round(v, 4) for v in (loc.x, loc.y, loc.z, rot.pitch, rot.yaw, rot.roll)]
+
+def actor_boxes(world):
+    """Box 3D semua kendaraan & pejalan kaki: transform dunia, extent (setengah ukuran), pusat box relatif aktor."""
+    actors = []
+    all_actors = world.get_actors()
+    for pattern in ACTOR_FILTERS:
+        for actor in all_actors.filter(pattern):
+            bb = actor.bounding_box
+            actors.append({
+                'id': actor.id,
+                'type_id': actor.type_id,
+                'base_type': actor.attributes.get('base_type', ''),
+                'transform': transform_to_list(actor.get_transform()),
+                'extent': [round(bb.extent.x, 4), round(bb.extent.y, 4), round(bb.extent.z, 4)],
+                'box_location': [round(bb.location.x, 4), round(bb.location.y, 4), round(bb.location.z, 4)],
+            })
+    return actors
+
+def write_camera(path, image):
+    bgra = np.frombuffer(image.raw_data, dtype=np.uint8).reshape(image.height, image.width, 4)
+    ok, buf = cv2.imencode('.jpg', bgra[:, :, :3], [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        raise IOError(f"Gagal encode JPEG: {path}")
+    buf.tofile(path)
+    return {'width': image.width, 'height': image.height, 'fov': image.fov}
+
+def depth_to_meters(image):
+    """Decode depth CARLA (R + G*256 + B*256^2) / (256^3 - 1) * 1000 m. Output (H, W) float32."""
+    bgra = np.frombuffer(image.raw_data, dtype=np.uint8).reshape(image.height, image.width, 4).astype(np.float32)
+    return (bgra[:, :, 2] + bgra[:, :, 1] * 256.0 + bgra[:, :, 0] * 65536.0) * (1000.0 / 16777215.0)
+
+def write_depth(path, image):
+    # float16 (meter): presisi ~5 cm pada 100 m, cukup untuk uji oklusi
+    np.save(path, depth_to_meters(image).astype(np.float16))
+    return {'width': image.width, 'height': image.height}
+
+def write_lidar(path, measurement):
+    points = np.frombuffer(measurement.raw_data, dtype=np.float32).reshape(-1, 4)
+    header = ("ply\nformat binary_little_endian 1.0\n"
+              f"element vertex {len(points)}\n"
+              "property float x\nproperty float y\nproperty float z\nproperty float intensity\n"
+              "end_header\n")
+    with open(path, 'wb') as f:
+        f.write(header.encode('ascii'))
+        f.write(points.astype('<f4', copy=False).tobytes())
+    return {'points': len(points)}
+
+def write_radar(path, measurement):
+    # Kolom: velocity, azimuth, altitude, depth
+    detections = np.frombuffer(measurement.raw_data, dtype=np.float32).reshape(-1, 4)
+    np.save(path, detections)
+    return {'points': len(detections)}
+
+WRITERS = {
+    'camera': (write_camera, '.jpg'),
+    'depth': (write_depth, '.npy'),
+    'lidar': (write_lidar, '.ply'),
+    'radar': (write_radar, '.npy'),
+}
+
+class FrameWriter:
+    """
+    Pool thread untuk encode + tulis data sensor (cv2/numpy melepas GIL). submit() hanya menunggu
+    jika antrean melebihi max_pending frame, agar memori tetap terbatas saat disk lebih lambat dari tick.
+    hooks: fungsi hook(record, out_dir) yang dipanggil di thread writer setelah semua file frame tertulis.
+    """
+
+    def __init__(self, out_dir, workers=4, max_pending=MAX_PENDING, hooks=()):
+        self.out_dir = out_dir
+        for name in WRITERS:
+            os.makedirs(os.path.join(out_dir, name), exist_ok=True)
+        self.pool = ThreadPoolExecutor(workers)
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.manifest = open(os.path.join(out_dir, 'manifest.jsonl'), 'a')
+        self.lock = threading.Lock()
+        self.stall_s = 0.0
+        self.frames = 0
+        self.bytes = 0
+        self.errors = []
+        self.hooks = list(hooks)
+        self.hook_time = LatencyStats()
+
+    def submit(self, record, measurements):
+        if not self.slots.acquire(blocking=False):
+            start = time.perf_counter()
+            self.slots.acquire()
+            self.stall_s += time.perf_counter() - start
+        future = self.pool.submit(self._write, record, measurements)
+        future.add_done_callback(lambda _: self.slots.release())
+
+    def _write(self, record, measurements):
+        try:
+            size = 0
+            for name, data in measurements.items():
+                write, suffix = WRITERS[name]
+                rel = os.path.join(name, f"{record['frame']:08d}{suffix}")
+                path = os.path.join(self.out_dir, rel)
+                info = write(path, data)
+                size += os.path.getsize(path)
+                record['sensors'][name].update(file=rel.replace(os.sep, '/'), **info)
+            with self.lock:
+                self.manifest.write(json.dumps(record) + '\n')
+                self.frames += 1
+                self.bytes += size
+            if self.hooks:
+                start = time.perf_counter()
+                for hook in self.hooks:
+                    hook(record, self.out_dir)
+                self.hook_time.add(time.perf_counter() - start)
+        except Exception as e:
+            with self.lock:
+                self.errors.append(f"frame {record['frame']}: {e}")
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.manifest.close()
+
+def wait_for_frame(sensor_queue, frame, timeout):
+    """Data sensor untuk frame ini; data dari frame sebelumnya dibuang. None jika tidak datang."""
+    deadline = time.perf_counter() + timeout
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return None
+        try:
+            data = sensor_queue.get(timeout=remaining)
+        except queue.Empty:
+            return None
+        if data.frame == frame:
+            return data
+        if data.frame > frame:
+            return None
+
+class SyncRecorder:
+    """
+    Context manager: aktifkan mode sinkron (fixed_delta = 1/fps), spawn sensor pada kendaraan,
+    dan catat satu frame per tick(). Setting dunia dikembalikan & aktor dihapus saat keluar.
+    writer=None -> data tidak ditulis (untuk mengukur laju tick murni).
+    """
+
+    def __init__(self, client, world, carla, writer=None, sensors=DEFAULT_SENSORS, fps=FPS, vehicle=None,
+                 record_actors=True, timeout=2.0):
+        self.client = client
+        self.world = world
+        self.carla = carla
+        self.writer = writer
+        self.sensor_names = list(sensors)
+        self.fps = fps
+        self.vehicle = vehicle
+        self.record_actors = record_actors
+        self.timeout = timeout
+        self.sensors = {}
+        self.queues = {}
+        self.missing = 0
+        self.tick_time = LatencyStats()
+
+    def spawn_sensor(self, name):
+        blueprint_id, attributes, pose = SENSORS[name]
+        blueprint = self.world.get_blueprint_library().find(blueprint_id)
+        for key, value in attributes.items():
+            blueprint.set_attribute(key, str(value))
+        if name == 'lidar':
+            # Satu putaran penuh per tick
+            blueprint.set_attribute('rotation_frequency', str(self.fps))
+        blueprint.set_attribute('sensor_tick', '0.0')
+        x, y, z, pitch, yaw, roll = pose
+        transform = self.carla.Transform(self.carla.Location(x=x, y=y, z=z),
+                                         self.carla.Rotation(pitch=pitch, yaw=yaw, roll=roll))
+        return self.world.spawn_actor(blueprint, transform, attach_to=self.vehicle)
+
+    def __enter__(self):
+        self.original_settings = self.world.get_settings()
+        settings = self.world.get_settings()
+        settings.synchronous_mode = True
+        settings.fixed_delta_seconds = 1.0 / self.fps
+        self.world.apply_settings(settings)
+        try:
+            self.client.get_trafficmanager().set_synchronous_mode(True)
+            for name in self.sensor_names:
+                self.queues[name] = queue.Queue()
+                self.sensors[name] = self.spawn_sensor(name)
+                self.sensors[name].listen(self.queues[name].put)
+        except BaseException:
+            # __exit__ tidak dipanggil jika __enter__ gagal: tanpa ini server tertinggal di mode
+            # sinkron (membeku menunggu tick) dan sensor yang sudah di-spawn bocor
+            self.close()
+            raise
+        return self
+
+    def tick(self):
+        """Satu langkah simulasi. Return record manifest frame ini."""
+        start = time.perf_counter()
+        frame = self.world.tick()
+        measurements = {}
+        for name in self.sensor_names:
+            data = wait_for_frame(self.queues[name], frame, self.timeout)
+            if data is None:
+                self.missing += 1
+            else:
+                measurements[name] = data
+        record = {
+            'frame': frame,
+            'timestamp': next(iter(measurements.values())).timestamp if measurements else None,
+            'sensors': {name: {'transform': transform_to_list(data.transform)} for name, data in measurements.items()},
+        }
+        if self.vehicle is not None:
+            record['ego_id'] = self.vehicle.id
+            record['ego'] = transform_to_list(self.vehicle.get_transform())
+        if self.record_actors:
+            record['actors'] = actor_boxes(self.world)
+        if self.writer is not None:
+            self.writer.submit(record, measurements)
+        self.tick_time.add(time.perf_counter() - start)
+        return record
+
+    def close(self):
+        """Hapus sensor lalu kembalikan mode asinkron & setting dunia (setting tetap dikembalikan walau hapus gagal)."""
+        try:
+            for sensor in self.sensors.values():
+                sensor.stop()
+                sensor.destroy()
+        finally:
+            self.sensors = {}
+            self.client.get_trafficmanager().set_synchronous_mode(False)
+            self.world.apply_settings(self.original_settings)
+
+    def __exit__(self, *exc):
+        self.close()
+
+def make_labeler(out_dir):
+    """Hook auto-label online (carla_to_yolo.CarlaLabeler) untuk sesi di out_dir."""
+    sys.path.insert(0, CAMERA_SCRIPTS)
+    from carla_to_yolo import CarlaLabeler
+
+    return CarlaLabeler(os.path.basename(os.path.normpath(out_dir)))
+
+def record(client, world, carla, out_dir, ticks, sensors=DEFAULT_SENSORS, fps=FPS, workers=4,
+           max_pending=MAX_PENDING, write=True, record_actors=True, label=False):
+    """Rekam sejumlah tick. Return statistik (ticks/detik, stall writer, byte tertulis, ...)."""
+    if label:
+        sensors = list(sensors) + [name for name in ('camera', 'depth') if name not in sensors]
+        record_actors = True
+    vehicle = spawn_ego_vehicle(world)
+    hooks = [make_labeler(out_dir)] if label and write else []
+    writer = FrameWriter(out_dir, workers, max_pending, hooks) if write else None
+    try:
+        with SyncRecorder(client, world, carla, writer, sensors, fps, vehicle, record_actors) as recorder:
+            start = time.perf_counter()
+            for _ in range(ticks):
+                recorder.tick()
+            loop_s = time.perf_counter() - start
+            if writer is not None:
+                writer.close()
+            total_s = time.perf_counter() - start
+    finally:
+        if writer is not None:
+            writer.close()
+        vehicle.destroy()
+    stats = {
+        'ticks': ticks,
+        'ticks_per_sec': ticks / loop_s if loop_s > 0 else 0.0,
+        'ticks_per_sec_incl_flush': ticks / total_s if total_s > 0 else 0.0,
+        'missing': recorder.missing,
+        'tick_time': recorder.tick_time,
+    }
+    if writer is not None:
+        stats.update(frames_written=writer.frames, bytes=writer.bytes, stall_s=writer.stall_s, errors=writer.errors,
+                     hook_time=writer.hook_time)
+    return stats
+
+def print_stats(title, stats):
+    print(f"\n{title}")
+    print(f"- Tick          : {stats['ticks']} ({stats['ticks_per_sec']:.1f} tick/detik sustained, "
+          f"{stats['ticks_per_sec_incl_flush']:.1f} termasuk flush writer)")
+    print_latency("Durasi loop per tick", stats['tick_time'])
+    if stats['missing']:
+        print(f"- Data sensor hilang: {stats['missing']}")
+    if 'frames_written' in stats:
+        print(f"- Frame tertulis: {stats['frames_written']} ({stats['bytes'] / 1e6:.1f} MB)")
+        print(f"- Tick menunggu writer: {stats['stall_s']:.2f} detik")
+        if len(stats['hook_time']):
+            print_latency("Auto-label per frame", stats['hook_time'])
+        for error in stats['errors'][:5]:
+            print(f"  ! {error}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rekam kamera/LiDAR/radar CARLA (mode sinkron) ke data/raw/carla.")
+    parser.add_argument('command', choices=('record', 'bench'),
+                        help="record: rekam sesi; bench: bandingkan tick/detik tanpa dan dengan writer.")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=2000)
+    parser.add_argument('--fake', action='store_true', help="Pakai fake_carla (tanpa simulator).")
+    parser.add_argument('--out-dir', default=None, help="Default: data/raw/carla/<session>.")
+    parser.add_argument('--session', default=None, help="Nama sesi (default: timestamp).")
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--fps', type=float, default=FPS)
+    parser.add_argument('--sensors', nargs='+', choices=list(SENSORS), default=list(DEFAULT_SENSORS))
+    parser.add_argument('--workers', type=int, default=4, help="Thread writer.")
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING, help="Frame maksimum di antrean writer.")
+    parser.add_argument('--no-actors', action='store_true', help="Jangan simpan box aktor di manifest.")
+    parser.add_argument('--label', action='store_true',
+                        help="Auto-label YOLO online ke data/processed/carla/camera (menambah sensor depth).")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    carla = import_carla(args.fake)
+    client = carla.Client(args.host, args.port)
+    client.set_timeout(10.0)
+    world = client.get_world()
+    session = args.session or time.strftime('%Y%m%d_%H%M%S')
+    out_dir = args.out_dir or os.path.join(RAW_DIR, session)
+    options = dict(sensors=args.sensors, fps=args.fps, workers=args.workers, max_pending=args.max_pending,
+                   record_actors=not args.no_actors, label=args.label)
+    print(f"=== {args.command}: {args.ticks} tick @ {args.fps} fps, sensor {', '.join(args.sensors)} ===")
+
+    if args.command == 'bench':
+        print_stats("Tanpa writer (laju tick murni):", record(client, world, carla, out_dir, args.ticks, write=False, **options))
+    stats = record(client, world, carla, out_dir, args.ticks, **options)
+    print_stats(f"Dengan writer -> {out_dir}:", stats)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import time
+import threading
+from collections import deque
+import numpy as np
+
+# Ingest kamera CARLA: callback sensor.listen hanya menyalin buffer BGRA ke slot ring buffer yang
+# sudah dialokasikan lalu memasukkan Frame (view NumPy ke slot, tanpa copy) ke queue drop-oldest.
+# Callback tidak pernah menunggu detector, jadi inference yang lambat tidak menahan tick simulator;
+# frame lama dibuang dan detector selalu mengambil frame terbaru.
+
+class FrameRingBuffer:
+    """
+    Slot (H, W, 4) uint8 yang dialokasikan sekali. Slot dipinjam penulis (acquire), dipegang
+    selama Frame ada di queue/diproses, lalu dikembalikan (release) sehingga tidak ditimpa
+    saat masih dibaca.
+    """
+
+    def __init__(self, slots, height, width, channels=4):
+        self.buffer = np.empty((slots, height, width, channels), dtype=np.uint8)
+        self._free = deque(range(slots))
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Index slot kosong, atau None jika semua slot sedang dipakai."""
+        with self._lock:
+            return self._free.popleft() if self._free else None
+
+    def release(self, slot):
+        with self._lock:
+            self._free.append(slot)
+
+    def view(self, slot):
+        return self.buffer[slot]
+
+class Frame:
+    """Satu frame di ring buffer. bgra/bgr = view tanpa copy; panggil release() setelah selesai."""
+
+    def __init__(self, ring, slot, frame_id, timestamp, received):
+        self.ring = ring
+        self.slot = slot
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.received = received
+        self._released = False
+
+    @property
+    def bgra(self):
+        return self.ring.view(self.slot)
+
+    @property
+    def bgr(self):
+        return self.ring.view(self.slot)[:, :, :3]
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.ring.release(self.slot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class DropOldestQueue:
+    """Queue terbatas: put() tidak pernah blok; jika penuh, item tertua dikeluarkan dan dikembalikan."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        with self._cond:
+            dropped = None
+            if len(self._items) >= self.maxsize:
+                dropped = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+            return dropped
+
+    def get(self, timeout=None):
+        """Item tertua yang masih ada; None jika timeout atau queue ditutup dan kosong."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self.closed, timeout):
+                return None
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def drain(self):
+        with self._cond:
+            items = list(self._items)
+            self._items.clear()
+            return items
+
+    def __len__(self):
+        return len(self._items)
+
+class CameraStream:
+    """
+    Hubungkan sensor kamera CARLA ke ring buffer + queue drop-oldest.
+    slots minimal queue_size + consumers + 1 agar penulis selalu dapat slot kosong.
+    """
+
+    def __init__(self, sensor, width, height, queue_size=1, consumers=1, slots=None):
+        self.sensor = sensor
+        self.width = width
+        self.height = height
+        self.ring = FrameRingBuffer(slots or queue_size + consumers + 1, height, width)
+        self.queue = DropOldestQueue(queue_size)
+        self.received = 0
+        self.no_slot = 0
+
+    def _on_image(self, image):
+        received = time.perf_counter()
+        self.received += 1
+        slot = self.ring.acquire()
+        if slot is None:
+            # Semua slot dipegang consumer: buang frame baru ini
+            self.no_slot += 1
+            return
+        src = np.frombuffer(image.raw_data, dtype=np.uint8).reshape(image.height, image.width, 4)
+        np.copyto(self.ring.view(slot), src)
+        dropped = self.queue.put(Frame(self.ring, slot, image.frame, image.timestamp, received))
+        if dropped is not None:
+            dropped.release()
+
+    def start(self):
+        self.sensor.listen(self._on_image)
+        return self
+
+    def get(self, timeout=None):
+        return self.queue.get(timeout)
+
+    def stop(self):
+        if getattr(self.sensor, 'is_listening', True):
+            self.sensor.stop()
+        self.queue.close()
+        for frame in self.queue.drain():
+            frame.release()
+
+    def stats(self):
+        return {'received': self.received, 'dropped': self.queue.dropped, 'no_slot': self.no_slot}
+
+def spawn_camera(world, carla, width=1600, height=900, fps=20.0, fov=70.0, attach_to=None, transform=None):
+    """Spawn sensor.camera.rgb (default: resolusi nuScenes, kamera depan di atap kendaraan)."""
+    blueprint = world.get_blueprint_library().find('sensor.camera.rgb')
+    blueprint.set_attribute('image_size_x', str(width))
+    blueprint.set_attribute('image_size_y', str(height))
+    blueprint.set_attribute('fov', str(fov))
+    blueprint.set_attribute('sensor_tick', str(1.0 / fps if fps > 0 else 0.0))
+    transform = transform or carla.Transform(carla.Location(x=1.5, z=1.6))
+    return world.spawn_actor(blueprint, transform, attach_to=attach_to)
@@ -0,0 +1,52 @@
+import time
+import threading
+import numpy as np
+
+def import_carla(fake=False):
+    """Modul carla asli, atau fake_carla (tanpa simulator) untuk uji offline."""
+    if fake:
+        import fake_carla
+        return fake_carla
+    try:
+        import carla
+    except ImportError:
+        raise SystemExit("Modul 'carla' tidak ditemukan. Pasang PythonAPI CARLA 0.9.x atau jalankan dengan --fake.")
+    return carla
+
+class LatencyStats:
+    """Kumpulkan latency (detik) thread-safe; ringkasan dalam ms (p50/p90/p99/max)."""
+
+    def __init__(self):
+        self._values = []
+        self._lock = threading.Lock()
+        self.start = time.perf_counter()
+
+    def add(self, seconds):
+        with self._lock:
+            self._values.append(seconds)
+
+    def __len__(self):
+        return len(self._values)
+
+    def summary(self):
+        with self._lock:
+            values = np.array(self._values) * 1e3
+        if not len(values):
+            return {'count': 0}
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        return {
+            'count': int(len(values)),
+            'mean_ms': round(float(values.mean()), 2),
+            'p50_ms': round(float(p50), 2),
+            'p90_ms': round(float(p90), 2),
+            'p99_ms': round(float(p99), 2),
+            'max_ms': round(float(values.max()), 2),
+        }
+
+def print_latency(title, stats):
+    s = stats.summary()
+    if not s['count']:
+        print(f"- {title}: tidak ada data")
+        return
+    print(f"- {title}: n={s['count']}, mean {s['mean_ms']} ms, p50 {s['p50_ms']} ms, "
+          f"p90 {s['p90_ms']} ms, p99 {s['p99_ms']} ms, max {s['max_ms']} ms")
@@ -0,0 +1,17 @@
+import random
+
+def spawn_ego_vehicle(world, blueprint_filter='vehicle.tesla.model3', autopilot=True, seed=0):
+    """Spawn kendaraan ego di spawn point acak (deterministik dengan seed)."""
+    blueprints = world.get_blueprint_library().filter(blueprint_filter)
+    if not blueprints:
+        raise ValueError(f"Blueprint kendaraan tidak ditemukan: {blueprint_filter}")
+    rng = random.Random(seed)
+    spawn_points = world.get_map().get_spawn_points()
+    rng.shuffle(spawn_points)
+    for transform in spawn_points:
+        vehicle = world.try_spawn_actor(blueprints[0], transform)
+        if vehicle is not None:
+            if autopilot:
+                vehicle.set_autopilot(True)
+            return vehicle
+    raise RuntimeError("Tidak ada spawn point kosong untuk kendaraan ego.")
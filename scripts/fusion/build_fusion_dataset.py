@@ -0,0 +1,373 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from collections import OrderedDict
+import numpy as np
+from tqdm import tqdm
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', 'preprocessing', 'camera'))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', 'preprocessing', 'lidar'))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', 'preprocessing', 'radar'))
+from nuscenes_to_yolo import (CAMERAS, CLASS_MAPPING, NUSC_VERSION, collect_sample_annotations,
+                              corners_to_yolo_bboxes, yolo_bboxes_valid_mask)
+from projection import camera_projection_matrix, project_corners, quaternion_to_matrix, transform_matrix
+from sample_store import SampleStore, SampleStoreWriter
+from preprocess_lidar import read_pcd_bin
+from preprocess_radar import RADARS, read_radar_pcd, valid_mask
+
+# Dataset fusi kamera + LiDAR + radar nuScenes, satu frame per gambar kamera:
+#   1. index semua sample_data kamera/LiDAR/radar per channel, diurutkan timestamp; sweep LiDAR & radar
+#      terdekat untuk tiap gambar dicari dengan np.searchsorted (hanya dalam scene yang sama, maks --max-dt)
+#   2. titik sweep diproyeksikan ke kamera dengan rantai kalibrasi yang sama dengan nuscenes_to_yolo.py:
+#      sensor -> ego (waktu sweep) -> global -> ego (waktu kamera) -> kamera -> image, satu matriks 3x4
+#   3. per frame ke SampleStore: gambar (diperkecil) + titik sparse (u, v, depth, ...) di koordinat gambar itu.
+#      fused_tensor() merasterisasi titik sparse menjadi tensor (H, W, FUSED_CHANNELS) saat dibaca
+DATAROOT = '../../data/raw/nuscenes'
+INPUT_OUT_DIR = '../../data/datasets/fusion/inputs'
+LABEL_OUT_DIR = '../../data/datasets/fusion/labels'
+LIDAR_CHANNEL = 'LIDAR_TOP'
+IMG_WIDTH = 1600
+IMG_HEIGHT = 900
+OUT_WIDTH = 800
+OUT_HEIGHT = 450
+MAX_DT = 0.1            # detik; sweep lebih jauh dari ini dianggap tidak ada
+MIN_DEPTH = 1.0         # seperti min_dist map_pointcloud_to_image devkit
+LIDAR_FEATURES = ('u', 'v', 'depth', 'intensity')
+RADAR_FEATURES = ('u', 'v', 'depth', 'vx', 'vy', 'rcs', 'sensor')
+FUSED_CHANNELS = ('r', 'g', 'b', 'lidar_depth', 'lidar_intensity', 'radar_depth', 'radar_vx', 'radar_vy', 'radar_rcs')
+# cv2.imread bisa decode JPEG langsung ke 1/2, 1/4, 1/8 ukuran (jauh lebih cepat dari decode penuh + resize)
+REDUCED_FLAGS = {2: 'IMREAD_REDUCED_COLOR_2', 4: 'IMREAD_REDUCED_COLOR_4', 8: 'IMREAD_REDUCED_COLOR_8'}
+
+class SensorIndex:
+    """
+    Index sample_data per channel, terurut timestamp. nearest() mencari sweep terdekat untuk banyak
+    timestamp sekaligus lewat binary search; kandidat dari scene lain atau lebih jauh dari max_dt -> -1.
+    """
+
+    def __init__(self, nusc, channels):
+        sd = nusc.columns['sample_data']
+        scene = np.full(len(sd['timestamp']), -1, dtype=np.int32)
+        has_sample = sd['sample'] >= 0
+        scene[has_sample] = nusc.columns['sample']['scene'][sd['sample'][has_sample]]
+        self.scene = scene
+        self.timestamps = sd['timestamp']
+        self.rows = {}
+        for channel in channels:
+            rows = np.nonzero(sd['channel'] == nusc.channels.index(channel))[0]
+            self.rows[channel] = rows[np.argsort(sd['timestamp'][rows], kind='stable')]
+
+    def nearest(self, channel, query_rows, max_dt=MAX_DT):
+        """Baris sample_data channel terdekat untuk tiap baris query + selisih waktu (detik)."""
+        rows = self.rows[channel]
+        times = self.timestamps[rows]
+        query_rows = np.asarray(query_rows)
+        query_times = self.timestamps[query_rows]
+        if len(rows) == 0:
+            return np.full(len(query_rows), -1, dtype=np.int64), np.full(len(query_rows), np.inf)
+        pos = np.searchsorted(times, query_times)
+        candidates = np.stack([np.maximum(pos - 1, 0), np.minimum(pos, len(rows) - 1)], axis=1)   # (Q,2)
+        dt = np.abs(times[candidates] - query_times[:, None]) / 1e6
+        dt[self.scene[rows[candidates]] != self.scene[query_rows][:, None]] = np.inf
+        best = np.argmin(dt, axis=1)
+        match_dt = dt[np.arange(len(query_rows)), best]
+        matched = np.where(match_dt <= max_dt, rows[candidates[np.arange(len(query_rows)), best]], -1)
+        return matched, np.where(matched >= 0, match_dt, np.inf)
+
+def build_frames(nusc, keyframes_only=True, max_dt=MAX_DT):
+    """
+    Semua frame kamera (urut scene, lalu timestamp) + sweep LiDAR/radar terdekat.
+    Output OrderedDict scene -> list (baris kamera, baris LiDAR, [baris radar], [dt LiDAR, dt radar...]).
+    """
+    index = SensorIndex(nusc, CAMERAS + [LIDAR_CHANNEL] + RADARS)
+    sd = nusc.columns['sample_data']
+    cameras = np.concatenate([index.rows[cam] for cam in CAMERAS])
+    if keyframes_only:
+        cameras = cameras[sd['is_key_frame'][cameras]]
+    cameras = cameras[index.scene[cameras] >= 0]
+    cameras = cameras[np.lexsort((sd['timestamp'][cameras], index.scene[cameras]))]
+
+    matches = [index.nearest(channel, cameras, max_dt) for channel in [LIDAR_CHANNEL] + RADARS]
+    rows = np.stack([m[0] for m in matches], axis=1)
+    dts = np.stack([m[1] for m in matches], axis=1).astype(np.float32)
+    frames = OrderedDict()
+    for i, cam_row in enumerate(cameras):
+        scene = nusc.tables['_scene'].token(index.scene[cam_row])
+        frames.setdefault(scene, []).append((int(cam_row), int(rows[i, 0]), rows[i, 1:].tolist(), dts[i]))
+    return frames
+
+def sensor_to_global(nusc, row):
+    """Matriks 4x4 frame sensor sample_data -> global (kalibrasi sensor + ego pose saat sweep)."""
+    sd = nusc.columns['sample_data']
+    calib = nusc.columns['calibrated_sensor']
+    ego = nusc.columns['ego_pose']
+    c, e = sd['calibrated_sensor'][row], sd['ego_pose'][row]
+    return transform_matrix(ego['translation'][e], ego['rotation'][e]) @ \
+        transform_matrix(calib['translation'][c], calib['rotation'][c])
+
+def camera_projection(nusc, row):
+    """Matriks 3x4 global -> image untuk sample_data kamera, sama dengan sample_camera_projections."""
+    sd = nusc.columns['sample_data']
+    calib = nusc.columns['calibrated_sensor']
+    ego = nusc.columns['ego_pose']
+    c, e = sd['calibrated_sensor'][row], sd['ego_pose'][row]
+    return camera_projection_matrix(calib['camera_intrinsic'][c], calib['translation'][c], calib['rotation'][c],
+                                    ego['translation'][e], ego['rotation'][e])
+
+def project_points(xyz, projection, width=IMG_WIDTH, height=IMG_HEIGHT, min_depth=MIN_DEPTH):
+    """
+    Titik (N,3) -> (u, v, depth) (N,3) dan mask titik di depan kamera & di dalam gambar
+    (margin 1 pixel seperti map_pointcloud_to_image devkit).
+    """
+    points = xyz @ projection[:, :3].T + projection[:, 3]
+    depth = points[:, 2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        u = points[:, 0] / depth
+        v = points[:, 1] / depth
+    mask = (depth > min_depth) & (u > 1) & (u < width - 1) & (v > 1) & (v < height - 1)
+    return np.stack([u, v, depth], axis=1), mask
+
+def read_image(path, out_width, out_height, width=IMG_WIDTH, height=IMG_HEIGHT):
+    import cv2
+
+    factor = width // out_width
+    flag = REDUCED_FLAGS.get(factor) if factor * out_width == width and factor * out_height == height else None
+    image = cv2.imread(path, getattr(cv2, flag) if flag else cv2.IMREAD_COLOR)
+    if image is None:
+        raise FileNotFoundError(path)
+    if image.shape[:2] != (out_height, out_width):
+        image = cv2.resize(image, (out_width, out_height), interpolation=cv2.INTER_AREA)
+    return image
+
+def frame_labels(nusc, cam_row, projection):
+    """Box YOLO 2D (kelas, [xc, yc, w, h] ternormalisasi) untuk frame kamera keyframe."""
+    sd = nusc.columns['sample_data']
+    if not sd['is_key_frame'][cam_row]:
+        return np.zeros(0, dtype=np.int16), np.zeros((0, 4), dtype=np.float32)
+    sample = nusc.record('sample', sd['sample'][cam_row])
+    class_ids, corners = collect_sample_annotations(nusc, sample)
+    if len(class_ids) == 0:
+        return np.zeros(0, dtype=np.int16), np.zeros((0, 4), dtype=np.float32)
+    bboxes = corners_to_yolo_bboxes(project_corners(corners, projection[None]))[0]
+    mask = yolo_bboxes_valid_mask(bboxes)
+    return class_ids[mask].astype(np.int16), bboxes[mask].astype(np.float32)
+
+def fused_tensor(frame, width=OUT_WIDTH, height=OUT_HEIGHT):
+    """
+    Rasterisasi satu frame store (dict image/lidar/radar) ke float32 (H, W, len(FUSED_CHANNELS)).
+    Pixel tanpa titik = 0; beberapa titik di satu pixel -> titik terdekat yang dipakai.
+    """
+    fused = np.zeros((height, width, len(FUSED_CHANNELS)), dtype=np.float32)
+    fused[..., :3] = frame['image'][0][..., ::-1] / 255.0
+    for points, channels, values in ((frame['lidar'], slice(3, 5), (2, 3)),
+                                     (frame['radar'], slice(5, 9), (2, 3, 4, 5))):
+        if len(points) == 0:
+            continue
+        order = np.argsort(-points[:, 2])          # jauh dulu, titik dekat menimpa
+        u = points[order, 0].astype(np.int64)
+        v = points[order, 1].astype(np.int64)
+        fused[v, u, channels] = points[order][:, list(values)]
+    return fused
+
+# --- worker -------------------------------------------------------------------
+_WORKER = {}
+
+def _init_worker(options):
+    from nuscenes_lite import load_cached
+
+    _WORKER.update(options)
+    # Cache kolom sudah ditulis proses utama (main); di sini hanya memmap
+    _WORKER['nusc'] = load_cached(version=options['version'], dataroot=options['dataroot'], verbose=False,
+                                  channels=CAMERAS + [LIDAR_CHANNEL] + RADARS,
+                                  keyframes_only=options['keyframes_only'])
+    _WORKER['cache'] = {}
+
+def _load_points(row, reader):
+    """Sweep yang sama dipakai beberapa kamera berurutan; simpan beberapa terakhir per worker."""
+    cache = _WORKER['cache']
+    if row not in cache:
+        nusc = _WORKER['nusc']
+        path = os.path.join(_WORKER['dataroot'], nusc.columns['sample_data']['filename'][row].decode())
+        if len(cache) >= 16:
+            cache.pop(next(iter(cache)))
+        cache[row] = (reader(path), sensor_to_global(nusc, row))
+    return cache[row]
+
+def _read_radar(path):
+    points = read_radar_pcd(path)
+    if _WORKER['radar_filter']:
+        points = points[valid_mask(points)]
+    return points
+
+def process_frame(cam_row, lidar_row, radar_rows):
+    nusc = _WORKER['nusc']
+    width, height = _WORKER['width'], _WORKER['height']
+    scale = np.array([width / IMG_WIDTH, height / IMG_HEIGHT, 1.0])
+    filename = nusc.columns['sample_data']['filename'][cam_row].decode()
+    image = read_image(os.path.join(_WORKER['dataroot'], filename), width, height)
+    projection = camera_projection(nusc, cam_row)
+
+    lidar = np.zeros((0, len(LIDAR_FEATURES)), dtype=np.float32)
+    num_points = 0
+    if lidar_row >= 0:
+        points, to_global = _load_points(lidar_row, read_pcd_bin)
+        num_points += len(points)
+        uvd, mask = project_points(np.asarray(points[:, :3], dtype=np.float64), projection @ to_global)
+        lidar = np.empty((int(mask.sum()), len(LIDAR_FEATURES)), dtype=np.float32)
+        lidar[:, :3] = uvd[mask] * scale
+        lidar[:, 3] = points[:, 3][mask]
+
+    radar = []
+    for sensor, row in enumerate(radar_rows):
+        if row < 0:
+            continue
+        points, to_global = _load_points(row, _read_radar)
+        num_points += len(points)
+        xyz = np.stack([points['x'], points['y'], points['z']], axis=1).astype(np.float64)
+        uvd, mask = project_points(xyz, projection @ to_global)
+        # Kecepatan terkompensasi diputar dari frame sensor ke frame ego (seperti preprocess_radar)
+        calib_row = nusc.columns['sample_data']['calibrated_sensor'][row]
+        rotation = quaternion_to_matrix(nusc.columns['calibrated_sensor']['rotation'][calib_row])
+        out = np.empty((int(mask.sum()), len(RADAR_FEATURES)), dtype=np.float32)
+        out[:, :3] = uvd[mask] * scale
+        vel = np.stack([points['vx_comp'][mask], points['vy_comp'][mask], np.zeros(int(mask.sum()))], axis=1)
+        out[:, 3:5] = (vel @ rotation.T)[:, :2]
+        out[:, 5] = points['rcs'][mask]
+        out[:, 6] = sensor
+        radar.append(out)
+    radar = np.concatenate(radar) if radar else np.zeros((0, len(RADAR_FEATURES)), dtype=np.float32)
+
+    class_ids, bboxes = frame_labels(nusc, cam_row, projection)
+    inputs = {'image': image[None], 'lidar': lidar, 'radar': radar}
+    return inputs, {'boxes': bboxes, 'classes': class_ids}, num_points
+
+def _convert_scene(job):
+    scene_token, frames = job
+    nusc = _WORKER['nusc']
+    results = []
+    for cam_row, lidar_row, radar_rows, dts in frames:
+        inputs, labels, num_points = process_frame(cam_row, lidar_row, radar_rows)
+        inputs['sync'] = dts[None]
+        results.append((nusc.tables['sample_data'].token(cam_row), inputs, labels, num_points))
+    _WORKER['cache'].clear()
+    return results
+
+def store_fields(width, height):
+    inputs = {
+        'image': (np.uint8, (height, width, 3)),
+        'lidar': (np.float32, (len(LIDAR_FEATURES),)),
+        'radar': (np.float32, (len(RADAR_FEATURES),)),
+        'sync': (np.float32, (1 + len(RADARS),)),   # |dt| kamera ke LiDAR & tiap radar (detik, inf = tidak ada)
+    }
+    labels = {'boxes': (np.float32, (4,)), 'classes': (np.int16, ())}
+    return inputs, labels
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bangun dataset fusi kamera + LiDAR + radar nuScenes.")
+    parser.add_argument('--version', default=NUSC_VERSION)
+    parser.add_argument('--dataroot', default=DATAROOT)
+    parser.add_argument('--width', type=int, default=OUT_WIDTH, help="Lebar gambar output.")
+    parser.add_argument('--height', type=int, default=OUT_HEIGHT, help="Tinggi gambar output.")
+    parser.add_argument('--max-dt', type=float, default=MAX_DT, help="Selisih waktu maksimum kamera-sweep (detik).")
+    parser.add_argument('--sweeps', action='store_true', help="Ikutkan frame kamera non-keyframe (tanpa label).")
+    parser.add_argument('--no-radar-filter', action='store_true', help="Simpan semua titik radar.")
+    parser.add_argument('--workers', type=int, default=0, help="Jumlah proses (per scene). 0 = semua core CPU.")
+    parser.add_argument('--out-dir', default=INPUT_OUT_DIR)
+    parser.add_argument('--label-dir', default=LABEL_OUT_DIR)
+    parser.add_argument('--restart', action='store_true')
+    return parser.parse_args()
+
+def main():
+    from nuscenes_lite import load_cached
+
+    args = parse_args()
+    keyframes_only = not args.sweeps
+    meta = {'version': args.version, 'width': args.width, 'height': args.height, 'max_dt': args.max_dt,
+            'keyframes_only': keyframes_only, 'radar_filter': not args.no_radar_filter, 'cameras': CAMERAS,
+            'lidar_channel': LIDAR_CHANNEL, 'radars': RADARS, 'lidar_features': list(LIDAR_FEATURES),
+            'radar_features': list(RADAR_FEATURES), 'fused_channels': list(FUSED_CHANNELS),
+            'box_format': ['xc', 'yc', 'w', 'h'], 'class_mapping': CLASS_MAPPING}
+    meta_path = os.path.join(args.out_dir, 'meta.json')
+    if not args.restart and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f) != json.loads(json.dumps(meta)):
+                sys.exit(f"Parameter berbeda dengan store {args.out_dir}; jalankan dengan --restart.")
+
+    start = time.time()
+    nusc = load_cached(version=args.version, dataroot=args.dataroot, verbose=False,
+                       channels=CAMERAS + [LIDAR_CHANNEL] + RADARS, keyframes_only=keyframes_only)
+    frames = build_frames(nusc, keyframes_only, args.max_dt)
+    all_frames = [frame for scene_frames in frames.values() for frame in scene_frames]
+    sync = np.stack([frame[3] for frame in all_frames]) if all_frames else np.zeros((0, 1 + len(RADARS)))
+    index_time = time.time() - start
+
+    input_fields, label_fields = store_fields(args.width, args.height)
+    input_store = SampleStoreWriter(args.out_dir, input_fields, restart=args.restart)
+    label_store = SampleStoreWriter(args.label_dir, label_fields, restart=args.restart)
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    done = set(input_store.samples) & set(label_store.samples)
+    token = nusc.tables['sample_data'].token
+    jobs = [(scene, [frame for frame in scene_frames if token(frame[0]) not in done])
+            for scene, scene_frames in frames.items()]
+    jobs = [job for job in jobs if job[1]]
+    del nusc
+    num_pending = sum(len(job[1]) for job in jobs)
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+    workers = max(1, min(workers, len(jobs)))
+    options = dict(version=args.version, dataroot=args.dataroot, width=args.width, height=args.height,
+                   keyframes_only=keyframes_only, radar_filter=not args.no_radar_filter)
+    print(f"\n=== Dataset fusi: {num_pending} frame kamera di {len(jobs)} scene, gambar {args.width}x{args.height}, "
+          f"{workers} worker ===")
+    print(f"- Index waktu: {len(all_frames)} frame dalam {index_time:.2f} detik, "
+          f"LiDAR cocok {np.isfinite(sync[:, 0]).mean() * 100 if len(sync) else 0:.1f}%, "
+          f"radar cocok {np.isfinite(sync[:, 1:]).mean() * 100 if len(sync) else 0:.1f}%")
+
+    num_points = num_lidar = num_radar = 0
+    start = time.time()
+    pool = None
+    if workers == 1:
+        if jobs:
+            _init_worker(options)
+        results = map(_convert_scene, jobs)
+    else:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(options,))
+        results = pool.imap_unordered(_convert_scene, jobs, chunksize=1)
+    try:
+        with tqdm(total=num_pending, desc="Fusi", unit="frame") as pbar:
+            for scene_results in results:
+                for frame_token, inputs, labels, points in scene_results:
+                    label_store.append(frame_token, labels)
+                    input_store.append(frame_token, inputs)
+                    num_points += points
+                    num_lidar += len(inputs['lidar'])
+                    num_radar += len(inputs['radar'])
+                input_store.flush()
+                label_store.flush()
+                pbar.update(len(scene_results))
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        input_store.close()
+        label_store.close()
+        if pool is not None:
+            pool.close()
+            pool.join()
+    elapsed = time.time() - start
+
+    print(f"\n=== Selesai {num_pending} frame dalam {elapsed:.1f} detik ===")
+    if num_pending:
+        print(f"- Frame/detik      : {num_pending / max(elapsed, 1e-9):.1f}")
+        print(f"- Titik diproyeksi : {num_points} ({num_points / max(elapsed, 1e-9) / 1e6:.2f} juta titik/detik)")
+        print(f"- Titik per frame  : {num_lidar / num_pending:.0f} LiDAR, {num_radar / num_pending:.0f} radar")
+        print(f"- Output           : {input_store.bytes_written / num_pending / 1e6:.2f} MB per frame")
+    print(f"- Store input      : {args.out_dir} ({len(SampleStore(args.out_dir))} frame)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'preprocessing', 'camera'))
+from nuscenes_to_yolo import CAMERAS, DATAROOT, NUSC_VERSION, list_samples_by_scene
+
+# Inference offline berbatch. Pipeline 3 tahap yang berjalan bersamaan:
+#   decode  : thread pool membaca + decode JPEG + letterbox (cv2 melepas GIL -> semua core terpakai)
+#   model   : thread utama menyusun batch ukuran tetap dan menjalankan forward model
+#   post    : thread terpisah untuk NMS, skala balik box ke ukuran asli, dan menulis hasil
+# Antar tahap dihubungkan queue terbatas, sehingga memori tetap kecil untuk folder besar.
+MODEL_PATH = '../../../models/yolov8_camera.pt'
+OUT_DIR = '../../../runs/detect/camera/inference'
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png')
+PAD_VALUE = 114
+
+def list_image_dir(source):
+    """Semua gambar di folder (rekursif), urut. Return list (path, nama output tanpa ekstensi)."""
+    items = []
+    for root, _, files in os.walk(source):
+        for name in files:
+            if name.lower().endswith(IMAGE_SUFFIXES):
+                path = os.path.join(root, name)
+                items.append((path, os.path.splitext(os.path.relpath(path, source))[0].replace(os.sep, '__')))
+    return sorted(items)
+
+def list_nuscenes_scenes(scenes, dataroot=DATAROOT, version=NUSC_VERSION, channels=CAMERAS):
+    """Gambar kamera keyframe dari scene nuScenes (nama mis. scene-0061 atau token). Urut per scene/waktu."""
+    from nuscenes_lite import NuScenesLite
+
+    with open(os.path.join(dataroot, version, 'scene.json')) as f:
+        name_to_token = {s['name']: s['token'] for s in json.load(f)}
+    tokens = [name_to_token.get(scene, scene) for scene in scenes]
+    by_scene = list_samples_by_scene(dataroot, version)
+    missing = [scene for scene, token in zip(scenes, tokens) if token not in by_scene]
+    if missing:
+        raise ValueError(f"Scene tidak ditemukan: {', '.join(missing)}")
+
+    nusc = NuScenesLite(version=version, dataroot=dataroot, verbose=False, channels=channels, keyframes_only=True)
+    items = []
+    for token in tokens:
+        for sample_token in by_scene[token]:
+            data = nusc.get('sample', sample_token)['data']
+            for channel in channels:
+                if channel in data:
+                    filename = nusc.get('sample_data', data[channel])['filename']
+                    items.append((os.path.join(dataroot, filename), os.path.splitext(os.path.basename(filename))[0]))
+    return items
+
+def letterbox(im, imgsz):
+    """Resize rasio tetap + padding tengah ke (imgsz, imgsz), sama dengan LetterBox Ultralytics (auto=False)."""
+    h0, w0 = im.shape[:2]
+    r = min(imgsz / h0, imgsz / w0)
+    w, h = int(round(w0 * r)), int(round(h0 * r))
+    if (w, h) != (w0, h0):
+        im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+    top, left = int(round((imgsz - h) / 2 - 0.1)), int(round((imgsz - w) / 2 - 0.1))
+    return cv2.copyMakeBorder(im, top, imgsz - h - top, left, imgsz - w - left, cv2.BORDER_CONSTANT,
+                              value=(PAD_VALUE, PAD_VALUE, PAD_VALUE))
+
+def load_item(item, imgsz):
+    path, name = item
+    im = cv2.imread(path, cv2.IMREAD_COLOR)
+    if im is None:
+        return name, None, None
+    # BGR HWC -> RGB CHW
+    return name, im.shape[:2], letterbox(im, imgsz)[:, :, ::-1].transpose(2, 0, 1)
+
+class ResultWriter:
+    """Tulis deteksi: yolo = satu .txt per gambar (cls cx cy w h conf, ternormalisasi), coco = satu JSON."""
+
+    def __init__(self, out_dir, fmt, names):
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.names = names
+        self.images = []
+        self.annotations = []
+        if fmt in ('yolo', 'both'):
+            os.makedirs(os.path.join(out_dir, 'labels'), exist_ok=True)
+
+    def write(self, name, shape, det):
+        """det: array (N, 6) xyxy, conf, cls dalam piksel gambar asli."""
+        h, w = shape
+        if self.fmt in ('yolo', 'both'):
+            with open(os.path.join(self.out_dir, 'labels', name + '.txt'), 'w') as f:
+                for x1, y1, x2, y2, conf, cls in det.tolist():
+                    f.write(f"{int(cls)} {(x1 + x2) / 2 / w:.6f} {(y1 + y2) / 2 / h:.6f} "
+                            f"{(x2 - x1) / w:.6f} {(y2 - y1) / h:.6f} {conf:.4f}\n")
+        if self.fmt in ('coco', 'both'):
+            image_id = len(self.images) + 1
+            self.images.append({'id': image_id, 'file_name': name, 'height': h, 'width': w})
+            for x1, y1, x2, y2, conf, cls in det.tolist():
+                self.annotations.append({
+                    'id': len(self.annotations) + 1, 'image_id': image_id, 'category_id': int(cls),
+                    'bbox': [round(x1, 2), round(y1, 2), round(x2 - x1, 2), round(y2 - y1, 2)],
+                    'score': round(conf, 5),
+                })
+
+    def close(self):
+        if self.fmt in ('coco', 'both'):
+            categories = [{'id': int(i), 'name': n} for i, n in sorted(self.names.items())]
+            with open(os.path.join(self.out_dir, 'detections_coco.json'), 'w') as f:
+                json.dump({'images': self.images, 'annotations': self.annotations, 'categories': categories}, f)
+
+def run_pipeline(items, model_path, out_dir, imgsz=640, batch=16, decode_workers=None, threads=None,
+                 conf=0.25, iou=0.45, fmt='yolo', device='cpu'):
+    """Jalankan pipeline pada list (path, nama). Return statistik (jumlah gambar, fps, waktu per tahap)."""
+    import torch
+    from ultralytics.nn.autobackend import AutoBackend
+    from ultralytics.utils.ops import non_max_suppression, scale_boxes
+
+    cores = os.cpu_count() or 1
+    # Bagi core antara decode dan inference (keduanya penuh bersamaan): default 1/4 untuk decode, sisanya model
+    decode_workers = decode_workers or max(1, cores // 4)
+    torch.set_num_threads(threads or max(1, cores - decode_workers))
+    model = AutoBackend(model_path, device=torch.device(device), batch=batch, verbose=False)
+    model.warmup(imgsz=(batch, 3, imgsz, imgsz))
+    os.makedirs(out_dir, exist_ok=True)
+    writer = ResultWriter(out_dir, fmt, model.names)
+
+    stats = {'images': 0, 'failed': 0, 'decode_wait_s': 0.0, 'inference_s': 0.0, 'post_s': 0.0}
+    decoded = queue.Queue(maxsize=batch * 4)
+    post = queue.Queue(maxsize=4)
+    done = object()
+    # Error di thread post (I/O writer, NMS) disimpan di sini; stop menghentikan thread lain
+    errors = []
+    stop = threading.Event()
+
+    def put(q, job, check_errors=True):
+        """q.put yang tidak menggantung jika thread pasangannya mati: cek error/stop tiap timeout."""
+        while True:
+            if stop.is_set():
+                return False
+            if check_errors and errors:
+                raise RuntimeError("Postprocess gagal") from errors[0]
+            try:
+                q.put(job, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+
+    def feed(pool):
+        # Submit bertahap (queue terbatas) agar tidak semua gambar di-decode ke memori sekaligus
+        for item in items:
+            if stop.is_set() or not put(decoded, pool.submit(load_item, item, imgsz), False):
+                return
+        put(decoded, done, False)
+
+    def postprocess():
+        try:
+            while True:
+                job = post.get()
+                if job is done:
+                    break
+                preds, metas = job
+                start = time.perf_counter()
+                for det, (name, shape) in zip(non_max_suppression(preds, conf, iou, max_det=300), metas):
+                    det[:, :4] = scale_boxes((imgsz, imgsz), det[:, :4], shape)
+                    writer.write(name, shape, det.cpu().numpy())
+                stats['post_s'] += time.perf_counter() - start
+        except BaseException as e:
+            errors.append(e)
+
+    buf = np.zeros((batch, 3, imgsz, imgsz), dtype=np.uint8)
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(decode_workers) as pool:
+        feeder = threading.Thread(target=feed, args=(pool,), daemon=True)
+        poster = threading.Thread(target=postprocess, daemon=True)
+        feeder.start()
+        poster.start()
+        metas = []
+        finished = False
+        try:
+            while not finished:
+                wait = time.perf_counter()
+                future = decoded.get()
+                finished = future is done
+                if not finished:
+                    name, shape, im = future.result()
+                    stats['decode_wait_s'] += time.perf_counter() - wait
+                    if im is None:
+                        stats['failed'] += 1
+                        continue
+                    buf[len(metas)] = im
+                    metas.append((name, shape))
+                if len(metas) == batch or (finished and metas):
+                    start = time.perf_counter()
+                    # Batch selalu berukuran tetap (slot sisa diabaikan) agar model statis/ONNX tidak re-compile
+                    x = torch.from_numpy(buf).to(model.device).float() / 255.0
+                    with torch.inference_mode():
+                        preds = model(x)
+                    preds = preds[0] if isinstance(preds, (list, tuple)) else preds
+                    put(post, (preds[:len(metas)], metas))
+                    stats['inference_s'] += time.perf_counter() - start
+                    stats['images'] += len(metas)
+                    metas = []
+            put(post, done)
+            poster.join()
+            if errors:
+                raise RuntimeError("Postprocess gagal") from errors[0]
+        finally:
+            # Saat error: hentikan feeder dan batalkan decode yang belum jalan agar pool bisa ditutup
+            stop.set()
+            try:
+                post.put_nowait(done)
+            except queue.Full:
+                pass
+            while True:
+                try:
+                    job = decoded.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not done:
+                    job.cancel()
+        feeder.join()
+    writer.close()
+    elapsed = time.perf_counter() - start_time
+    stats['elapsed_s'] = elapsed
+    stats['fps'] = stats['images'] / elapsed if elapsed > 0 else 0.0
+    return stats
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inference YOLO berbatch untuk folder gambar atau scene nuScenes.")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument('--source', help="Folder gambar (rekursif).")
+    src.add_argument('--scenes', nargs='+', help="Nama/token scene nuScenes, mis. scene-0061 scene-0103.")
+    parser.add_argument('--model', default=MODEL_PATH, help="Model .pt / .onnx / folder OpenVINO (lihat export_benchmark.py).")
+    parser.add_argument('--out-dir', default=OUT_DIR)
+    parser.add_argument('--format', choices=('yolo', 'coco', 'both'), default='yolo')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--batch', type=int, default=16)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--iou', type=float, default=0.45)
+    parser.add_argument('--decode-workers', type=int, default=0, help="Thread decode JPEG (0 = 1/4 core).")
+    parser.add_argument('--threads', type=int, default=0, help="Thread inference PyTorch (0 = core sisa decode).")
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--version', default=NUSC_VERSION)
+    parser.add_argument('--dataroot', default=DATAROOT)
+    parser.add_argument('--channels', nargs='+', default=CAMERAS)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.source:
+        items = list_image_dir(args.source)
+    else:
+        try:
+            items = list_nuscenes_scenes(args.scenes, args.dataroot, args.version, args.channels)
+        except ValueError as e:
+            sys.exit(str(e))
+    if not items:
+        sys.exit("Tidak ada gambar untuk diproses.")
+    print(f"=== Inference {len(items)} gambar, model {args.model}, batch {args.batch}, imgsz {args.imgsz} ===")
+
+    stats = run_pipeline(items, args.model, args.out_dir, args.imgsz, args.batch, args.decode_workers or None,
+                         args.threads or None, args.conf, args.iou, args.format, args.device)
+    print(f"\nSelesai: {stats['images']} gambar ({stats['failed']} gagal dibaca) dalam {stats['elapsed_s']:.2f} detik")
+    print(f"- Sustained throughput : {stats['fps']:.1f} frame/detik")
+    print(f"- Menunggu decode      : {stats['decode_wait_s']:.2f} detik")
+    print(f"- Inference model      : {stats['inference_s']:.2f} detik")
+    print(f"- NMS + tulis hasil    : {stats['post_s']:.2f} detik (paralel dengan inference)")
+    print(f"- Output               : {args.out_dir}")
+
+if __name__ == "__main__":
+    main()
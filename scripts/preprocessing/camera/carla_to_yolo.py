@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import fnmatch
+import argparse
+import threading
+import numpy as np
+from tqdm import tqdm
+from materialize import STRATEGIES, MaterializeStats, materialize
+from nuscenes_to_yolo import CLASS_MAPPING, corners_to_yolo_bboxes, format_label_lines, yolo_bboxes_valid_mask
+from projection import project_corners
+
+# Auto-label YOLO dari sesi recorder CARLA (carla_api/recorder.py). Per frame: box 3D semua aktor
+# (manifest) -> sudut dunia (N,8,3) -> satu matriks proyeksi kamera -> bbox YOLO dengan validasi yang
+# sama dengan nuscenes_to_yolo. Aktor di belakang kamera dibuang, dan jika depth tersedia, aktor yang
+# tertutup objek lain (depth buffer lebih dekat dari box) dibuang juga.
+# Dipakai offline (CLI ini) atau online sebagai hook writer recorder (recorder.py --label).
+RAW_DIR = '../../../data/raw/carla'
+IMAGE_OUT_DIR = '../../../data/processed/carla/camera/images'
+LABEL_OUT_DIR = '../../../data/processed/carla/camera/labels'
+MIN_VISIBLE = 0.2         # fraksi titik sampel bbox yang tidak tertutup
+OCCLUSION_MARGIN = 1.0    # meter: toleransi depth buffer vs sudut terdekat box
+OCCLUSION_GRID = 6        # titik sampel per sisi bbox untuk uji oklusi
+MAX_DISTANCE = 100.0      # meter
+
+# Aktor CARLA -> kategori nuScenes (CLASS_MAPPING). Pola type_id diperiksa dulu (urut), lalu base_type
+# (CARLA >= 0.9.13), terakhir fallback per jenis aktor.
+CARLA_TYPE_CATEGORIES = [
+    ('walker.pedestrian.*', 'human.pedestrian.adult'),
+    ('vehicle.*ambulance*', 'vehicle.emergency.ambulance'),
+    ('vehicle.*police*', 'vehicle.emergency.police'),
+    ('vehicle.*firetruck*', 'vehicle.truck'),
+    ('vehicle.carlamotors.*', 'vehicle.truck'),
+    ('vehicle.mitsubishi.fusorosa', 'vehicle.bus.rigid'),
+    ('vehicle.bh.crossbike', 'vehicle.bicycle'),
+    ('vehicle.diamondback.*', 'vehicle.bicycle'),
+    ('vehicle.gazelle.*', 'vehicle.bicycle'),
+    ('vehicle.harley-davidson.*', 'vehicle.motorcycle'),
+    ('vehicle.kawasaki.*', 'vehicle.motorcycle'),
+    ('vehicle.yamaha.*', 'vehicle.motorcycle'),
+    ('vehicle.vespa.*', 'vehicle.motorcycle'),
+]
+CARLA_BASE_TYPES = {
+    'car': 'vehicle.car',
+    'van': 'vehicle.car',
+    'truck': 'vehicle.truck',
+    'bus': 'vehicle.bus.rigid',
+    'motorcycle': 'vehicle.motorcycle',
+    'bicycle': 'vehicle.bicycle',
+}
+CARLA_FALLBACK = [
+    ('walker.*', 'human.pedestrian.adult'),
+    ('vehicle.*', 'vehicle.car'),
+]
+
+def carla_category(type_id, base_type=''):
+    for pattern, category in CARLA_TYPE_CATEGORIES:
+        if fnmatch.fnmatch(type_id, pattern):
+            return category
+    if base_type.lower() in CARLA_BASE_TYPES:
+        return CARLA_BASE_TYPES[base_type.lower()]
+    for pattern, category in CARLA_FALLBACK:
+        if fnmatch.fnmatch(type_id, pattern):
+            return category
+    return None
+
+def carla_class_ids(actors):
+    """Class id CLASS_MAPPING per aktor (-1 = tidak dipetakan)."""
+    return np.array([CLASS_MAPPING.get(carla_category(a['type_id'], a.get('base_type', '')), -1)
+                     for a in actors], dtype=np.int64)
+
+def carla_transform_matrices(transforms):
+    """
+    Matriks 4x4 lokal -> dunia dari transform CARLA [x, y, z, pitch, yaw, roll] (derajat), batch (N,6).
+    Sama dengan carla.Transform.get_matrix().
+    """
+    t = np.asarray(transforms, dtype=np.float64).reshape(-1, 6)
+    pitch, yaw, roll = np.radians(t[:, 3]), np.radians(t[:, 4]), np.radians(t[:, 5])
+    cp, sp, cy, sy, cr, sr = np.cos(pitch), np.sin(pitch), np.cos(yaw), np.sin(yaw), np.cos(roll), np.sin(roll)
+    mat = np.zeros((len(t), 4, 4))
+    mat[:, 0, 0] = cp * cy
+    mat[:, 0, 1] = cy * sp * sr - sy * cr
+    mat[:, 0, 2] = -cy * sp * cr - sy * sr
+    mat[:, 1, 0] = sy * cp
+    mat[:, 1, 1] = sy * sp * sr + cy * cr
+    mat[:, 1, 2] = -sy * sp * cr + cy * sr
+    mat[:, 2, 0] = sp
+    mat[:, 2, 1] = -cp * sr
+    mat[:, 2, 2] = cp * cr
+    mat[:, :3, 3] = t[:, :3]
+    mat[:, 3, 3] = 1.0
+    return mat
+
+def actor_corners(actors):
+    """8 sudut box 3D semua aktor dalam koordinat dunia CARLA. Output (N,8,3)."""
+    extents = np.array([a['extent'] for a in actors], dtype=np.float64)
+    centers = np.array([a['box_location'] for a in actors], dtype=np.float64)
+    signs = np.array([[sx, sy, sz] for sx in (1, -1) for sy in (1, -1) for sz in (1, -1)], dtype=np.float64)
+    local = centers[:, None, :] + extents[:, None, :] * signs[None]             # (N,8,3)
+    local = np.concatenate([local, np.ones(local.shape[:2] + (1,))], axis=2)
+    world = np.matmul(local, carla_transform_matrices([a['transform'] for a in actors]).transpose(0, 2, 1))
+    return world[:, :, :3]
+
+def camera_projection(transform, width, height, fov):
+    """
+    Matriks 3x4 dunia CARLA -> pixel untuk kamera pinhole CARLA. Frame kamera CARLA (x maju, y kanan,
+    z atas) diputar ke konvensi optik (x kanan, y bawah, z maju) sebelum intrinsic.
+    """
+    focal = width / (2.0 * np.tan(np.radians(fov) / 2.0))
+    intrinsic = np.array([[focal, 0.0, width / 2.0], [0.0, focal, height / 2.0], [0.0, 0.0, 1.0]])
+    to_optical = np.array([[0.0, 1.0, 0.0, 0.0], [0.0, 0.0, -1.0, 0.0], [1.0, 0.0, 0.0, 0.0]])
+    world_to_camera = np.linalg.inv(carla_transform_matrices(transform)[0])
+    return intrinsic @ to_optical @ world_to_camera
+
+def occlusion_visible_fraction(bboxes, near_depth, depth, grid=OCCLUSION_GRID, margin=OCCLUSION_MARGIN):
+    """
+    Fraksi titik sampel (grid x grid) di dalam bbox pixel (N,4 x1,y1,x2,y2) yang depth buffer-nya
+    tidak lebih dekat dari sudut terdekat box (near_depth - margin). Semua aktor sekaligus.
+    """
+    height, width = depth.shape
+    steps = (np.arange(grid) + 0.5) / grid
+    xs = bboxes[:, 0:1] + (bboxes[:, 2:3] - bboxes[:, 0:1]) * steps[None]       # (N,G)
+    ys = bboxes[:, 1:2] + (bboxes[:, 3:4] - bboxes[:, 1:2]) * steps[None]
+    xs = np.clip(xs, 0, width - 1).astype(np.int64)
+    ys = np.clip(ys, 0, height - 1).astype(np.int64)
+    samples = depth[ys[:, :, None], xs[:, None, :]].astype(np.float32)          # (N,G,G)
+    return (samples >= (near_depth - margin)[:, None, None]).mean(axis=(1, 2))
+
+def label_frame(record, depth=None, min_visible=MIN_VISIBLE, max_distance=MAX_DISTANCE):
+    """
+    Label YOLO untuk satu record manifest. depth: array (H,W) meter dari kamera depth (opsional).
+    Return (class_ids, bboxes, mask) seperti pipeline nuScenes batch.
+    """
+    camera = record['sensors']['camera']
+    width, height = camera['width'], camera['height']
+    actors = [a for a in record.get('actors', []) if a['id'] != record.get('ego_id')]
+    class_ids = carla_class_ids(actors)
+    keep = class_ids >= 0
+    actors = [a for a, k in zip(actors, keep) if k]
+    class_ids = class_ids[keep]
+    if not actors:
+        return class_ids, np.zeros((0, 4)), np.zeros(0, dtype=bool)
+
+    corners = actor_corners(actors)
+    projection = camera_projection(camera['transform'], width, height, camera['fov'])
+    pixels = project_corners(corners, projection[None])[0]                       # (N,8,2)
+    corner_depth = np.einsum('j,npj->np', projection[2, :3], corners) + projection[2, 3]
+    bboxes = corners_to_yolo_bboxes(pixels, width, height)
+    # Semua sudut harus di depan kamera (di belakang kamera proyeksinya terbalik)
+    mask = yolo_bboxes_valid_mask(bboxes) & (corner_depth.min(axis=1) > 0) & (corner_depth.min(axis=1) < max_distance)
+    if depth is not None and mask.any():
+        xyxy = np.concatenate([pixels.min(axis=1), pixels.max(axis=1)], axis=1)
+        visible = np.zeros(len(actors))
+        visible[mask] = occlusion_visible_fraction(xyxy[mask], corner_depth.min(axis=1)[mask], depth)
+        mask &= visible >= min_visible
+    return class_ids, bboxes, mask
+
+def output_name(session, record):
+    return f"{session}_{record['frame']:08d}"
+
+class CarlaLabeler:
+    """
+    Auto-label per frame, bisa dipanggil sebagai hook FrameWriter recorder: hook(record, session_dir).
+    Gambar kamera dimaterialisasi (default hardlink) ke IMAGE_OUT_DIR dan label ditulis ke LABEL_OUT_DIR.
+    Aman dipanggil dari beberapa thread writer sekaligus.
+    """
+
+    def __init__(self, session, image_dir=IMAGE_OUT_DIR, label_dir=LABEL_OUT_DIR, strategy='hardlink',
+                 min_visible=MIN_VISIBLE, occlusion=True):
+        base = os.path.dirname(os.path.abspath(__file__))
+        self.session = session
+        self.image_dir = os.path.join(base, image_dir)
+        self.label_dir = os.path.join(base, label_dir)
+        self.strategy = strategy
+        self.min_visible = min_visible
+        self.occlusion = occlusion
+        self.stats = MaterializeStats()
+        self.frames = 0
+        self.labels = 0
+        self.lock = threading.Lock()
+        os.makedirs(self.image_dir, exist_ok=True)
+        os.makedirs(self.label_dir, exist_ok=True)
+
+    def __call__(self, record, session_dir):
+        sensors = record['sensors']
+        if 'file' not in sensors.get('camera', {}):
+            return
+        depth = None
+        if self.occlusion and 'file' in sensors.get('depth', {}):
+            depth = np.load(os.path.join(session_dir, sensors['depth']['file']))
+        class_ids, bboxes, mask = label_frame(record, depth, self.min_visible)
+        name = output_name(self.session, record)
+        stats = MaterializeStats()
+        materialize(os.path.join(session_dir, sensors['camera']['file']),
+                    os.path.join(self.image_dir, name + '.jpg'), self.strategy, stats)
+        lines = format_label_lines(class_ids, bboxes, mask)
+        with open(os.path.join(self.label_dir, name + '.txt'), 'w') as f:
+            for line in lines:
+                f.write(line + "\n")
+        with self.lock:
+            self.stats.merge(stats)
+            self.frames += 1
+            self.labels += len(lines)
+
+def load_session(session_dir):
+    """Record manifest sesi recorder, urut frame."""
+    with open(os.path.join(session_dir, 'manifest.jsonl')) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return sorted(records, key=lambda r: r['frame'])
+
+def run_benchmark(session_dir, occlusion=True):
+    """Laju label_frame saja (tanpa I/O gambar) dibanding fps sesi."""
+    records = [r for r in load_session(session_dir) if 'camera' in r['sensors']]
+    depths = {}
+    if occlusion:
+        for r in records:
+            if 'file' in r['sensors'].get('depth', {}):
+                depths[r['frame']] = np.load(os.path.join(session_dir, r['sensors']['depth']['file']))
+    start = time.perf_counter()
+    labels = 0
+    for r in records:
+        _, _, mask = label_frame(r, depths.get(r['frame']))
+        labels += int(mask.sum())
+    elapsed = time.perf_counter() - start
+    fps = len(records) / elapsed if elapsed > 0 else 0.0
+    print(f"- {os.path.basename(session_dir)}: {len(records)} frame, {labels} label, "
+          f"{elapsed * 1000 / max(len(records), 1):.2f} ms/frame ({fps:.0f} frame/detik"
+          f"{', dengan oklusi' if depths else ''})")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Konversi sesi recorder CARLA ke format YOLO.")
+    parser.add_argument('sessions', nargs='*', help="Folder sesi (default: semua di data/raw/carla).")
+    parser.add_argument('--strategy', choices=STRATEGIES, default='hardlink', help="Cara materialisasi gambar.")
+    parser.add_argument('--min-visible', type=float, default=MIN_VISIBLE,
+                        help="Fraksi minimum bbox yang tidak tertutup (butuh sensor depth).")
+    parser.add_argument('--no-occlusion', action='store_true', help="Abaikan depth buffer.")
+    parser.add_argument('--benchmark', action='store_true', help="Ukur laju auto-label per frame, tanpa menulis.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    sessions = args.sessions or sorted(
+        os.path.join(RAW_DIR, name) for name in os.listdir(RAW_DIR)
+        if os.path.isfile(os.path.join(RAW_DIR, name, 'manifest.jsonl'))
+    )
+    if not sessions:
+        print(f"Tidak ada sesi recorder di {RAW_DIR}.")
+        return
+    if args.benchmark:
+        print("=== Benchmark auto-label CARLA ===")
+        for session_dir in sessions:
+            run_benchmark(session_dir, not args.no_occlusion)
+        return
+
+    for session_dir in sessions:
+        session = os.path.basename(os.path.normpath(session_dir))
+        labeler = CarlaLabeler(session, strategy=args.strategy, min_visible=args.min_visible,
+                               occlusion=not args.no_occlusion)
+        for record in tqdm(load_session(session_dir), desc=session):
+            labeler(record, session_dir)
+        print(f"{session}: {labeler.frames} gambar, {labeler.labels} label")
+        labeler.stats.report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import os
+import io
+import json
+import time
+import queue
+import tarfile
+import argparse
+import threading
+from tqdm import tqdm
+from verify_camera_data import jpeg_size
+
+# Format shard (mirip webdataset): beberapa file tar berisi <key>.jpg + <key>.txt berurutan,
+# plus index.json berisi offset byte data JPEG di dalam tar sehingga gambar bisa dibaca
+# langsung (pread) tanpa membuka tar. Label ikut disimpan di index agar tidak perlu baca tar.
+SHARD_ROOT = '../../../data/datasets/camera/shards'
+IMAGE_DIR = '../../../data/datasets/camera/images'
+LABEL_DIR = '../../../data/datasets/camera/labels'
+INDEX_NAME = 'index.json'
+SHARD_SIZE = 1000
+# Byte yang di-prefetch ke page cache di depan posisi baca (posix_fadvise WILLNEED)
+PREFETCH_BYTES = 64 * 1024 * 1024
+
+def shard_name(shard_id):
+    return f"shard-{shard_id:06d}.tar"
+
+def is_shard_dir(path):
+    return os.path.isfile(os.path.join(str(path), INDEX_NAME))
+
+def _add_member(tar, name, data):
+    """Tambah satu file ke tar; return offset byte data di dalam file tar."""
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = 0
+    offset = tar.offset + len(info.tobuf(tar.format, tar.encoding, tar.errors))
+    tar.addfile(info, io.BytesIO(data))
+    return offset
+
+def write_shards(image_dir, images, out_dir, shard_size=SHARD_SIZE, label_text=None):
+    """
+    Tulis list image (urutan dipertahankan) ke shard tar di out_dir. label_text(img_file) -> isi
+    label YOLO (string, boleh kosong). Return jumlah shard.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for entry in os.scandir(out_dir):
+        if entry.name.startswith('shard-') and entry.name.endswith('.tar'):
+            os.unlink(entry.path)
+    shards = []
+    for shard_id, start in enumerate(range(0, len(images), shard_size)):
+        samples = []
+        path = os.path.join(out_dir, shard_name(shard_id))
+        with tarfile.open(path, 'w', format=tarfile.USTAR_FORMAT) as tar:
+            for img_file in tqdm(images[start:start + shard_size], desc=f"  {shard_name(shard_id)}", unit='file'):
+                key = os.path.splitext(img_file)[0]
+                src = os.path.join(image_dir, img_file)
+                with open(src, 'rb') as f:
+                    data = f.read()
+                size = jpeg_size(src) or (0, 0)
+                text = label_text(img_file) if label_text else ''
+                offset = _add_member(tar, key + '.jpg', data)
+                _add_member(tar, key + '.txt', text.encode())
+                samples.append([key, offset, len(data), size[0], size[1], text])
+        shards.append({'file': shard_name(shard_id), 'bytes': os.path.getsize(path), 'samples': samples})
+
+    tmp_path = os.path.join(out_dir, INDEX_NAME + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump({'shard_size': shard_size, 'num_images': len(images), 'shards': shards}, f)
+    os.replace(tmp_path, os.path.join(out_dir, INDEX_NAME))
+    return len(shards)
+
+def txt_label_reader(label_dir):
+    def read(img_file):
+        path = os.path.join(label_dir, os.path.splitext(img_file)[0] + '.txt')
+        if not os.path.exists(path):
+            return ''
+        with open(path) as f:
+            return f.read()
+    return read
+
+class ShardReader:
+    """
+    Reader shard: gambar ke-i dibaca dengan satu pread dari file tar. Saat pertama kali masuk ke
+    sebuah shard, sisa shard di-prefetch ke page cache sehingga pembacaan berurutan menjadi
+    sequential I/O. Aman dipakai setelah fork (pread tidak memakai posisi file bersama).
+    """
+
+    def __init__(self, shard_dir, prefetch_bytes=PREFETCH_BYTES):
+        self.shard_dir = str(shard_dir)
+        self.prefetch_bytes = prefetch_bytes
+        with open(os.path.join(self.shard_dir, INDEX_NAME)) as f:
+            index = json.load(f)
+        self.shard_files = [shard['file'] for shard in index['shards']]
+        self.keys, self.shard_ids, self.offsets, self.sizes, self.shapes, self.labels = [], [], [], [], [], []
+        for shard_id, shard in enumerate(index['shards']):
+            for key, offset, size, width, height, text in shard['samples']:
+                self.keys.append(key)
+                self.shard_ids.append(shard_id)
+                self.offsets.append(offset)
+                self.sizes.append(size)
+                self.shapes.append((height, width))
+                self.labels.append(text)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self._fds = {}
+        self._prefetched = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getstate__(self):
+        # File descriptor tidak ikut dipickle (DataLoader worker di Windows/spawn), dibuka ulang
+        state = self.__dict__.copy()
+        state['_fds'] = {}
+        state['_prefetched'] = {}
+        return state
+
+    def _fd(self, shard_id):
+        fd = self._fds.get(shard_id)
+        if fd is None:
+            fd = self._fds[shard_id] = os.open(os.path.join(self.shard_dir, self.shard_files[shard_id]),
+                                               os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        return fd
+
+    def _prefetch(self, shard_id, offset):
+        if not hasattr(os, 'posix_fadvise') or not self.prefetch_bytes:
+            return
+        # Prefetch ulang setiap kali posisi baca melewati setengah jendela sebelumnya
+        if offset < self._prefetched.get(shard_id, -1):
+            return
+        os.posix_fadvise(self._fd(shard_id), offset, self.prefetch_bytes, os.POSIX_FADV_WILLNEED)
+        self._prefetched[shard_id] = offset + self.prefetch_bytes // 2
+
+    def read(self, i):
+        """Byte JPEG gambar ke-i."""
+        shard_id, offset, size = self.shard_ids[i], self.offsets[i], self.sizes[i]
+        self._prefetch(shard_id, offset)
+        fd = self._fd(shard_id)
+        if hasattr(os, 'pread'):
+            return os.pread(fd, size, offset)
+        os.lseek(fd, offset, os.SEEK_SET)
+        return os.read(fd, size)
+
+    def iter_sequential(self, indices=None, queue_size=64):
+        """Yield (i, bytes) berurutan; pembacaan dilakukan thread terpisah di depan konsumen."""
+        indices = range(len(self)) if indices is None else indices
+        buf = queue.Queue(maxsize=queue_size)
+        done = object()
+
+        def producer():
+            try:
+                for i in indices:
+                    buf.put((i, self.read(i)))
+            finally:
+                buf.put(done)
+
+        thread = threading.Thread(target=producer, daemon=True)
+        thread.start()
+        while True:
+            item = buf.get()
+            if item is done:
+                break
+            yield item
+        thread.join()
+
+    def close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+
+def _decode(data):
+    import cv2
+    import numpy as np
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def run_benchmark(image_dir, shard_dir, limit=None, decode=True):
+    """Bandingkan gambar/detik: baca file lepas vs baca shard berurutan (opsional + decode)."""
+    reader = ShardReader(shard_dir)
+    keys = reader.keys[:limit] if limit else reader.keys
+    print(f"\n=== Benchmark baca {len(keys)} gambar ({'read + decode' if decode else 'read saja'}) ===")
+    print("  Catatan: kosongkan page cache (echo 3 > /proc/sys/vm/drop_caches) agar angka disk dingin akurat.")
+
+    start = time.perf_counter()
+    for key in keys:
+        with open(os.path.join(image_dir, key + '.jpg'), 'rb') as f:
+            data = f.read()
+        if decode:
+            _decode(data)
+    loose = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _, data in reader.iter_sequential(range(len(keys))):
+        if decode:
+            _decode(data)
+    sharded = time.perf_counter() - start
+    reader.close()
+
+    for name, elapsed in (('loose', loose), ('shards', sharded)):
+        rate = len(keys) / elapsed if elapsed > 0 else float('inf')
+        print(f"- {name:6s}: {elapsed:.3f} detik ({rate:.0f} gambar/detik)")
+    print()
+
+def main():
+    parser = argparse.ArgumentParser(description="Shard tar (image + label + index) untuk training kamera.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('write', help="Tulis shard dari folder images/<split> dan labels/<split>.")
+    p.add_argument('--image-dir', default=IMAGE_DIR)
+    p.add_argument('--label-dir', default=LABEL_DIR)
+    p.add_argument('--out-dir', default=SHARD_ROOT)
+    p.add_argument('--splits', nargs='+', default=['train', 'val'])
+    p.add_argument('--shard-size', type=int, default=SHARD_SIZE, help="Jumlah gambar per shard.")
+    p = sub.add_parser('bench', help="Bandingkan gambar/detik file lepas vs shard.")
+    p.add_argument('--image-dir', default=os.path.join(IMAGE_DIR, 'train'))
+    p.add_argument('--shard-dir', default=os.path.join(SHARD_ROOT, 'train'))
+    p.add_argument('--limit', type=int, default=None)
+    p.add_argument('--no-decode', action='store_true', help="Ukur I/O saja tanpa decode JPEG.")
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        run_benchmark(args.image_dir, args.shard_dir, args.limit, not args.no_decode)
+        return
+    for split in args.splits:
+        image_dir = os.path.join(args.image_dir, split)
+        if not os.path.isdir(image_dir):
+            print(f"Lewati split '{split}': {image_dir} tidak ada")
+            continue
+        images = sorted(e.name for e in os.scandir(image_dir) if e.name.lower().endswith('.jpg'))
+        out_dir = os.path.join(args.out_dir, split)
+        count = write_shards(image_dir, images, out_dir, args.shard_size,
+                             txt_label_reader(os.path.join(args.label_dir, split)))
+        print(f"Split '{split}': {len(images)} gambar -> {count} shard di {out_dir}")
+
+if __name__ == "__main__":
+    main()
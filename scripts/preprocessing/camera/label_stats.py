@@ -0,0 +1,316 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import numpy as np
+from tqdm import tqdm
+from nuscenes_to_yolo import CAMERAS, CLASS_MAPPING, IMG_HEIGHT, IMG_WIDTH, LABEL_OUT_DIR, IMAGE_OUT_DIR, MANIFEST_PATH
+from packed_labels import PackedLabels
+from split_yolo_dataset import OUT_ROOT, SPLIT_META_PATH, SPLITS
+from verify_camera_data import jpeg_size
+
+# Index statistik label kamera (kolom NumPy, dibaca dengan np.load(mmap_mode='r')):
+#   boxes/<kolom>.npy   satu baris per box: image, class, cx, cy, w, h (ternormalisasi), w_px, h_px,
+#                       camera, scene, split (kolom gambar diulang per box agar filter tidak perlu join)
+#   images/<kolom>.npy  satu baris per gambar: width, height, camera, scene, split, num_boxes
+#   meta.json           nama gambar/kamera/scene/split (index kolom integer), sumber & waktu build
+# Query (filter + histogram) hanya operasi vektor di atas kolom -> milidetik walau jutaan box.
+STATS_DIR = '../../../data/meta/label_stats'
+PIPELINE_SPLIT_STATE = '../../../data/meta/pipeline/split.json'
+BOX_COLUMNS = {
+    'image': np.int32, 'class': np.int16, 'cx': np.float32, 'cy': np.float32, 'w': np.float32, 'h': np.float32,
+    'w_px': np.float32, 'h_px': np.float32, 'camera': np.int8, 'scene': np.int32, 'split': np.int8,
+}
+IMAGE_COLUMNS = {
+    'width': np.int32, 'height': np.int32, 'camera': np.int8, 'scene': np.int32, 'split': np.int8,
+    'num_boxes': np.int32,
+}
+# Batas ukuran box ala COCO (akar luas piksel): small < 32, medium < 96, large sisanya
+SIZE_BINS = (0, 8, 16, 32, 64, 96, 128, 256, 512, 4096)
+
+def load_manifest_index(manifest_path=MANIFEST_PATH):
+    """image -> (channel, scene_token) dari manifest konversi (baris terakhir menang)."""
+    index = {}
+    if not os.path.exists(manifest_path):
+        return index
+    with open(manifest_path) as f:
+        next(f, None)
+        for line in f:
+            parts = line.rstrip('\n').split(',')
+            if len(parts) == 4:
+                index[parts[3]] = (parts[2], parts[1])
+    return index
+
+def _pipeline_state_current(out_root, split_state, split_meta=SPLIT_META_PATH):
+    """
+    State pipeline hanya dipakai jika untuk out_root yang sama dan tidak lebih lama dari ringkasan split
+    (split_yolo_dataset.py menulis ulang ringkasan itu saat folder split dibuat ulang di luar pipeline).
+    """
+    if not os.path.exists(split_state):
+        return None
+    with open(split_state) as f:
+        state = json.load(f)
+    if state.get('params', {}).get('out_root') != os.path.abspath(out_root):
+        return None
+    if os.path.exists(split_meta) and os.path.getmtime(split_meta) > os.path.getmtime(split_state):
+        return None
+    return state
+
+def load_split_index(out_root=OUT_ROOT, split_state=PIPELINE_SPLIT_STATE):
+    """
+    image -> split. Sumber (yang pertama ada): state pipeline split (jika masih terbaru untuk out_root ini),
+    folder images/<split>/, atau daftar <split>.txt (materialize list).
+    """
+    state = _pipeline_state_current(out_root, split_state)
+    if state is not None:
+        return {name: entry[0] for name, entry in state.get('images', {}).items()}
+    index = {}
+    for split in SPLITS:
+        image_dir = os.path.join(out_root, 'images', split)
+        list_path = os.path.join(out_root, f'{split}.txt')
+        if os.path.isdir(image_dir):
+            index.update((e.name, split) for e in os.scandir(image_dir) if e.name.lower().endswith('.jpg'))
+        elif os.path.exists(list_path):
+            with open(list_path) as f:
+                index.update((os.path.basename(line.strip()), split) for line in f if line.strip())
+    return index
+
+def camera_from_name(image_name):
+    """Nama file nuScenes: <log>__<CHANNEL>__<timestamp>.jpg."""
+    parts = image_name.split('__')
+    return parts[1] if len(parts) == 3 else None
+
+def _read_txt(path):
+    try:
+        with open(path) as f:
+            rows = [line.split()[:5] for line in f if line.strip()]
+    except FileNotFoundError:
+        rows = []
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 4), dtype=np.float32)
+    values = np.array(rows, dtype=np.float64)
+    return values[:, 0].astype(np.int64), values[:, 1:].astype(np.float32)
+
+def build_stats(label_dir=LABEL_OUT_DIR, image_dir=IMAGE_OUT_DIR, out_dir=STATS_DIR, packed_dir=None,
+                manifest_path=MANIFEST_PATH, out_root=OUT_ROOT, split_state=PIPELINE_SPLIT_STATE):
+    """Bangun index dari label .txt (atau store terpaket) + manifest + split. Ditulis atomik ke out_dir."""
+    packed = PackedLabels(packed_dir) if packed_dir else None
+    if packed is not None:
+        images = sorted(packed.image_names())
+    else:
+        images = sorted(e.name[:-4] + '.jpg' for e in os.scandir(label_dir) if e.name.endswith('.txt'))
+    manifest = load_manifest_index(manifest_path)
+    splits = load_split_index(out_root, split_state)
+    cameras = list(CAMERAS)
+    scenes = sorted({scene for _, scene in manifest.values()})
+    scene_ids = {scene: i for i, scene in enumerate(scenes)}
+
+    image_cols = {name: np.zeros(len(images), dtype=dtype) for name, dtype in IMAGE_COLUMNS.items()}
+    classes, boxes = [], []
+    for i, image_name in enumerate(tqdm(images, desc="Index label", unit='file')):
+        if packed is not None:
+            class_ids, image_boxes = packed.labels(image_name)
+        else:
+            class_ids, image_boxes = _read_txt(os.path.join(label_dir, image_name[:-4] + '.txt'))
+        size = jpeg_size(os.path.join(image_dir, image_name)) if os.path.exists(
+            os.path.join(image_dir, image_name)) else None
+        width, height = size if size is not None else (IMG_WIDTH, IMG_HEIGHT)
+        channel, scene = manifest.get(image_name, (camera_from_name(image_name), None))
+        if channel is not None and channel not in cameras:
+            cameras.append(channel)
+        image_cols['width'][i] = width
+        image_cols['height'][i] = height
+        image_cols['camera'][i] = cameras.index(channel) if channel is not None else -1
+        image_cols['scene'][i] = scene_ids.get(scene, -1)
+        image_cols['split'][i] = SPLITS.index(splits[image_name]) if image_name in splits else -1
+        image_cols['num_boxes'][i] = len(class_ids)
+        classes.append(np.asarray(class_ids, dtype=np.int64))
+        boxes.append(np.asarray(image_boxes, dtype=np.float32).reshape(-1, 4))
+
+    image_index = np.repeat(np.arange(len(images)), image_cols['num_boxes'])
+    all_boxes = np.concatenate(boxes) if boxes else np.zeros((0, 4), dtype=np.float32)
+    box_cols = {
+        'image': image_index,
+        'class': np.concatenate(classes) if classes else np.zeros(0),
+        'cx': all_boxes[:, 0], 'cy': all_boxes[:, 1], 'w': all_boxes[:, 2], 'h': all_boxes[:, 3],
+        'w_px': all_boxes[:, 2] * image_cols['width'][image_index],
+        'h_px': all_boxes[:, 3] * image_cols['height'][image_index],
+        'camera': image_cols['camera'][image_index],
+        'scene': image_cols['scene'][image_index],
+        'split': image_cols['split'][image_index],
+    }
+
+    tmp_dir = out_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    for group, columns, dtypes in (('boxes', box_cols, BOX_COLUMNS), ('images', image_cols, IMAGE_COLUMNS)):
+        os.makedirs(os.path.join(tmp_dir, group))
+        for name, dtype in dtypes.items():
+            np.save(os.path.join(tmp_dir, group, name + '.npy'), np.ascontiguousarray(columns[name], dtype=dtype))
+    names = [None] * (max(CLASS_MAPPING.values()) + 1)
+    for name, class_id in CLASS_MAPPING.items():
+        names[class_id] = name
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump({
+            'images': images, 'cameras': cameras, 'scenes': scenes, 'splits': list(SPLITS), 'class_names': names,
+            'source': os.path.abspath(packed_dir or label_dir), 'built': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }, f)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return len(images), len(image_index)
+
+class LabelStats:
+    """
+    Reader index statistik. Kolom box di self.boxes[nama], kolom gambar di self.images[nama] (memmap).
+    mask(...) -> boolean per box; hasilnya dipakai count/histogram/image_ids.
+    """
+
+    def __init__(self, path=STATS_DIR):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.boxes = {name: np.load(os.path.join(path, 'boxes', name + '.npy'), mmap_mode='r') for name in BOX_COLUMNS}
+        self.images = {name: np.load(os.path.join(path, 'images', name + '.npy'), mmap_mode='r')
+                       for name in IMAGE_COLUMNS}
+        self.image_names = self.meta['images']
+        self.class_names = self.meta['class_names']
+
+    def __len__(self):
+        return len(self.boxes['class'])
+
+    def _ids(self, values, names):
+        """Nama atau id -> array id (None = tanpa filter)."""
+        if values is None:
+            return None
+        if isinstance(values, (str, int, np.integer)):
+            values = [values]
+        ids = []
+        for value in values:
+            if isinstance(value, str) and not value.lstrip('-').isdigit():
+                if value not in names:
+                    raise ValueError(f"Nilai tidak dikenal: {value}")
+                ids.append(names.index(value))
+            else:
+                ids.append(int(value))
+        return np.array(ids)
+
+    def size(self):
+        """Ukuran box dalam piksel = akar luas (definisi small/medium/large COCO)."""
+        return np.sqrt(np.asarray(self.boxes['w_px'], dtype=np.float32) * self.boxes['h_px'])
+
+    def mask(self, classes=None, split=None, camera=None, scene=None, min_size=None, max_size=None):
+        """
+        Filter box. classes/split/camera/scene: nama atau id (tunggal atau list); scene boleh token.
+        min_size <= size < max_size dalam piksel (lihat size()).
+        """
+        keep = np.ones(len(self), dtype=bool)
+        for column, values, names in (('class', classes, self.class_names), ('split', split, self.meta['splits']),
+                                      ('camera', camera, self.meta['cameras']), ('scene', scene, self.meta['scenes'])):
+            ids = self._ids(values, names)
+            if ids is not None:
+                keep &= np.isin(self.boxes[column], ids)
+        if min_size is not None or max_size is not None:
+            size = self.size()
+            if min_size is not None:
+                keep &= size >= min_size
+            if max_size is not None:
+                keep &= size < max_size
+        return keep
+
+    def count(self, **filters):
+        return int(np.count_nonzero(self.mask(**filters)))
+
+    def histogram(self, by='class', mask=None, bins=SIZE_BINS):
+        """
+        Jumlah box per nilai kolom (class/split/camera/scene) atau per bin ukuran (by='size').
+        Return list (label, jumlah).
+        """
+        keep = slice(None) if mask is None else mask
+        if by == 'size':
+            counts, edges = np.histogram(self.size()[keep], bins=bins)
+            return [(f"{int(edges[i])}-{int(edges[i + 1])}px", int(c)) for i, c in enumerate(counts)]
+        names = {'class': self.class_names, 'split': self.meta['splits'], 'camera': self.meta['cameras'],
+                 'scene': self.meta['scenes']}[by]
+        values = np.asarray(self.boxes[by][keep], dtype=np.int64)
+        counts = np.bincount(values[values >= 0], minlength=len(names))
+        result = [(names[i] if names[i] is not None else str(i), int(c)) for i, c in enumerate(counts)]
+        if np.any(values < 0):
+            result.append(('(tidak diketahui)', int(np.count_nonzero(values < 0))))
+        return result
+
+    def image_ids(self, mask=None):
+        """Index gambar unik yang memuat minimal satu box lolos filter."""
+        image = self.boxes['image'] if mask is None else self.boxes['image'][mask]
+        return np.unique(image)
+
+    def image_class_counts(self, num_classes=None):
+        """Matriks (jumlah gambar, jumlah kelas) box per kelas per gambar, mis. untuk bobot sampling."""
+        num_classes = num_classes or len(self.class_names)
+        counts = np.zeros((len(self.image_names), num_classes), dtype=np.int32)
+        classes = np.asarray(self.boxes['class'], dtype=np.int64)
+        valid = (classes >= 0) & (classes < num_classes)
+        np.add.at(counts, (np.asarray(self.boxes['image'])[valid], classes[valid]), 1)
+        return counts
+
+def print_histogram(rows, title):
+    total = sum(count for _, count in rows)
+    width = max((len(label) for label, _ in rows), default=0)
+    peak = max((count for _, count in rows), default=0)
+    print(f"\n=== {title} ({total} box) ===")
+    for label, count in rows:
+        bar = '#' * int(round(40 * count / peak)) if peak else ''
+        print(f"{label:<{width}s} {count:>9d} {count / total * 100 if total else 0:6.2f}% {bar}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Index statistik label kamera (kolom memory-mapped) dan query cepat.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('build', help="Bangun index dari label, manifest konversi dan split.")
+    p.add_argument('--label-dir', default=LABEL_OUT_DIR)
+    p.add_argument('--image-dir', default=IMAGE_OUT_DIR)
+    p.add_argument('--packed-dir', default=None, help="Baca label dari store terpaket.")
+    p.add_argument('--manifest', default=MANIFEST_PATH)
+    p.add_argument('--out-root', default=OUT_ROOT, help="Root dataset split (images/<split>/ atau <split>.txt).")
+    p.add_argument('--stats-dir', default=STATS_DIR)
+    p = sub.add_parser('query', help="Hitung box dengan filter; opsional histogram.")
+    p.add_argument('--stats-dir', default=STATS_DIR)
+    p.add_argument('--classes', nargs='+', help="Nama atau id kelas.")
+    p.add_argument('--split', nargs='+', help="train/val/test.")
+    p.add_argument('--camera', nargs='+', help="Channel kamera, mis. CAM_FRONT.")
+    p.add_argument('--scene', nargs='+', help="Token scene.")
+    p.add_argument('--min-size', type=float, help="Ukuran minimum (akar luas, piksel).")
+    p.add_argument('--max-size', type=float, help="Ukuran maksimum (eksklusif), mis. 32 untuk box kecil.")
+    p.add_argument('--hist', nargs='*', choices=('class', 'size', 'split', 'camera', 'scene'), default=[],
+                   help="Tampilkan histogram box yang lolos filter.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.command == 'build':
+        start = time.time()
+        num_images, num_boxes = build_stats(args.label_dir, args.image_dir, args.stats_dir, args.packed_dir,
+                                            args.manifest, args.out_root)
+        print(f"Index: {num_images} gambar, {num_boxes} box dalam {time.time() - start:.2f} detik -> {args.stats_dir}")
+        return
+
+    start = time.perf_counter()
+    stats = LabelStats(args.stats_dir)
+    load_ms = (time.perf_counter() - start) * 1e3
+    start = time.perf_counter()
+    try:
+        mask = stats.mask(classes=args.classes, split=args.split, camera=args.camera, scene=args.scene,
+                          min_size=args.min_size, max_size=args.max_size)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    count = int(np.count_nonzero(mask))
+    num_images = len(stats.image_ids(mask))
+    query_ms = (time.perf_counter() - start) * 1e3
+    print(f"\n{count} dari {len(stats)} box lolos filter, di {num_images} gambar "
+          f"(load {load_ms:.1f} ms, query {query_ms:.1f} ms)")
+    for by in args.hist:
+        start = time.perf_counter()
+        rows = stats.histogram(by, mask)
+        print_histogram(rows, f"Histogram {by} ({(time.perf_counter() - start) * 1e3:.1f} ms)")
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import os
+import time
+import errno
+import shutil
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Cara "menyalin" file dataset: copy penuh, hardlink, symlink, reflink (copy-on-write),
+# atau auto = reflink -> hardlink -> copy (yang pertama berhasil)
+STRATEGIES = ('copy', 'hardlink', 'symlink', 'reflink', 'auto')
+# ioctl Linux FICLONE (btrfs, XFS dengan reflink=1, dll)
+FICLONE = 0x40049409
+# Error yang berarti strategi tidak didukung di filesystem ini -> fallback
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EMLINK, errno.ENOSYS}
+
+class MaterializeStats:
+    """Jumlah file, byte yang benar-benar ditulis dan waktu per strategi yang dipakai."""
+
+    def __init__(self):
+        self.files = {}
+        self.bytes_written = {}
+        self.seconds = {}
+        self.skipped = 0
+
+    def add(self, strategy, nbytes, seconds):
+        self.files[strategy] = self.files.get(strategy, 0) + 1
+        self.bytes_written[strategy] = self.bytes_written.get(strategy, 0) + nbytes
+        self.seconds[strategy] = self.seconds.get(strategy, 0.0) + seconds
+
+    def merge(self, other):
+        for strategy in other.files:
+            self.files[strategy] = self.files.get(strategy, 0) + other.files[strategy]
+            self.bytes_written[strategy] = self.bytes_written.get(strategy, 0) + other.bytes_written[strategy]
+            self.seconds[strategy] = self.seconds.get(strategy, 0.0) + other.seconds[strategy]
+        self.skipped += other.skipped
+
+    def report(self, title="Materialisasi file"):
+        print(f"\n=== {title} ===")
+        if not self.files:
+            print("- Tidak ada file yang ditulis")
+        for strategy in sorted(self.files):
+            print(f"- {strategy:8s}: {self.files[strategy]} file, "
+                  f"{self.bytes_written[strategy] / 1e6:.1f} MB ditulis, {self.seconds[strategy]:.2f} detik")
+        if self.skipped:
+            print(f"- dilewati (sudah ada): {self.skipped} file")
+
+def _reflink(src, dst):
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflink tidak didukung")
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.unlink(dst)
+            raise
+
+def _try(strategy, src, dst):
+    if strategy == 'copy':
+        shutil.copy2(src, dst)
+        return os.path.getsize(dst)
+    if strategy == 'hardlink':
+        os.link(src, dst)
+        return 0
+    if strategy == 'symlink':
+        os.symlink(os.path.relpath(os.path.abspath(src), os.path.dirname(os.path.abspath(dst))), dst)
+        return 0
+    if strategy == 'reflink':
+        _reflink(src, dst)
+        return 0
+    raise ValueError(f"Strategi tidak dikenal: {strategy}")
+
+def materialize(src, dst, strategy='copy', stats=None, overwrite=False):
+    """
+    Buat dst berisi file src dengan strategi tertentu. Jika strategi tidak didukung
+    filesystem (beda device, tidak ada reflink, dll) otomatis fallback ke copy.
+    Return strategi yang benar-benar dipakai, atau None jika dst sudah ada dan tidak ditimpa.
+    """
+    if os.path.lexists(dst):
+        if not overwrite:
+            if stats is not None:
+                stats.skipped += 1
+            return None
+        os.unlink(dst)
+
+    if strategy == 'auto':
+        chain = ('reflink', 'hardlink', 'copy')
+    elif strategy == 'copy':
+        chain = ('copy',)
+    else:
+        chain = (strategy, 'copy')
+    start = time.perf_counter()
+    for candidate in chain:
+        try:
+            nbytes = _try(candidate, src, dst)
+        except OSError as e:
+            if candidate == 'copy' or e.errno not in _FALLBACK_ERRNOS:
+                raise
+            continue
+        if stats is not None:
+            stats.add(candidate, nbytes, time.perf_counter() - start)
+        return candidate
@@ -0,0 +1,417 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+
+TOKEN_DTYPE = 'S32'
+# Tabel minimum untuk konversi kamera (sensor & instance kecil, dibutuhkan untuk channel & kategori)
+LITE_TABLES = ('category', 'sensor', 'calibrated_sensor', 'ego_pose', 'instance',
+               'sample', 'sample_data', 'sample_annotation')
+# Kolom hasil parse JSON disimpan sebagai .npy (di samping transform cache) agar worker cukup
+# memmap, bukan parse ulang JSON di setiap proses. Path absolut: dipakai skrip di kedalaman berbeda.
+CACHE_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                          '..', '..', '..', 'data', 'meta', 'nuscenes_lite'))
+
+class ColumnTable:
+    """
+    Satu tabel nuScenes dalam bentuk kolom NumPy. Baris mengikuti urutan JSON;
+    lookup token -> baris lewat binary search pada token yang sudah diurutkan.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = np.asarray(tokens, dtype=TOKEN_DTYPE)
+        self._sort_idx = np.argsort(self.tokens, kind='stable')
+        self._sorted_tokens = self.tokens[self._sort_idx]
+
+    @classmethod
+    def from_arrays(cls, tokens, sort_idx, sorted_tokens):
+        table = cls.__new__(cls)
+        table.tokens, table._sort_idx, table._sorted_tokens = tokens, sort_idx, sorted_tokens
+        return table
+
+    def arrays(self):
+        return {'tokens': self.tokens, 'sort_idx': self._sort_idx, 'sorted_tokens': self._sorted_tokens}
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def rows(self, tokens):
+        """Baris untuk array token; token kosong/tidak dikenal -> -1."""
+        keys = np.asarray(tokens, dtype=TOKEN_DTYPE)
+        if len(self.tokens) == 0:
+            return np.full(keys.shape, -1, dtype=np.int32)
+        pos = np.minimum(np.searchsorted(self._sorted_tokens, keys), len(self.tokens) - 1)
+        found = self._sorted_tokens[pos] == keys
+        return np.where(found, self._sort_idx[pos], -1).astype(np.int32)
+
+    def row(self, token):
+        row = int(self.rows([token])[0])
+        if row < 0:
+            raise KeyError(token)
+        return row
+
+    def token(self, row):
+        return self.tokens[row].decode() if row >= 0 else ''
+
+def _load_json(dataroot, version, table):
+    with open(os.path.join(dataroot, version, f'{table}.json')) as f:
+        return json.load(f)
+
+class _RecordList:
+    """Sequence ringan seperti nusc.sample: record dict dibuat saat diakses."""
+
+    def __init__(self, nusc, table):
+        self._nusc = nusc
+        self._table = table
+
+    def __len__(self):
+        return len(self._nusc.tables[self._table])
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._nusc.record(self._table, row) for row in range(*item.indices(len(self)))]
+        return self._nusc.record(self._table, item)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self._nusc.record(self._table, row)
+
+class NuScenesLite:
+    """
+    Loader nuScenes hemat memori untuk preprocessing. Hanya membaca LITE_TABLES dan
+    menyimpannya sebagai array kolom (referensi antar tabel = index baris int32),
+    bukan dict-of-dicts. API yang dipakai konversi kamera kompatibel dengan NuScenes:
+    nusc.sample, nusc.get(table, token) termasuk sample['data'], sample['anns'],
+    sample_data['channel'] dan sample_annotation['category_name'].
+
+    channels       : hanya simpan sample_data dari channel ini (None = semua)
+    keyframes_only : hanya simpan sample_data keyframe (sweep dibuang)
+    Referensi prev/next ke sample_data yang dibuang menjadi ''.
+    """
+
+    def __init__(self, version='v1.0-mini', dataroot='../../../data/raw/nuscenes', verbose=True,
+                 channels=None, keyframes_only=False):
+        self.version = version
+        self.dataroot = dataroot
+        self.tables = {}
+        self.columns = {}
+        start = time.time()
+        if verbose:
+            print(f"Loading NuScenesLite tables for version {version} ...")
+
+        self._load_category_sensor()
+        self._load_sample_data(channels, keyframes_only)
+        self._load_calibrated_sensor()
+        self._load_ego_pose()
+        self._load_sample()
+        self._load_sample_annotation()
+        self._build_reverse_index()
+
+        if verbose:
+            for table in LITE_TABLES:
+                print(f"{len(self.tables[table])} {table},")
+            print(f"Done loading in {time.time() - start:.3f} seconds.")
+
+    # --- load per tabel -------------------------------------------------
+    def _load_category_sensor(self):
+        categories = _load_json(self.dataroot, self.version, 'category')
+        self.tables['category'] = ColumnTable([c['token'] for c in categories])
+        self.category_names = [c['name'] for c in categories]
+
+        sensors = _load_json(self.dataroot, self.version, 'sensor')
+        self.tables['sensor'] = ColumnTable([s['token'] for s in sensors])
+        self.channels = [s['channel'] for s in sensors]
+        self.modalities = [s['modality'] for s in sensors]
+
+        instances = _load_json(self.dataroot, self.version, 'instance')
+        self.tables['instance'] = ColumnTable([i['token'] for i in instances])
+        self.columns['instance'] = {
+            'category': self.tables['category'].rows([i['category_token'] for i in instances]),
+        }
+
+    def _load_sample_data(self, channels, keyframes_only):
+        records = _load_json(self.dataroot, self.version, 'sample_data')
+        calibs = _load_json(self.dataroot, self.version, 'calibrated_sensor')
+        # Channel sample_data diketahui lewat calibrated_sensor -> sensor
+        sensor_rows = self.tables['sensor'].rows([c['sensor_token'] for c in calibs])
+        calib_channel = {c['token']: int(row) for c, row in zip(calibs, sensor_rows)}
+        wanted = None if channels is None else {self.channels.index(ch) for ch in channels if ch in self.channels}
+        keep = [
+            sd for sd in records
+            if (not keyframes_only or sd['is_key_frame'])
+            and (wanted is None or calib_channel[sd['calibrated_sensor_token']] in wanted)
+        ]
+        del records
+        self._calibs_json = calibs
+        self.tables['sample_data'] = ColumnTable([sd['token'] for sd in keep])
+        self.columns['sample_data'] = {
+            'channel': np.array([calib_channel[sd['calibrated_sensor_token']] for sd in keep], dtype=np.int16),
+            'timestamp': np.array([sd['timestamp'] for sd in keep], dtype=np.int64),
+            'is_key_frame': np.array([sd['is_key_frame'] for sd in keep], dtype=bool),
+            'width': np.array([sd['width'] for sd in keep], dtype=np.int32),
+            'height': np.array([sd['height'] for sd in keep], dtype=np.int32),
+            'filename': np.array([sd['filename'] for sd in keep], dtype='S'),
+            'fileformat': np.array([sd['fileformat'] for sd in keep], dtype='S'),
+        }
+        # Token referensi disimpan sementara, di-resolve setelah tabel tujuan di-load
+        self._pending_sd_refs = {
+            'sample_token': [sd['sample_token'] for sd in keep],
+            'ego_pose_token': [sd['ego_pose_token'] for sd in keep],
+            'calibrated_sensor_token': [sd['calibrated_sensor_token'] for sd in keep],
+        }
+        cols = self.columns['sample_data']
+        cols['prev'] = self.tables['sample_data'].rows([sd['prev'] for sd in keep])
+        cols['next'] = self.tables['sample_data'].rows([sd['next'] for sd in keep])
+
+    def _load_calibrated_sensor(self):
+        calibs = self._calibs_json
+        del self._calibs_json
+        self.tables['calibrated_sensor'] = ColumnTable([c['token'] for c in calibs])
+        intrinsics = np.full((len(calibs), 3, 3), np.nan)
+        for i, c in enumerate(calibs):
+            if c['camera_intrinsic']:
+                intrinsics[i] = c['camera_intrinsic']
+        self.columns['calibrated_sensor'] = {
+            'sensor': self.tables['sensor'].rows([c['sensor_token'] for c in calibs]),
+            'translation': np.array([c['translation'] for c in calibs], dtype=np.float64).reshape(-1, 3),
+            'rotation': np.array([c['rotation'] for c in calibs], dtype=np.float64).reshape(-1, 4),
+            'camera_intrinsic': intrinsics,
+        }
+
+    def _load_ego_pose(self):
+        # Hanya ego_pose yang dirujuk sample_data yang disimpan
+        needed = set(self._pending_sd_refs['ego_pose_token'])
+        poses = [ep for ep in _load_json(self.dataroot, self.version, 'ego_pose') if ep['token'] in needed]
+        self.tables['ego_pose'] = ColumnTable([ep['token'] for ep in poses])
+        self.columns['ego_pose'] = {
+            'timestamp': np.array([ep['timestamp'] for ep in poses], dtype=np.int64),
+            'translation': np.array([ep['translation'] for ep in poses], dtype=np.float64).reshape(-1, 3),
+            'rotation': np.array([ep['rotation'] for ep in poses], dtype=np.float64).reshape(-1, 4),
+        }
+
+    def _load_sample(self):
+        samples = _load_json(self.dataroot, self.version, 'sample')
+        table = ColumnTable([s['token'] for s in samples])
+        self.tables['sample'] = table
+        scene_tokens = [s['scene_token'] for s in samples]
+        scene_table = ColumnTable(sorted(set(scene_tokens)))
+        self.tables['_scene'] = scene_table
+        self.columns['sample'] = {
+            'timestamp': np.array([s['timestamp'] for s in samples], dtype=np.int64),
+            'scene': scene_table.rows(scene_tokens),
+            'prev': table.rows([s['prev'] for s in samples]),
+            'next': table.rows([s['next'] for s in samples]),
+        }
+
+        refs = self._pending_sd_refs
+        del self._pending_sd_refs
+        cols = self.columns['sample_data']
+        cols['sample'] = table.rows(refs['sample_token'])
+        cols['ego_pose'] = self.tables['ego_pose'].rows(refs['ego_pose_token'])
+        cols['calibrated_sensor'] = self.tables['calibrated_sensor'].rows(refs['calibrated_sensor_token'])
+
+    def _load_sample_annotation(self):
+        anns = _load_json(self.dataroot, self.version, 'sample_annotation')
+        self.tables['sample_annotation'] = ColumnTable([a['token'] for a in anns])
+        instance_rows = self.tables['instance'].rows([a['instance_token'] for a in anns])
+        self.columns['sample_annotation'] = {
+            'sample': self.tables['sample'].rows([a['sample_token'] for a in anns]),
+            'instance': instance_rows,
+            'category': self.columns['instance']['category'][instance_rows],
+            'translation': np.array([a['translation'] for a in anns], dtype=np.float64).reshape(-1, 3),
+            'size': np.array([a['size'] for a in anns], dtype=np.float64).reshape(-1, 3),
+            'rotation': np.array([a['rotation'] for a in anns], dtype=np.float64).reshape(-1, 4),
+        }
+
+    def _build_reverse_index(self):
+        """sample['data'] sebagai matriks (sample, channel) dan sample['anns'] sebagai CSR."""
+        n_samples = len(self.tables['sample'])
+        sd = self.columns['sample_data']
+        data = np.full((n_samples, len(self.channels)), -1, dtype=np.int32)
+        key = sd['is_key_frame'] & (sd['sample'] >= 0)
+        data[sd['sample'][key], sd['channel'][key]] = np.nonzero(key)[0]
+        self._sample_data_index = data
+
+        ann_sample = self.columns['sample_annotation']['sample']
+        order = np.argsort(ann_sample, kind='stable').astype(np.int32)
+        counts = np.bincount(ann_sample[ann_sample >= 0], minlength=n_samples)
+        offsets = np.zeros(n_samples + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        self._ann_order = order[np.count_nonzero(ann_sample < 0):]
+        self._ann_offsets = offsets
+
+    # --- cache kolom ------------------------------------------------------
+    def _arrays(self):
+        """Semua array NumPy loader: nama file .npy -> array."""
+        arrays = {}
+        for table_name, table in self.tables.items():
+            for key, value in table.arrays().items():
+                arrays[f'table.{table_name}.{key}'] = value
+        for table_name, cols in self.columns.items():
+            for key, value in cols.items():
+                arrays[f'column.{table_name}.{key}'] = value
+        arrays['index.sample_data'] = self._sample_data_index
+        arrays['index.ann_order'] = self._ann_order
+        arrays['index.ann_offsets'] = self._ann_offsets
+        return arrays
+
+    def save(self, out_dir, fingerprint):
+        """Tulis kolom ke out_dir (atomik: folder sementara lalu rename)."""
+        tmp_dir = f'{out_dir}.tmp{os.getpid()}'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        arrays = self._arrays()
+        for name, value in arrays.items():
+            np.save(os.path.join(tmp_dir, name + '.npy'), value)
+        meta = {'version': self.version, 'arrays': list(arrays),
+                'category_names': self.category_names, 'channels': self.channels, 'modalities': self.modalities}
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        with open(os.path.join(tmp_dir, 'fingerprint.json'), 'w') as f:
+            json.dump(fingerprint, f)
+        shutil.rmtree(out_dir, ignore_errors=True)
+        try:
+            os.replace(tmp_dir, out_dir)
+        except OSError:
+            # Proses lain sudah menulis cache yang sama lebih dulu
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def from_cache(cls, cache_dir, dataroot):
+        """Buka cache kolom secara memory-mapped (halaman dibagi antar proses lewat page cache)."""
+        with open(os.path.join(cache_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        nusc = cls.__new__(cls)
+        nusc.version, nusc.dataroot = meta['version'], dataroot
+        nusc.category_names, nusc.channels, nusc.modalities = meta['category_names'], meta['channels'], meta['modalities']
+        arrays = {name: np.load(os.path.join(cache_dir, name + '.npy'), mmap_mode='r') for name in meta['arrays']}
+        tables, nusc.columns = {}, {}
+        for name, value in arrays.items():
+            kind, _, rest = name.partition('.')
+            table_name, _, key = rest.rpartition('.')
+            if kind == 'table':
+                tables.setdefault(table_name, {})[key] = value
+            elif kind == 'column':
+                nusc.columns.setdefault(table_name, {})[key] = value
+        nusc.tables = {name: ColumnTable.from_arrays(**parts) for name, parts in tables.items()}
+        nusc._sample_data_index = arrays['index.sample_data']
+        nusc._ann_order = arrays['index.ann_order']
+        nusc._ann_offsets = arrays['index.ann_offsets']
+        return nusc
+
+    # --- API kompatibel NuScenes ----------------------------------------
+    @property
+    def sample(self):
+        return _RecordList(self, 'sample')
+
+    def get(self, table_name, token):
+        return self.record(table_name, self.tables[table_name].row(token))
+
+    def sample_annotation_rows(self, sample_row):
+        return self._ann_order[self._ann_offsets[sample_row]:self._ann_offsets[sample_row + 1]]
+
+    def record(self, table_name, row):
+        tables = self.tables
+        if table_name == 'sample':
+            cols = self.columns['sample']
+            sd_rows = self._sample_data_index[row]
+            return {
+                'token': tables['sample'].token(row),
+                'timestamp': int(cols['timestamp'][row]),
+                'scene_token': tables['_scene'].token(cols['scene'][row]),
+                'prev': tables['sample'].token(cols['prev'][row]),
+                'next': tables['sample'].token(cols['next'][row]),
+                'data': {self.channels[ch]: tables['sample_data'].token(sd_row)
+                         for ch, sd_row in enumerate(sd_rows) if sd_row >= 0},
+                'anns': [tables['sample_annotation'].token(r) for r in self.sample_annotation_rows(row)],
+            }
+        if table_name == 'sample_data':
+            cols = self.columns['sample_data']
+            return {
+                'token': tables['sample_data'].token(row),
+                'sample_token': tables['sample'].token(cols['sample'][row]),
+                'ego_pose_token': tables['ego_pose'].token(cols['ego_pose'][row]),
+                'calibrated_sensor_token': tables['calibrated_sensor'].token(cols['calibrated_sensor'][row]),
+                'timestamp': int(cols['timestamp'][row]),
+                'fileformat': cols['fileformat'][row].decode(),
+                'is_key_frame': bool(cols['is_key_frame'][row]),
+                'height': int(cols['height'][row]),
+                'width': int(cols['width'][row]),
+                'filename': cols['filename'][row].decode(),
+                'prev': tables['sample_data'].token(cols['prev'][row]),
+                'next': tables['sample_data'].token(cols['next'][row]),
+                'channel': self.channels[cols['channel'][row]],
+                'sensor_modality': self.modalities[cols['channel'][row]],
+            }
+        if table_name == 'sample_annotation':
+            cols = self.columns['sample_annotation']
+            return {
+                'token': tables['sample_annotation'].token(row),
+                'sample_token': tables['sample'].token(cols['sample'][row]),
+                'instance_token': tables['instance'].token(cols['instance'][row]),
+                'translation': cols['translation'][row].tolist(),
+                'size': cols['size'][row].tolist(),
+                'rotation': cols['rotation'][row].tolist(),
+                'category_name': self.category_names[cols['category'][row]],
+            }
+        if table_name == 'calibrated_sensor':
+            cols = self.columns['calibrated_sensor']
+            intrinsic = cols['camera_intrinsic'][row]
+            return {
+                'token': tables['calibrated_sensor'].token(row),
+                'sensor_token': tables['sensor'].token(cols['sensor'][row]),
+                'translation': cols['translation'][row].tolist(),
+                'rotation': cols['rotation'][row].tolist(),
+                'camera_intrinsic': [] if np.isnan(intrinsic).any() else intrinsic.tolist(),
+            }
+        if table_name == 'ego_pose':
+            cols = self.columns['ego_pose']
+            return {
+                'token': tables['ego_pose'].token(row),
+                'timestamp': int(cols['timestamp'][row]),
+                'translation': cols['translation'][row].tolist(),
+                'rotation': cols['rotation'][row].tolist(),
+            }
+        if table_name == 'category':
+            return {'token': tables['category'].token(row), 'name': self.category_names[row]}
+        if table_name == 'sensor':
+            return {'token': tables['sensor'].token(row), 'channel': self.channels[row],
+                    'modality': self.modalities[row]}
+        if table_name == 'instance':
+            return {'token': tables['instance'].token(row),
+                    'category_token': tables['category'].token(self.columns['instance']['category'][row])}
+        raise KeyError(f"Tabel {table_name} tidak di-load oleh NuScenesLite")
+
+def lite_fingerprint(dataroot, version, channels=None, keyframes_only=False):
+    fingerprint = {'version': version, 'channels': list(channels) if channels is not None else None,
+                   'keyframes_only': bool(keyframes_only)}
+    for table in LITE_TABLES:
+        stat = os.stat(os.path.join(dataroot, version, f'{table}.json'))
+        fingerprint[table] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprint
+
+def load_cached(version='v1.0-mini', dataroot='../../../data/raw/nuscenes', verbose=True,
+                channels=None, keyframes_only=False, cache_dir=CACHE_DIR):
+    """
+    NuScenesLite dari cache kolom .npy jika masih cocok dengan JSON sumber (ukuran/mtime) dan
+    parameter channels/keyframes_only; jika tidak, parse JSON lalu simpan cache. Panggil sekali
+    di proses utama sebelum membuat pool agar worker hanya memmap.
+    """
+    fingerprint = lite_fingerprint(dataroot, version, channels, keyframes_only)
+    key = hashlib.sha1(json.dumps([fingerprint['channels'], fingerprint['keyframes_only']]).encode()).hexdigest()[:12]
+    out_dir = os.path.join(cache_dir, version, key)
+    fingerprint_path = os.path.join(out_dir, 'fingerprint.json')
+    if os.path.exists(fingerprint_path):
+        with open(fingerprint_path) as f:
+            if json.load(f) == fingerprint:
+                nusc = NuScenesLite.from_cache(out_dir, dataroot)
+                if verbose:
+                    print(f"NuScenesLite {version}: kolom dari cache {out_dir}")
+                return nusc
+    nusc = NuScenesLite(version=version, dataroot=dataroot, verbose=verbose,
+                        channels=channels, keyframes_only=keyframes_only)
+    os.makedirs(os.path.dirname(out_dir), exist_ok=True)
+    nusc.save(out_dir, fingerprint)
+    return nusc
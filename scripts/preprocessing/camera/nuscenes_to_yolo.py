@@ -1,11 +1,21 @@
 import os
-import shutil
-from nuscenes.nuscenes import NuScenes
-from nuscenes.utils.data_classes import Box
-from nuscenes.utils.geometry_utils import view_points
-from pyquaternion import Quaternion
+import time
+import argparse
+import json
+import multiprocessing
+from collections import OrderedDict
+from functools import partial
 import numpy as np
 from tqdm import tqdm   # Tambahkan ini
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+from materialize import STRATEGIES, MaterializeStats, materialize
+from nuscenes_lite import load_cached as load_nuscenes_lite
+from packed_labels import PACKED_DIR, PackedLabelWriter, lines_to_arrays
+from projection import annotation_corners, camera_projection_matrix, project_corners
+from transform_cache import TransformCache, load_or_build as load_or_build_transform_cache
 
 CAMERAS = [
     'CAM_FRONT',
@@ -19,6 +29,10 @@ CAMERAS = [
 DATAROOT = '../../../data/raw/nuscenes'
 IMAGE_OUT_DIR = '../../../data/processed/nuscenes/camera/images'
 LABEL_OUT_DIR = '../../../data/processed/nuscenes/camera/labels'
+NUSC_VERSION = 'v1.0-mini'
+# Checkpoint konversi: satu baris per kamera dari setiap sample yang sudah selesai ditulis
+MANIFEST_PATH = '../../../data/meta/nuscenes_camera_manifest.csv'
+MANIFEST_HEADER = 'sample_token,scene_token,channel,image'
 
 CLASS_MAPPING = {
     'human.pedestrian.adult': 0,
@@ -70,72 +84,426 @@ def is_yolo_bbox_valid(x_center, y_center, width, height):
         0.01 < height <= 1.0
     )
 
+def corners_to_yolo_bboxes(corners_2d, img_width=IMG_WIDTH, img_height=IMG_HEIGHT):
+    """Versi batch dari corners_to_yolo_bbox: input (...,8,2), output (...,4) [xc, yc, w, h]."""
+    mins = corners_2d.min(axis=-2)
+    maxs = corners_2d.max(axis=-2)
+    bboxes = np.empty(corners_2d.shape[:-2] + (4,), dtype=np.float64)
+    bboxes[..., 0] = (mins[..., 0] + maxs[..., 0]) / 2.0 / img_width
+    bboxes[..., 1] = (mins[..., 1] + maxs[..., 1]) / 2.0 / img_height
+    bboxes[..., 2] = (maxs[..., 0] - mins[..., 0]) / img_width
+    bboxes[..., 3] = (maxs[..., 1] - mins[..., 1]) / img_height
+    return bboxes
+
+def yolo_bboxes_valid_mask(bboxes):
+    """Versi batch dari is_yolo_bbox_valid."""
+    x_center, y_center, width, height = bboxes[..., 0], bboxes[..., 1], bboxes[..., 2], bboxes[..., 3]
+    with np.errstate(invalid='ignore'):
+        return (
+            (0.0 <= x_center) & (x_center <= 1.0) &
+            (0.0 <= y_center) & (y_center <= 1.0) &
+            (0.01 < width) & (width <= 1.0) &
+            (0.01 < height) & (height <= 1.0)
+        )
+
+def format_label_lines(class_ids, bboxes, mask):
+    return [
+        f"{class_id} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}"
+        for class_id, (x_center, y_center, width, height) in zip(class_ids[mask], bboxes[mask])
+    ]
+
+def process_sample_legacy(nusc, sample):
+    """
+    Jalur lama (per anotasi, per kamera) dengan nuscenes Box. Dipertahankan sebagai
+    referensi output dan baseline benchmark.
+    Return list (camera_data, label_lines) per kamera.
+    """
+    from nuscenes.utils.data_classes import Box
+    from nuscenes.utils.geometry_utils import view_points
+    from pyquaternion import Quaternion
+
+    sample_data = nusc.get('sample', sample['token'])
+    outputs = []
+    for cam in CAMERAS:
+        camera_token = sample_data['data'][cam]
+        camera_data = nusc.get('sample_data', camera_token)
+        calibrated_sensor = nusc.get('calibrated_sensor', camera_data['calibrated_sensor_token'])
+        camera_intrinsic = np.array(calibrated_sensor['camera_intrinsic'])
+        sensor_translation = np.array(calibrated_sensor['translation'])
+        sensor_rotation = Quaternion(calibrated_sensor['rotation'])
+
+        ego_pose = nusc.get('ego_pose', camera_data['ego_pose_token'])
+        ego_translation = np.array(ego_pose['translation'])
+        ego_rotation = Quaternion(ego_pose['rotation'])
+
+        ann_tokens = sample_data['anns']
+        label_lines = []
+
+        for ann_token in ann_tokens:
+            ann = nusc.get('sample_annotation', ann_token)
+            category = ann['category_name']
+            class_id = CLASS_MAPPING.get(category, -1)
+            if class_id == -1:
+                continue
+            box = Box(
+                center=ann['translation'],
+                size=ann['size'],
+                orientation=Quaternion(ann['rotation']),
+                name=category
+            )
+
+            box.translate(-ego_translation)
+            box.rotate(ego_rotation.inverse)
+            box.translate(-sensor_translation)
+            box.rotate(sensor_rotation.inverse)
+
+            corners_3d = box.corners()
+            corners_2d = view_points(corners_3d, camera_intrinsic, normalize=True)
+
+            x_center, y_center, width, height = corners_to_yolo_bbox(corners_2d[:2])
+            valid = is_yolo_bbox_valid(x_center, y_center, width, height)
+            if valid:
+                label_lines.append(f"{class_id} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}")
+        outputs.append((camera_data, label_lines))
+    return outputs
+
+def collect_sample_annotations(nusc, sample):
+    """Kumpulkan class id dan sudut 3D (global) semua anotasi valid dari satu sample."""
+    class_ids = []
+    centers = []
+    sizes = []
+    rotations = []
+    for ann_token in sample['anns']:
+        ann = nusc.get('sample_annotation', ann_token)
+        class_id = CLASS_MAPPING.get(ann['category_name'], -1)
+        if class_id == -1:
+            continue
+        class_ids.append(class_id)
+        centers.append(ann['translation'])
+        sizes.append(ann['size'])
+        rotations.append(ann['rotation'])
+    if not class_ids:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 8, 3))
+    return np.array(class_ids, dtype=np.int64), annotation_corners(centers, sizes, rotations)
+
+def sample_camera_projections(nusc, sample, transform_cache=None):
+    """
+    Ambil sample_data dan matriks proyeksi 3x4 untuk semua kamera dari satu sample.
+    Jika transform_cache diberikan, matriks diambil dari cache tanpa menghitung ulang.
+    """
+    camera_datas = [nusc.get('sample_data', sample['data'][cam]) for cam in CAMERAS]
+    if transform_cache is not None:
+        return camera_datas, transform_cache.projections([sd['token'] for sd in camera_datas])
+
+    projections = np.empty((len(CAMERAS), 3, 4))
+    for i, camera_data in enumerate(camera_datas):
+        calibrated_sensor = nusc.get('calibrated_sensor', camera_data['calibrated_sensor_token'])
+        ego_pose = nusc.get('ego_pose', camera_data['ego_pose_token'])
+        projections[i] = camera_projection_matrix(
+            calibrated_sensor['camera_intrinsic'],
+            calibrated_sensor['translation'], calibrated_sensor['rotation'],
+            ego_pose['translation'], ego_pose['rotation']
+        )
+    return camera_datas, projections
+
+def process_sample_batched(nusc, sample, transform_cache=None):
+    """
+    Jalur batch: semua anotasi sample ditumpuk (N,8,3), transformasi ego+sensor+intrinsic
+    digabung jadi satu matriks per kamera, lalu semua kamera diproyeksikan dalam satu matmul.
+    Output sama dengan process_sample_legacy.
+    """
+    camera_datas, projections = sample_camera_projections(nusc, sample, transform_cache)
+    class_ids, corners = collect_sample_annotations(nusc, sample)
+    if len(class_ids) == 0:
+        return [(camera_data, []) for camera_data in camera_datas]
+
+    bboxes = corners_to_yolo_bboxes(project_corners(corners, projections))  # (C,N,4)
+    masks = yolo_bboxes_valid_mask(bboxes)
+    return [
+        (camera_data, format_label_lines(class_ids, bboxes[i], masks[i]))
+        for i, camera_data in enumerate(camera_datas)
+    ]
+
+PROCESSORS = {
+    'batched': process_sample_batched,
+    'legacy': process_sample_legacy,
+}
+
+def load_nuscenes(loader, version, dataroot, verbose=True):
+    """
+    'lite'  : NuScenesLite (kolom di-cache .npy), hanya tabel & sample_data keyframe kamera (hemat RAM, startup cepat)
+    'devkit': NuScenes devkit penuh (semua tabel + reverse index)
+    """
+    start = time.time()
+    if loader == 'lite':
+        nusc = load_nuscenes_lite(version=version, dataroot=dataroot, verbose=verbose,
+                                  channels=CAMERAS, keyframes_only=True)
+    else:
+        from nuscenes.nuscenes import NuScenes
+        nusc = NuScenes(version=version, dataroot=dataroot, verbose=verbose)
+    if verbose:
+        rss = ""
+        if resource is not None:
+            # ru_maxrss dalam KB di Linux
+            rss = f", peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
+        print(f"Loader {loader}: {time.time() - start:.2f} detik{rss}")
+    return nusc
+
+def write_sample_outputs(camera_data, label_lines, dataroot=DATAROOT, strategy='copy', stats=None, write_txt=True):
+    # Materialisasi image ke folder output (copy/link) dan buat label dengan nama yg seragam
+    image_src_path = os.path.join(dataroot, camera_data['filename'])
+    image_name = os.path.basename(camera_data['filename'])  # misal: 'abc123.jpg'
+    image_dst_path = os.path.join(IMAGE_OUT_DIR, image_name)
+    label_dst_path = os.path.join(LABEL_OUT_DIR, image_name.replace('.jpg', '.txt'))
+
+    # Image yang sudah ada tidak ditulis ulang
+    materialize(image_src_path, image_dst_path, strategy, stats)
+    # Tulis label (dilewati jika hanya format terpaket)
+    if not write_txt:
+        return
+    with open(label_dst_path, "w") as f:
+        for line in label_lines:
+            f.write(line + "\n")
+
+def get_processor(mode, transform_cache=None):
+    if mode == 'batched' and transform_cache is not None:
+        return partial(process_sample_batched, transform_cache=transform_cache)
+    return PROCESSORS[mode]
+
+def run_benchmark(nusc, num_samples, transform_cache=None):
+    """
+    Bandingkan samples/sec jalur legacy vs batched pada num_samples sample pertama
+    (tanpa menulis file) dan pastikan label yang dihasilkan identik.
+    """
+    samples = nusc.sample[:num_samples]
+    results = {}
+    timings = {}
+    for mode in ('legacy', 'batched'):
+        process = get_processor(mode, transform_cache)
+        # Pemanasan (import lazy devkit, cache) di luar pengukuran
+        process(nusc, samples[0])
+        start = time.perf_counter()
+        results[mode] = [
+            [lines for _, lines in process(nusc, sample)]
+            for sample in tqdm(samples, desc=f"Benchmark {mode}", unit="sample")
+        ]
+        timings[mode] = time.perf_counter() - start
+
+    mismatches = sum(
+        1 for legacy, batched in zip(results['legacy'], results['batched']) if legacy != batched
+    )
+    print(f"\n=== Benchmark proyeksi ({len(samples)} sample x {len(CAMERAS)} kamera) ===")
+    for mode in ('legacy', 'batched'):
+        rate = len(samples) / timings[mode] if timings[mode] > 0 else float('inf')
+        print(f"- {mode:8s}: {timings[mode]:.2f} detik, {rate:.1f} sample/detik")
+    if timings['batched'] > 0:
+        print(f"- Speedup : {timings['legacy'] / timings['batched']:.1f}x")
+    print(f"- Sample dengan label berbeda: {mismatches}\n")
+
+def list_samples_by_scene(dataroot, version):
+    """
+    Kelompokkan token sample per scene hanya dari sample.json (tanpa load semua tabel).
+    Urutan scene dan sample mengikuti urutan di tabel.
+    """
+    with open(os.path.join(dataroot, version, 'sample.json')) as f:
+        samples = json.load(f)
+    scenes = OrderedDict()
+    for sample in samples:
+        scenes.setdefault(sample['scene_token'], []).append(sample['token'])
+    return scenes
+
+def load_manifest(path):
+    """
+    Baca sample yang sudah selesai: token sample -> list nama image. Baris terpotong
+    (crash saat menulis) diabaikan.
+    """
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            parts = line.rstrip('\n').split(',')
+            if len(parts) != 4 or line == MANIFEST_HEADER + '\n' or not line.endswith('\n'):
+                continue
+            done.setdefault(parts[0], []).append(parts[3])
+    return done
+
+def resume_done(manifest, label_format, packed_names=None, label_dir=LABEL_OUT_DIR):
+    """
+    Token sample yang boleh dilewati untuk format label yang diminta. Manifest juga ditulis
+    run txt (pipeline) dan run packed, jadi:
+    - packed/both: hanya sample yang semua image-nya sudah ada di store terpaket
+    - txt/both: berhenti jika ada sample di manifest yang .txt-nya tidak ada (mis. run
+      sebelumnya --label-format packed); jalankan ulang dengan --restart
+    """
+    done = set(manifest)
+    if label_format in ('txt', 'both'):
+        existing = {entry.name for entry in os.scandir(label_dir)} if os.path.isdir(label_dir) else set()
+        missing = sum(1 for names in manifest.values()
+                      for name in names if name.replace('.jpg', '.txt') not in existing)
+        if missing:
+            raise SystemExit(f"Manifest {MANIFEST_PATH} mencatat {missing} image tanpa label .txt di {label_dir} "
+                             f"(run sebelumnya dengan --label-format packed?). Jalankan dengan --restart.")
+    if label_format in ('packed', 'both'):
+        packed_names = set(packed_names or ())
+        done = {token for token in done if all(name in packed_names for name in manifest[token])}
+    return done
+
+def open_manifest(path, restart=False):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if restart or not os.path.exists(path):
+        manifest = open(path, 'w')
+        manifest.write(MANIFEST_HEADER + '\n')
+        manifest.flush()
+        return manifest
+    return open(path, 'a')
+
+def append_manifest(manifest, rows):
+    manifest.writelines(','.join(row) + '\n' for row in rows)
+    manifest.flush()
+    os.fsync(manifest.fileno())
+
+# State per proses worker: tabel nuScenes di-load sekali di initializer
+_WORKER = {}
+
+def _init_worker(options):
+    """options: version, dataroot, mode, loader, materialize, label_format, transform_cache_dir."""
+    _WORKER.update(options)
+    _WORKER['nusc'] = load_nuscenes(options['loader'], options['version'], options['dataroot'], verbose=False)
+    cache_dir = options['transform_cache_dir']
+    _WORKER['process'] = get_processor(options['mode'], TransformCache(cache_dir) if cache_dir else None)
+
+def _convert_scene(job):
+    """
+    Konversi semua sample yang belum selesai dari satu scene. Return baris manifest, statistik
+    file, dan label dalam bentuk array (untuk ditulis proses utama ke store terpaket).
+    """
+    scene_token, sample_tokens = job
+    nusc = _WORKER['nusc']
+    process = _WORKER['process']
+    write_txt = _WORKER['label_format'] in ('txt', 'both')
+    keep_packed = _WORKER['label_format'] in ('packed', 'both')
+    rows = []
+    packed = []
+    stats = MaterializeStats()
+    for sample_token in sample_tokens:
+        sample = nusc.get('sample', sample_token)
+        for camera_data, label_lines in process(nusc, sample):
+            write_sample_outputs(camera_data, label_lines, _WORKER['dataroot'], _WORKER['materialize'], stats, write_txt)
+            image_name = os.path.basename(camera_data['filename'])
+            rows.append((sample_token, scene_token, camera_data['channel'], image_name))
+            if keep_packed:
+                packed.append((image_name,) + lines_to_arrays(label_lines))
+    return rows, stats, packed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Konversi anotasi nuScenes ke label YOLO (kamera).")
+    parser.add_argument('--mode', choices=sorted(PROCESSORS), default='batched',
+                        help="Jalur proyeksi: 'batched' (vektorisasi) atau 'legacy' (Box per anotasi).")
+    parser.add_argument('--benchmark', type=int, metavar='N', default=0,
+                        help="Hanya benchmark legacy vs batched pada N sample pertama, tanpa menulis file.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Jumlah proses paralel (shard per scene). 0 = semua core CPU.")
+    parser.add_argument('--restart', action='store_true',
+                        help="Abaikan checkpoint manifest dan proses ulang semua sample.")
+    parser.add_argument('--loader', choices=('lite', 'devkit'), default='lite',
+                        help="'lite' hanya membaca tabel yang dibutuhkan dalam bentuk kolom; 'devkit' = NuScenes penuh.")
+    parser.add_argument('--version', default=NUSC_VERSION, help="Versi dataset nuScenes, mis. v1.0-trainval.")
+    parser.add_argument('--dataroot', default=DATAROOT, help="Folder dataset nuScenes mentah.")
+    parser.add_argument('--materialize', choices=STRATEGIES, default='copy',
+                        help="Cara menaruh image di folder processed: copy, hardlink, symlink, reflink, "
+                             "atau auto (reflink -> hardlink -> copy).")
+    parser.add_argument('--label-format', choices=('txt', 'packed', 'both'), default='txt',
+                        help="txt = satu .txt per gambar, packed = store biner terpaket di labels_packed/, both = keduanya.")
+    parser.add_argument('--no-transform-cache', action='store_true',
+                        help="Jangan pakai index transformasi di data/meta; hitung matriks kamera setiap sample.")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+
+    transform_cache = None
+    if not args.no_transform_cache and args.mode == 'batched':
+        transform_cache = load_or_build_transform_cache(args.dataroot, args.version)
+
+    if args.benchmark > 0:
+        nusc = load_nuscenes(args.loader, args.version, args.dataroot)
+        run_benchmark(nusc, args.benchmark, transform_cache)
+        return
+
     os.makedirs(IMAGE_OUT_DIR, exist_ok=True)
     os.makedirs(LABEL_OUT_DIR, exist_ok=True)
 
-    nusc = NuScenes(version='v1.0-mini', dataroot=DATAROOT, verbose=True)
-    print(f"\n=== Proses {len(nusc.sample)} sample nuScenes ===\n")
+    scenes = list_samples_by_scene(args.dataroot, args.version)
+    total_samples = sum(len(tokens) for tokens in scenes.values())
+    packed_writer = None
+    if args.label_format in ('packed', 'both'):
+        packed_writer = PackedLabelWriter(PACKED_DIR, restart=args.restart)
+    done = set()
+    if not args.restart:
+        done = resume_done(load_manifest(MANIFEST_PATH), args.label_format,
+                           packed_writer.names if packed_writer is not None else None)
+    jobs = []
+    for scene_token, sample_tokens in scenes.items():
+        pending = [token for token in sample_tokens if token not in done]
+        if pending:
+            jobs.append((scene_token, pending))
+    num_pending = sum(len(tokens) for _, tokens in jobs)
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+    workers = max(1, min(workers, len(jobs)))
+
+    print(f"\n=== Proses {total_samples} sample nuScenes (mode {args.mode}, {workers} worker) ===")
+    print(f"Sudah selesai (checkpoint): {total_samples - num_pending}, sisa: {num_pending} sample di {len(jobs)} scene\n")
+
+    transform_cache_dir = transform_cache.cache_dir if transform_cache is not None else None
+    manifest = open_manifest(MANIFEST_PATH, restart=args.restart)
+    options = dict(version=args.version, dataroot=args.dataroot, mode=args.mode, loader=args.loader,
+                   materialize=args.materialize, label_format=args.label_format,
+                   transform_cache_dir=transform_cache_dir)
+    stats = MaterializeStats()
+    start = time.time()
     # Gunakan tqdm untuk progress bar pada sample
-    for idx, sample in enumerate(tqdm(nusc.sample, desc="Processing samples", unit="sample")):
-        sample_token = sample['token']
-        sample_data = nusc.get('sample', sample_token)
-        for cam in CAMERAS:
-            camera_token = sample_data['data'][cam]
-            camera_data = nusc.get('sample_data', camera_token)
-            calibrated_sensor = nusc.get('calibrated_sensor', camera_data['calibrated_sensor_token'])
-            camera_intrinsic = np.array(calibrated_sensor['camera_intrinsic'])
-            sensor_translation = np.array(calibrated_sensor['translation'])
-            sensor_rotation = Quaternion(calibrated_sensor['rotation'])
-
-            ego_pose = nusc.get('ego_pose', camera_data['ego_pose_token'])
-            ego_translation = np.array(ego_pose['translation'])
-            ego_rotation = Quaternion(ego_pose['rotation'])
-
-            ann_tokens = sample_data['anns']
-            label_lines = []
-
-            for ann_token in ann_tokens:
-                ann = nusc.get('sample_annotation', ann_token)
-                category = ann['category_name']
-                class_id = CLASS_MAPPING.get(category, -1)
-                if class_id == -1:
-                    continue
-                box = Box(
-                    center=ann['translation'],
-                    size=ann['size'],
-                    orientation=Quaternion(ann['rotation']),
-                    name=category
-                )
-
-                box.translate(-ego_translation)
-                box.rotate(ego_rotation.inverse)
-                box.translate(-sensor_translation)
-                box.rotate(sensor_rotation.inverse)
-
-                corners_3d = box.corners()
-                corners_2d = view_points(corners_3d, camera_intrinsic, normalize=True)
-
-                x_center, y_center, width, height = corners_to_yolo_bbox(corners_2d[:2])
-                valid = is_yolo_bbox_valid(x_center, y_center, width, height)
-                if valid:
-                    label_lines.append(f"{class_id} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}")
-
-            # Copy image ke folder output dan buat label dengan nama yg seragam
-            image_src_path = os.path.join(DATAROOT, camera_data['filename'])
-            image_name = os.path.basename(camera_data['filename'])  # misal: 'abc123.jpg'
-            image_dst_path = os.path.join(IMAGE_OUT_DIR, image_name)
-            label_dst_path = os.path.join(LABEL_OUT_DIR, image_name.replace('.jpg', '.txt'))
-
-            # Copy image
-            if not os.path.exists(image_dst_path):
-                shutil.copy2(image_src_path, image_dst_path)
-            # Tulis label
-            with open(label_dst_path, "w") as f:
-                for line in label_lines:
-                    f.write(line + "\n")
-
-    print(f"\n=== Proses selesai. Images di {IMAGE_OUT_DIR} dan label YOLO di {LABEL_OUT_DIR} ===\n")
+    with tqdm(total=num_pending, desc="Processing samples", unit="sample") as pbar:
+        pool = None
+        if workers == 1:
+            if jobs:
+                _init_worker(options)
+            results = map(_convert_scene, jobs)
+        else:
+            if args.loader == 'lite':
+                # Parse JSON sekali di sini (cache kolom .npy); worker cukup memmap
+                load_nuscenes_lite(args.version, args.dataroot, verbose=False, channels=CAMERAS, keyframes_only=True)
+            pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(options,))
+            results = pool.imap_unordered(_convert_scene, jobs, chunksize=1)
+        try:
+            for rows, scene_stats, packed in results:
+                # Label terpaket ditulis dulu; manifest = tanda sample selesai
+                if packed_writer is not None:
+                    for image_name, class_ids, boxes in packed:
+                        packed_writer.append(image_name, class_ids, boxes)
+                    packed_writer.flush()
+                append_manifest(manifest, rows)
+                stats.merge(scene_stats)
+                pbar.update(len(rows) // len(CAMERAS))
+        except BaseException:
+            # Error/Ctrl-C: hentikan worker sekarang; close+join saja menunggu semua job yang tersisa
+            if pool is not None:
+                pool.terminate()
+            raise
+        finally:
+            manifest.close()
+            if packed_writer is not None:
+                packed_writer.close()
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    print(f"\n=== Proses selesai. Images di {IMAGE_OUT_DIR} dan label YOLO di {LABEL_OUT_DIR} ===")
+    if packed_writer is not None:
+        print(f"Label terpaket: {PACKED_DIR}")
+    print(f"Checkpoint manifest: {MANIFEST_PATH}")
+    stats.report(f"Materialisasi image ({args.materialize}), total {time.time() - start:.1f} detik")
+    print()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
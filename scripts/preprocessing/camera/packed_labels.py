@@ -0,0 +1,232 @@
+import os
+import time
+import argparse
+import numpy as np
+from tqdm import tqdm
+
+# Format label terpaket (pengganti satu .txt per gambar):
+#   boxes.f32    float32 (M, 4) [x_center, y_center, width, height] ternormalisasi
+#   classes.u16  uint16 (M,) class id
+#   offsets.i64  int64 (N+1,) box gambar ke-i = [offsets[i], offsets[i+1])
+#   images.txt   nama file gambar, satu per baris (urutan = index gambar)
+# Semua file append-only sehingga penulisan bisa dilanjutkan setelah crash.
+PACKED_DIR = '../../../data/processed/nuscenes/camera/labels_packed'
+LABEL_DIR = '../../../data/processed/nuscenes/camera/labels'
+
+def lines_to_arrays(label_lines):
+    """Baris label YOLO -> (class_ids uint16 (K,), boxes float32 (K,4))."""
+    if not label_lines:
+        return np.zeros(0, dtype=np.uint16), np.zeros((0, 4), dtype=np.float32)
+    values = np.array([line.split() for line in label_lines], dtype=np.float64).reshape(-1, 5)
+    return values[:, 0].astype(np.uint16), values[:, 1:].astype(np.float32)
+
+def arrays_to_lines(class_ids, boxes):
+    return [
+        f"{class_id} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}"
+        for class_id, (x_center, y_center, width, height) in zip(class_ids.tolist(), boxes.tolist())
+    ]
+
+def read_append_index(offsets_path, names_path, row_width=1):
+    """
+    Index store append-only yang tercatat lengkap: (nama, offsets (count+1, row_width)).
+    Nama tanpa '\\n' di akhir dan baris offsets yang terpotong (crash saat menulis) diabaikan.
+    """
+    with open(names_path, newline='\n') as f:
+        names = f.read().split('\n')[:-1]
+    offsets = np.fromfile(offsets_path, dtype=np.int64)
+    offsets = offsets[:len(offsets) // row_width * row_width].reshape(-1, row_width)
+    if len(offsets) == 0:
+        offsets = np.zeros((1, row_width), dtype=np.int64)
+    count = min(len(names), len(offsets) - 1)
+    return names[:count], offsets[:count + 1]
+
+def recover_append_index(offsets_path, names_path, row_width=1):
+    """
+    Seperti read_append_index, lalu tulis ulang offsets & nama tepat ke count+1 / count entri
+    utuh sehingga append berikutnya tidak menyambung ke baris yang terpotong.
+    """
+    names, offsets = read_append_index(offsets_path, names_path, row_width)
+    offsets.tofile(offsets_path)
+    with open(names_path, 'w', newline='\n') as f:
+        f.writelines(name + '\n' for name in names)
+    return names, offsets
+
+class PackedLabelWriter:
+    """Writer append-only. restart=True mengosongkan store yang sudah ada."""
+
+    def __init__(self, path=PACKED_DIR, restart=False):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        offsets_path = os.path.join(path, 'offsets.i64')
+        if restart or not os.path.exists(offsets_path):
+            for name in ('boxes.f32', 'classes.u16', 'images.txt'):
+                open(os.path.join(path, name), 'wb').close()
+            np.zeros(1, dtype=np.int64).tofile(offsets_path)
+        # Pulihkan kondisi konsisten terakhir (crash di tengah append): potong semua file
+        # ke jumlah gambar yang tercatat lengkap di offsets dan images.txt
+        images_path = os.path.join(path, 'images.txt')
+        names, offsets = recover_append_index(offsets_path, images_path)
+        self.names = names
+        count = len(names)
+        offsets = offsets.reshape(-1)
+        self._num_boxes = int(offsets[count])
+        self._boxes = open(os.path.join(path, 'boxes.f32'), 'r+b')
+        self._classes = open(os.path.join(path, 'classes.u16'), 'r+b')
+        self._boxes.truncate(self._num_boxes * 16)
+        self._classes.truncate(self._num_boxes * 2)
+        self._boxes.seek(0, os.SEEK_END)
+        self._classes.seek(0, os.SEEK_END)
+        self._offsets = open(offsets_path, 'ab')
+        self._images = open(images_path, 'a', newline='\n')
+
+    def append(self, image_name, class_ids, boxes):
+        class_ids = np.asarray(class_ids, dtype=np.uint16).reshape(-1)
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self._boxes.write(boxes.tobytes())
+        self._classes.write(class_ids.tobytes())
+        self._num_boxes += len(class_ids)
+        self._offsets.write(np.int64(self._num_boxes).tobytes())
+        self._images.write(image_name + '\n')
+        self.names.append(image_name)
+
+    def flush(self):
+        # Urutan flush: data box dulu (sampai ke disk), baru offset & nama, agar setelah crash
+        # tidak ada offset yang menunjuk ke data yang belum tersimpan
+        for f in (self._boxes, self._classes, self._offsets, self._images):
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self):
+        self.flush()
+        for f in (self._boxes, self._classes, self._offsets, self._images):
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class PackedLabels:
+    """
+    Reader memory-mapped. Jika nama gambar muncul lebih dari sekali (run dilanjutkan
+    setelah crash), entri terakhir yang dipakai.
+    """
+
+    def __init__(self, path=PACKED_DIR):
+        self.path = path
+        self.names, offsets = read_append_index(os.path.join(path, 'offsets.i64'), os.path.join(path, 'images.txt'))
+        self.offsets = offsets.reshape(-1)
+        num_boxes = int(self.offsets[-1])
+        self.boxes = self._memmap('boxes.f32', np.float32, (num_boxes, 4))
+        self.classes = self._memmap('classes.u16', np.uint16, (num_boxes,))
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    def _memmap(self, name, dtype, shape):
+        if shape[0] == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode='r', shape=shape)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, image_name):
+        return image_name in self.index
+
+    def image_names(self):
+        return list(self.index)
+
+    def labels(self, image_name):
+        """(class_ids, boxes) untuk satu gambar; KeyError jika tidak ada."""
+        i = self.index[image_name]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.classes[start:end], self.boxes[start:end]
+
+    def class_counts(self, num_classes=None):
+        """Jumlah box per kelas untuk seluruh dataset (vektorisasi, tanpa loop per gambar)."""
+        live = np.zeros(len(self.offsets) - 1, dtype=bool)
+        live[list(self.index.values())] = True
+        per_box = np.repeat(live, np.diff(self.offsets))
+        return np.bincount(self.classes[per_box], minlength=num_classes or 0)
+
+def pack_txt_dir(label_dir=LABEL_DIR, out_dir=PACKED_DIR, image_suffix='.jpg'):
+    """Konversi folder label .txt yang sudah ada ke format terpaket."""
+    with PackedLabelWriter(out_dir, restart=True) as writer:
+        entries = sorted(e.name for e in os.scandir(label_dir) if e.name.endswith('.txt'))
+        for name in tqdm(entries, desc="Pack label", unit='file'):
+            with open(os.path.join(label_dir, name)) as f:
+                lines = [line for line in f.read().splitlines() if line.strip()]
+            class_ids, boxes = lines_to_arrays(lines)
+            writer.append(name[:-4] + image_suffix, class_ids, boxes)
+    return len(entries)
+
+def export_label(packed, image_name, dst_path):
+    class_ids, boxes = packed.labels(image_name)
+    with open(dst_path, 'w') as f:
+        for line in arrays_to_lines(class_ids, boxes):
+            f.write(line + "\n")
+
+def export_yolo_txt(packed_dir=PACKED_DIR, out_dir=LABEL_DIR):
+    """Tulis ulang label terpaket ke satu .txt per gambar (format yang dibaca Ultralytics)."""
+    packed = PackedLabels(packed_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    for image_name in tqdm(packed.image_names(), desc="Export label", unit='file'):
+        export_label(packed, image_name, os.path.join(out_dir, os.path.splitext(image_name)[0] + '.txt'))
+    return len(packed)
+
+def scan_txt(label_dir):
+    """Baseline: buka setiap .txt, hitung box per kelas."""
+    counts = {}
+    num_files = 0
+    for entry in os.scandir(label_dir):
+        if not entry.name.endswith('.txt'):
+            continue
+        num_files += 1
+        with open(entry.path) as f:
+            for line in f:
+                parts = line.split(None, 1)
+                if parts:
+                    class_id = int(float(parts[0]))
+                    counts[class_id] = counts.get(class_id, 0) + 1
+    return num_files, sum(counts.values())
+
+def scan_packed(packed_dir):
+    packed = PackedLabels(packed_dir)
+    counts = packed.class_counts()
+    return len(packed), int(counts.sum())
+
+def run_benchmark(label_dir, packed_dir):
+    print("\n=== Benchmark scan seluruh label ===")
+    for name, scan, path in (('txt', scan_txt, label_dir), ('packed', scan_packed, packed_dir)):
+        start = time.perf_counter()
+        num_images, num_boxes = scan(path)
+        elapsed = time.perf_counter() - start
+        rate = num_images / elapsed if elapsed > 0 else float('inf')
+        print(f"- {name:6s}: {num_images} gambar, {num_boxes} box, {elapsed:.3f} detik ({rate:.0f} gambar/detik)")
+    print()
+
+def main():
+    parser = argparse.ArgumentParser(description="Label YOLO terpaket (memory-mapped) untuk kamera.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('pack', help="Konversi folder .txt ke format terpaket.")
+    p.add_argument('--label-dir', default=LABEL_DIR)
+    p.add_argument('--packed-dir', default=PACKED_DIR)
+    p = sub.add_parser('export', help="Export format terpaket ke .txt per gambar (Ultralytics).")
+    p.add_argument('--packed-dir', default=PACKED_DIR)
+    p.add_argument('--out-dir', default=LABEL_DIR)
+    p = sub.add_parser('bench', help="Bandingkan waktu scan .txt vs terpaket.")
+    p.add_argument('--label-dir', default=LABEL_DIR)
+    p.add_argument('--packed-dir', default=PACKED_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        count = pack_txt_dir(args.label_dir, args.packed_dir)
+        print(f"{count} file label dipaket ke {args.packed_dir}")
+    elif args.command == 'export':
+        count = export_yolo_txt(args.packed_dir, args.out_dir)
+        print(f"{count} file label ditulis ke {args.out_dir}")
+    else:
+        run_benchmark(args.label_dir, args.packed_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,523 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import shutil
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import yaml
+from tqdm import tqdm
+from label_stats import STATS_DIR, build_stats
+from materialize import STRATEGIES, MaterializeStats, materialize
+import nuscenes_to_yolo
+from nuscenes_to_yolo import (CAMERAS, CLASS_MAPPING, DATAROOT, IMAGE_OUT_DIR, IMG_HEIGHT, IMG_WIDTH, LABEL_OUT_DIR,
+                              MANIFEST_PATH, NUSC_VERSION, append_manifest, open_manifest)
+from split_yolo_dataset import (OUT_ROOT, SPLIT_META_PATH, SPLITS, assign_groups, group_key, parse_ratio,
+                                prune_split_dirs, write_split_meta)
+from verify_camera_data import (DATA_YAML, EXPECTED_SIZE, REPORT_PATH, STATUSES, check_label_line, print_report,
+                                verify_pair, write_report)
+
+# Pipeline kamera inkremental: convert -> verify -> split -> train-prep.
+# Setiap stage menyimpan state di data/meta/pipeline/<stage>.json: parameter stage + hash konten per unit
+# (sample untuk convert, gambar untuk verify/split). Unit yang hash-nya sama dengan run sebelumnya dilewati:
+#   convert    hash per sample = record 6 kamera (file, kalibrasi, ego pose) + anotasi yang sudah di-map ke
+#              class id. Mengubah satu kelas di CLASS_MAPPING hanya mengkonversi ulang sample yang memuatnya
+#   verify     hash per gambar = hash label + (ukuran, mtime) gambar; parameter: nc, ukuran gambar
+#   split      assignment dihitung ulang dari jumlah box per grup yang tersimpan (tanpa scan ulang label);
+#              hanya gambar yang pindah split atau labelnya berubah yang dimaterialisasi ulang; index
+#              statistik label (label_stats.py) dibangun ulang jika ada yang berubah
+#   train-prep data.yaml (nc/names) + cache gambar ter-resize per split; gambar yang tidak berubah
+#              disalin dari cache lama (lihat image_cache.build_cache)
+PIPELINE_DIR = '../../../data/meta/pipeline'
+STAGES = ('convert', 'verify', 'split', 'train-prep')
+PIPELINE_VERSION = 1
+
+def content_hash(value):
+    """sha1 dari struktur JSON (key diurutkan) atau bytes."""
+    if not isinstance(value, bytes):
+        value = json.dumps(value, sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.sha1(value).hexdigest()
+
+def load_state(stage, pipeline_dir=PIPELINE_DIR):
+    path = os.path.join(pipeline_dir, stage + '.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        state = json.load(f)
+    return state if state.get('version') == PIPELINE_VERSION else {}
+
+def save_state(stage, state, pipeline_dir=PIPELINE_DIR):
+    """Tulis atomik (tmp + replace) agar crash di tengah tidak meninggalkan state setengah jadi."""
+    os.makedirs(pipeline_dir, exist_ok=True)
+    path = os.path.join(pipeline_dir, stage + '.json')
+    state = dict(state, version=PIPELINE_VERSION)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(path + '.tmp', path)
+
+def file_stamp(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def _load_json(dataroot, version, table):
+    with open(os.path.join(dataroot, version, f'{table}.json')) as f:
+        return json.load(f)
+
+# --- convert ------------------------------------------------------------------
+def sample_hashes(dataroot, version, class_mapping=CLASS_MAPPING):
+    """
+    Hash input konversi per sample langsung dari JSON. Hanya bagian yang memengaruhi label/gambar
+    output yang ikut di-hash; anotasi kategori yang tidak di-map tidak berpengaruh.
+    Return dict token sample -> (scene_token, hash), urutan = urutan sample.json.
+    """
+    sensors = {s['token']: s['channel'] for s in _load_json(dataroot, version, 'sensor')}
+    calibs = {c['token']: c for c in _load_json(dataroot, version, 'calibrated_sensor')
+              if sensors[c['sensor_token']] in CAMERAS}
+    records = {}
+    for sd in _load_json(dataroot, version, 'sample_data'):
+        calib = calibs.get(sd['calibrated_sensor_token'])
+        if sd['is_key_frame'] and calib is not None:
+            records.setdefault(sd['sample_token'], []).append(sd)
+    ego_needed = {sd['ego_pose_token'] for sds in records.values() for sd in sds}
+    ego_poses = {ep['token']: ep for ep in _load_json(dataroot, version, 'ego_pose') if ep['token'] in ego_needed}
+    categories = {c['token']: c['name'] for c in _load_json(dataroot, version, 'category')}
+    instance_class = {i['token']: class_mapping.get(categories[i['category_token']], -1)
+                      for i in _load_json(dataroot, version, 'instance')}
+    annotations = {}
+    for ann in _load_json(dataroot, version, 'sample_annotation'):
+        class_id = instance_class[ann['instance_token']]
+        if class_id >= 0:
+            annotations.setdefault(ann['sample_token'], []).append(
+                (ann['token'], class_id, ann['translation'], ann['size'], ann['rotation']))
+
+    hashes = {}
+    for sample in _load_json(dataroot, version, 'sample'):
+        cameras = []
+        for sd in records.get(sample['token'], []):
+            calib = calibs[sd['calibrated_sensor_token']]
+            ego = ego_poses[sd['ego_pose_token']]
+            cameras.append((sensors[calib['sensor_token']], sd['filename'], calib['translation'], calib['rotation'],
+                            calib['camera_intrinsic'], ego['translation'], ego['rotation']))
+        key = [sorted(cameras), sorted(annotations.get(sample['token'], []))]
+        hashes[sample['token']] = (sample['scene_token'], content_hash(key))
+    return hashes
+
+def read_label(image_name, label_dir=LABEL_OUT_DIR, invalid=None):
+    """
+    Hash konten label + jumlah box per kelas [[class_id, n], ...]. Baris yang formatnya tidak
+    valid dilewati dan dihitung di invalid['lines'] (dilaporkan detail oleh stage verify).
+    """
+    path = os.path.join(label_dir, image_name[:-4] + '.txt')
+    with open(path, 'rb') as f:
+        data = f.read()
+    counts = {}
+    for line in data.decode(errors='replace').splitlines():
+        if not line.strip():
+            continue
+        if check_label_line(line) is not None:
+            if invalid is not None:
+                invalid['lines'] = invalid.get('lines', 0) + 1
+            continue
+        class_id = int(float(line.split(None, 1)[0]))
+        counts[class_id] = counts.get(class_id, 0) + 1
+    return content_hash(data), sorted(counts.items())
+
+def remove_outputs(image_names, image_dir=IMAGE_OUT_DIR, label_dir=LABEL_OUT_DIR):
+    for image_name in image_names:
+        for path in (os.path.join(image_dir, image_name), os.path.join(label_dir, image_name[:-4] + '.txt')):
+            if os.path.lexists(path):
+                os.unlink(path)
+
+def run_convert(args):
+    """
+    Konversi hanya sample baru/berubah (dan hapus output sample yang hilang dari dataset).
+    State: samples token -> {scene, hash, images: {nama gambar: [hash label, jumlah box per kelas]}}.
+    """
+    params = {'version': args.version, 'mode': 'batched', 'img_size': [IMG_WIDTH, IMG_HEIGHT]}
+    state = load_state('convert')
+    previous = state.get('samples', {}) if state.get('params') == params and not args.force else {}
+    hashes = sample_hashes(args.dataroot, args.version)
+
+    samples = {}
+    jobs = {}
+    for token, (scene, sample_hash) in hashes.items():
+        old = previous.get(token)
+        if old is not None and old['hash'] == sample_hash and all(
+                os.path.exists(os.path.join(LABEL_OUT_DIR, name[:-4] + '.txt')) for name in old['images']):
+            samples[token] = old
+        else:
+            jobs.setdefault(scene, []).append(token)
+    removed = [token for token in state.get('samples', {}) if token not in hashes]
+    remove_outputs([name for token in removed for name in state['samples'][token]['images']])
+
+    jobs = list(jobs.items())
+    num_pending = sum(len(tokens) for _, tokens in jobs)
+    print(f"[convert] {len(hashes)} sample: {len(hashes) - num_pending} tidak berubah, {num_pending} dikonversi, "
+          f"{len(removed)} dihapus")
+    if jobs:
+        os.makedirs(IMAGE_OUT_DIR, exist_ok=True)
+        os.makedirs(LABEL_OUT_DIR, exist_ok=True)
+        workers = args.workers if args.workers > 0 else os.cpu_count()
+        workers = max(1, min(workers, len(jobs)))
+        options = dict(version=args.version, dataroot=args.dataroot, mode='batched', loader='lite',
+                       materialize=args.convert_materialize, label_format='txt', transform_cache_dir=None)
+        manifest = open_manifest(MANIFEST_PATH)
+        stats = MaterializeStats()
+        invalid = {}
+        pool = None
+        if workers == 1:
+            nuscenes_to_yolo._init_worker(options)
+            results = map(nuscenes_to_yolo._convert_scene, jobs)
+        else:
+            nuscenes_to_yolo.load_nuscenes_lite(args.version, args.dataroot, verbose=False, channels=CAMERAS,
+                                                keyframes_only=True)
+            pool = multiprocessing.Pool(workers, initializer=nuscenes_to_yolo._init_worker, initargs=(options,))
+            results = pool.imap_unordered(nuscenes_to_yolo._convert_scene, jobs, chunksize=1)
+        try:
+            with tqdm(total=num_pending, desc="Convert", unit="sample") as pbar:
+                for rows, scene_stats, _ in results:
+                    append_manifest(manifest, rows)
+                    stats.merge(scene_stats)
+                    for sample_token, scene_token, _, image_name in rows:
+                        entry = samples.setdefault(sample_token, {'scene': scene_token,
+                                                                  'hash': hashes[sample_token][1], 'images': {}})
+                        entry['images'][image_name] = list(read_label(image_name, invalid=invalid))
+                    pbar.update(len(rows) // len(CAMERAS))
+        except BaseException:
+            if pool is not None:
+                pool.terminate()
+            raise
+        finally:
+            manifest.close()
+            if pool is not None:
+                pool.close()
+                pool.join()
+        # Gambar lama dari sample yang berubah tapi tidak lagi dihasilkan
+        stale = [name for _, tokens in jobs for token in tokens
+                 for name in previous.get(token, {}).get('images', {}) if name not in samples[token]['images']]
+        remove_outputs(stale)
+        if invalid:
+            print(f"[convert] {invalid['lines']} baris label tidak valid dilewati (lihat report stage verify)")
+        stats.report("Materialisasi image (convert)")
+    save_state('convert', {'params': params, 'samples': samples})
+    return num_pending + len(removed)
+
+def converted_images(convert_state):
+    """nama gambar -> (scene, hash label, jumlah box per kelas), urut nama."""
+    images = {}
+    for entry in convert_state.get('samples', {}).values():
+        for image_name, (label_hash, counts) in entry['images'].items():
+            images[image_name] = (entry['scene'], label_hash, counts)
+    return dict(sorted(images.items()))
+
+# --- verify -------------------------------------------------------------------
+def load_data_yaml_nc(data_yaml):
+    if not os.path.exists(data_yaml):
+        return len(set(CLASS_MAPPING.values()))
+    with open(data_yaml) as f:
+        data = yaml.safe_load(f) or {}
+    return int(data['nc']) if 'nc' in data else len(data.get('names', []))
+
+def run_verify(args, images):
+    """Verifikasi ulang hanya pasangan gambar-label yang berubah; report ditulis dari semua hasil."""
+    num_classes = load_data_yaml_nc(args.data_yaml)
+    params = {'num_classes': num_classes, 'expected_size': list(EXPECTED_SIZE)}
+    state = load_state('verify')
+    previous = state.get('results', {}) if state.get('params') == params and not args.force else {}
+
+    keys = {}
+    pending = []
+    for image_name, (_, label_hash, _) in images.items():
+        path = os.path.join(IMAGE_OUT_DIR, image_name)
+        keys[image_name] = content_hash([label_hash, file_stamp(path) if os.path.exists(path) else None])
+        old = previous.get(image_name)
+        if old is None or old['key'] != keys[image_name]:
+            pending.append(image_name)
+    print(f"[verify] {len(images)} gambar: {len(images) - len(pending)} tidak berubah, {len(pending)} diverifikasi")
+
+    start = time.time()
+    results = {name: previous[name] for name in images if name not in pending}
+    with ThreadPoolExecutor(max_workers=args.workers or os.cpu_count()) as pool:
+        for result in pool.map(lambda name: verify_pair(IMAGE_OUT_DIR, LABEL_OUT_DIR, name, num_classes,
+                                                        EXPECTED_SIZE), pending):
+            result['key'] = keys[result['image']]
+            results[result['image']] = result
+    elapsed = time.time() - start
+    save_state('verify', {'params': params, 'results': results})
+
+    counts = {}
+    issues = []
+    num_boxes = num_lines_invalid = 0
+    for image_name in images:
+        result = results[image_name]
+        num_boxes += result['boxes']
+        for status in {e[0] for e in result['errors']} or {'valid'}:
+            counts[status] = counts.get(status, 0) + 1
+        num_lines_invalid += sum(1 for e in result['errors'] if e[1] is not None)
+        for status, line_no, detail in result['errors']:
+            issues.append({'image': image_name, 'status': status, 'line': line_no, 'detail': detail})
+    report = {
+        'summary': {
+            'image_dir': os.path.abspath(IMAGE_OUT_DIR),
+            'label_dir': os.path.abspath(LABEL_OUT_DIR),
+            'num_classes': num_classes,
+            'expected_size': list(EXPECTED_SIZE),
+            'images': len(images),
+            'boxes': num_boxes,
+            'invalid_lines': num_lines_invalid,
+            'seconds': round(elapsed, 3),
+            'images_per_sec': round(len(pending) / elapsed, 1) if elapsed > 0 else None,
+        },
+        'per_status': {status: counts.get(status, 0) for status in STATUSES},
+        'issues': issues,
+    }
+    if pending:
+        print_report(report)
+    write_report(report, REPORT_PATH)
+    return len(pending)
+
+# --- split --------------------------------------------------------------------
+def compute_split(images, ratios, seed, group_by, stratify):
+    """Sama dengan build_split, tetapi jumlah box per kelas diambil dari state convert (tanpa scan label)."""
+    scene_index = {name: scene for name, (scene, _, _) in images.items()}
+    names = list(images)
+    group_ids = {}
+    image_groups = np.empty(len(names), dtype=np.int64)
+    group_counts = []
+    for i, name in enumerate(names):
+        key = group_key(name, group_by, scene_index)
+        gid = group_ids.get(key)
+        if gid is None:
+            gid = group_ids[key] = len(group_counts)
+            group_counts.append({})
+        image_groups[i] = gid
+        for class_id, count in images[name][2]:
+            group_counts[gid][class_id] = group_counts[gid].get(class_id, 0) + count
+
+    num_classes = 1 + max((max(c) for c in group_counts if c), default=-1)
+    class_counts = np.zeros((len(group_counts), max(num_classes, 1)), dtype=np.int64)
+    for gid, counts in enumerate(group_counts):
+        for class_id, count in counts.items():
+            if class_id >= 0:
+                class_counts[gid, class_id] = count
+    group_sizes = np.bincount(image_groups, minlength=len(group_counts))
+    assignment = assign_groups(group_sizes, class_counts, ratios, seed, stratify)
+    image_splits = assignment[image_groups] if names else np.zeros(0, dtype=np.int64)
+
+    split_of = {name: SPLITS[s] for name, s in zip(names, image_splits.tolist())}
+    summary = {}
+    for s, split in enumerate(SPLITS):
+        if ratios[s] <= 0:
+            continue
+        in_split = assignment == s
+        summary[split] = {
+            'groups': int(in_split.sum()),
+            'images': int(np.sum(image_splits == s)),
+            'boxes_per_class': class_counts[in_split].sum(axis=0).tolist(),
+        }
+    return split_of, summary
+
+def _split_paths(out_root, split, image_name):
+    return (os.path.join(out_root, 'images', split, image_name),
+            os.path.join(out_root, 'labels', split, image_name[:-4] + '.txt'))
+
+def prune_old_layout(out_root, materialize_strategy, split_of):
+    """
+    Hapus output split yang tidak sesuai assignment split_of: strategi list -> folder images/labels per
+    split dan daftar split yang kini kosong; strategi folder -> file yang tidak ada di assignment baru dan
+    daftar <split>.txt. Return jumlah yang dihapus.
+    """
+    removed = 0
+    if materialize_strategy == 'list':
+        for kind in ('images', 'labels'):
+            for split in SPLITS:
+                split_dir = os.path.join(out_root, kind, split)
+                if os.path.isdir(split_dir):
+                    removed += sum(1 for _ in os.scandir(split_dir))
+                    shutil.rmtree(split_dir)
+        used = set(split_of.values())
+        for split in SPLITS:
+            list_path = os.path.join(out_root, f'{split}.txt')
+            if split not in used and os.path.exists(list_path):
+                os.unlink(list_path)
+                removed += 1
+        return removed
+    split_files = {split: [name for name, s in split_of.items() if s == split] for split in SPLITS}
+    removed += prune_split_dirs(out_root, split_files)
+    for split in SPLITS:
+        list_path = os.path.join(out_root, f'{split}.txt')
+        if os.path.exists(list_path):
+            os.unlink(list_path)
+            removed += 1
+    return removed
+
+def run_split(args, images):
+    """Materialisasi ulang hanya gambar yang pindah split, labelnya berubah, atau file output-nya hilang."""
+    raw_ratios, ratios = parse_ratio(args.ratios)
+    params = {'ratios': raw_ratios, 'seed': args.seed, 'group_by': args.group_by, 'stratify': not args.no_stratify,
+              'materialize': args.materialize, 'out_root': os.path.abspath(args.out_root)}
+    state = load_state('split')
+    same_params = state.get('params', {}).get('materialize') == args.materialize and \
+        state.get('params', {}).get('out_root') == params['out_root'] and not args.force
+    previous = state.get('images', {}) if same_params else {}
+
+    split_of, summary = compute_split(images, ratios, args.seed, args.group_by, not args.no_stratify)
+    targets = {name: [split_of[name], images[name][1]] for name in images}
+    if args.materialize == 'list':
+        changed = [name for name in images if previous.get(name) != targets[name]]
+        removed = [name for name in previous if name not in targets]
+    else:
+        changed = [name for name in images if previous.get(name) != targets[name]
+                   or not all(os.path.lexists(p) for p in _split_paths(args.out_root, split_of[name], name))]
+        removed = [name for name in previous if previous[name][0] != targets.get(name, [None])[0]]
+    print(f"[split] {len(images)} gambar: {len(images) - len(changed)} tidak berubah, {len(changed)} ditulis ulang, "
+          f"{len(removed)} dihapus/pindah")
+    for split, info in summary.items():
+        print(f"  {split:5s}: {info['groups']} grup, {info['images']} gambar, {sum(info['boxes_per_class'])} box")
+
+    pruned = 0
+    if not previous:
+        # Tanpa state pembanding (--force, materialize/out_root berubah, run pertama): buang semua sisa
+        # assignment lama agar tidak ada gambar di dua split, termasuk layout strategi yang lain
+        pruned = prune_old_layout(args.out_root, args.materialize, split_of)
+        if pruned:
+            print(f"  {pruned} file/daftar split lama dihapus")
+
+    if args.materialize == 'list':
+        if changed or removed or not same_params:
+            os.makedirs(args.out_root, exist_ok=True)
+            for split in summary:
+                with open(os.path.join(args.out_root, f'{split}.txt'), 'w') as f:
+                    for name in images:
+                        if split_of[name] == split:
+                            f.write(os.path.abspath(os.path.join(IMAGE_OUT_DIR, name)) + '\n')
+    else:
+        for name in removed:
+            for path in _split_paths(args.out_root, previous[name][0], name):
+                if os.path.lexists(path):
+                    os.unlink(path)
+        for split in summary:
+            os.makedirs(os.path.join(args.out_root, 'images', split), exist_ok=True)
+            os.makedirs(os.path.join(args.out_root, 'labels', split), exist_ok=True)
+        image_stats = MaterializeStats()
+        label_stats = MaterializeStats()
+        for name in tqdm(changed, desc="Split", unit='file'):
+            dst_img, dst_lbl = _split_paths(args.out_root, split_of[name], name)
+            materialize(os.path.join(IMAGE_OUT_DIR, name), dst_img, args.materialize, image_stats, overwrite=True)
+            materialize(os.path.join(LABEL_OUT_DIR, name[:-4] + '.txt'), dst_lbl, args.materialize, label_stats,
+                        overwrite=True)
+        if changed:
+            image_stats.report("Materialisasi image (split)")
+            label_stats.report("Materialisasi label (split)")
+
+    write_split_meta(SPLIT_META_PATH, argparse.Namespace(seed=args.seed, group_by=args.group_by,
+                                                         no_stratify=args.no_stratify), raw_ratios, summary)
+    save_state('split', {'params': params, 'images': targets, 'summary': summary})
+    if changed or removed or pruned or not os.path.exists(os.path.join(STATS_DIR, 'meta.json')):
+        num_images, num_boxes = build_stats(out_root=args.out_root)
+        print(f"  Index statistik label: {num_images} gambar, {num_boxes} box -> {STATS_DIR}")
+    return len(changed) + len(removed)
+
+# --- train-prep ---------------------------------------------------------------
+def write_data_yaml(path, out_root, splits):
+    """data.yaml dari CLASS_MAPPING; file hanya ditulis jika isinya berubah. Return True jika ditulis."""
+    names = [None] * (max(CLASS_MAPPING.values()) + 1)
+    for name, class_id in CLASS_MAPPING.items():
+        names[class_id] = name
+    config = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            config = yaml.safe_load(f) or {}
+    # Key split dibangun ulang hanya dari splits: split yang kini kosong (mis. test pada 5:5:0) tidak tertinggal
+    new = {key: value for key, value in config.items() if key not in SPLITS}
+    for split in splits:
+        new[split] = f'{split}.txt' if os.path.exists(os.path.join(out_root, f'{split}.txt')) and \
+            not os.path.isdir(os.path.join(out_root, 'images', split)) else f'images/{split}'
+    new['nc'] = len(names)
+    new['names'] = names
+    if new == config:
+        return False
+    with open(path, 'w') as f:
+        yaml.safe_dump(new, f, sort_keys=False)
+    return True
+
+def run_train_prep(args):
+    split_state = load_state('split')
+    splits = [s for s in SPLITS if s in split_state.get('summary', {})]
+    data_yaml = os.path.join(args.out_root, 'data.yaml')
+    written = write_data_yaml(data_yaml, args.out_root, splits)
+    print(f"[train-prep] data.yaml {'diperbarui' if written else 'tidak berubah'}: {data_yaml}")
+    if not args.imgsz or args.materialize == 'list':
+        return int(written)
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'training', 'camera'))
+    from image_cache import CACHE_ROOT, open_cache
+
+    for split in splits:
+        source = os.path.join(args.out_root, 'images', split)
+        if not os.path.isdir(source):
+            continue
+        for imgsz in args.imgsz:
+            start = time.time()
+            cache = open_cache(source, imgsz, CACHE_ROOT, workers=args.workers)
+            print(f"  cache {split} imgsz={imgsz}: {len(cache) if cache else 0} gambar, "
+                  f"{time.time() - start:.2f} detik")
+    return int(written)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pipeline kamera inkremental: convert -> verify -> split -> train-prep.")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES),
+                        help="Stage yang dijalankan (urutan selalu mengikuti pipeline).")
+    parser.add_argument('--force', action='store_true', help="Abaikan state; hitung ulang semua unit.")
+    parser.add_argument('--version', default=NUSC_VERSION)
+    parser.add_argument('--dataroot', default=DATAROOT)
+    parser.add_argument('--workers', type=int, default=0, help="Jumlah proses/thread (0 = semua core CPU).")
+    parser.add_argument('--convert-materialize', choices=STRATEGIES, default='copy',
+                        help="Cara menaruh image nuScenes di folder processed.")
+    parser.add_argument('--data-yaml', default=DATA_YAML, help="Sumber nc untuk verifikasi class id.")
+    parser.add_argument('--ratios', default='8:1:1', help="Rasio train:val:test.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--group-by', choices=('scene', 'log', 'image'), default='scene')
+    parser.add_argument('--no-stratify', action='store_true')
+    parser.add_argument('--out-root', default=OUT_ROOT)
+    parser.add_argument('--materialize', choices=STRATEGIES + ('list',), default='hardlink',
+                        help="Cara menaruh file di folder split (lihat split_yolo_dataset.py).")
+    parser.add_argument('--imgsz', type=int, nargs='*', default=[640],
+                        help="Ukuran cache gambar untuk train-prep; kosongkan untuk melewati cache.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    print(f"\n=== Pipeline kamera: {' -> '.join(s for s in STAGES if s in args.stages)} ===\n")
+    timings = {}
+    changed = {}
+    start_all = time.time()
+    for stage in STAGES:
+        if stage not in args.stages:
+            continue
+        start = time.time()
+        if stage == 'convert':
+            changed[stage] = run_convert(args)
+        else:
+            images = converted_images(load_state('convert'))
+            if not images:
+                sys.exit(f"State convert kosong ({PIPELINE_DIR}/convert.json); jalankan stage convert dulu.")
+            if stage == 'verify':
+                changed[stage] = run_verify(args, images)
+            elif stage == 'split':
+                changed[stage] = run_split(args, images)
+            else:
+                changed[stage] = run_train_prep(args)
+        timings[stage] = time.time() - start
+        print()
+
+    print(f"=== Pipeline selesai dalam {time.time() - start_all:.1f} detik ===")
+    for stage, seconds in timings.items():
+        print(f"- {stage:10s}: {changed[stage]} unit diproses ulang, {seconds:.2f} detik")
+    print(f"State: {PIPELINE_DIR}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import numpy as np
+
+def quaternion_to_matrix(quaternions):
+    """
+    Konversi quaternion nuScenes (w, x, y, z) ke matriks rotasi secara batch.
+    Input (..., 4), output (..., 3, 3). Quaternion dinormalisasi dulu seperti pyquaternion.
+    """
+    q = np.asarray(quaternions, dtype=np.float64)
+    q = q / np.linalg.norm(q, axis=-1, keepdims=True)
+    w, x, y, z = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    rot = np.empty(q.shape[:-1] + (3, 3), dtype=np.float64)
+    rot[..., 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+    rot[..., 0, 1] = 2.0 * (x * y - w * z)
+    rot[..., 0, 2] = 2.0 * (x * z + w * y)
+    rot[..., 1, 0] = 2.0 * (x * y + w * z)
+    rot[..., 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+    rot[..., 1, 2] = 2.0 * (y * z - w * x)
+    rot[..., 2, 0] = 2.0 * (x * z - w * y)
+    rot[..., 2, 1] = 2.0 * (y * z + w * x)
+    rot[..., 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+    return rot
+
+def transform_matrix(translation, rotation):
+    """
+    Matriks 4x4 pose (translation, rotation), yaitu frame pose -> frame global.
+    Bisa batch: translation (...,3), rotation (...,4) -> (...,4,4).
+    """
+    rot = quaternion_to_matrix(rotation)
+    mat = np.zeros(rot.shape[:-2] + (4, 4))
+    mat[..., :3, :3] = rot
+    mat[..., :3, 3] = np.asarray(translation, dtype=np.float64)
+    mat[..., 3, 3] = 1.0
+    return mat
+
+def inverse_transform_matrix(translation, rotation):
+    """
+    Matriks 4x4 kebalikan dari pose (translation, rotation), yaitu frame global -> frame pose.
+    Bisa batch: translation (...,3), rotation (...,4) -> (...,4,4).
+    """
+    rot_t = np.swapaxes(quaternion_to_matrix(rotation), -1, -2)
+    translation = np.asarray(translation, dtype=np.float64)
+    mat = np.zeros(rot_t.shape[:-2] + (4, 4))
+    mat[..., :3, :3] = rot_t
+    mat[..., :3, 3] = -np.matmul(rot_t, translation[..., None])[..., 0]
+    mat[..., 3, 3] = 1.0
+    return mat
+
+def camera_projection_matrix(camera_intrinsic, sensor_translation, sensor_rotation, ego_translation, ego_rotation):
+    """
+    Gabungkan transformasi global -> ego -> sensor -> image menjadi satu matriks 3x4.
+    Hasil perkalian dengan titik homogen [x, y, z, 1] = [u*d, v*d, d].
+    Bisa batch: semua argumen boleh punya dimensi depan yang sama, output (...,3,4).
+    """
+    global_to_ego = inverse_transform_matrix(ego_translation, ego_rotation)
+    ego_to_sensor = inverse_transform_matrix(sensor_translation, sensor_rotation)
+    camera_intrinsic = np.asarray(camera_intrinsic, dtype=np.float64)
+    intrinsic = np.zeros(camera_intrinsic.shape[:-2] + (3, 4))
+    intrinsic[..., :3] = camera_intrinsic
+    return np.matmul(np.matmul(intrinsic, ego_to_sensor), global_to_ego)
+
+def annotation_corners(centers, sizes, rotations):
+    """
+    Hitung 8 sudut box 3D untuk N anotasi sekaligus (urutan sama dengan Box.corners()).
+    centers (N,3), sizes (N,3) format nuScenes [w, l, h], rotations (N,4). Output (N,8,3).
+    """
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    sizes = np.asarray(sizes, dtype=np.float64).reshape(-1, 3)
+    signs = np.array([
+        [1, 1, 1, 1, -1, -1, -1, -1],
+        [1, -1, -1, 1, 1, -1, -1, 1],
+        [1, 1, -1, -1, 1, 1, -1, -1],
+    ], dtype=np.float64)
+    # Box lokal: x = l/2, y = w/2, z = h/2
+    half = sizes[:, [1, 0, 2]] / 2.0
+    local = half[:, :, None] * signs[None, :, :]                       # (N,3,8)
+    rot = quaternion_to_matrix(np.asarray(rotations, dtype=np.float64).reshape(-1, 4))
+    corners = np.matmul(rot, local) + centers[:, :, None]              # (N,3,8)
+    return corners.transpose(0, 2, 1)
+
+def project_corners(corners, projections):
+    """
+    Proyeksikan sudut (N,8,3) ke semua kamera (C,3,4) dalam satu matmul.
+    Output (C,N,8,2) koordinat pixel, dinormalisasi dengan depth seperti view_points(normalize=True).
+    """
+    n = corners.shape[0]
+    homogeneous = np.concatenate([corners.reshape(-1, 3), np.ones((n * 8, 1))], axis=1)
+    points = np.einsum('cij,pj->cpi', projections, homogeneous)         # (C,N*8,3)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pixels = points[:, :, :2] / points[:, :, 2:3]
+    return pixels.reshape(projections.shape[0], n, 8, 2)
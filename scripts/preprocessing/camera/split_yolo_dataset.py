@@ -1,80 +1,367 @@
 import os
-import shutil
-import random
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import yaml
 from tqdm import tqdm
+from materialize import STRATEGIES, MaterializeStats, materialize
+from packed_labels import PackedLabels, export_label, arrays_to_lines
+from image_shards import SHARD_SIZE, write_shards, txt_label_reader
+from nuscenes_to_yolo import MANIFEST_PATH
+from verify_camera_data import check_label_line
+
+IMAGE_SRC = '../../../data/processed/nuscenes/camera/images'
+LABEL_SRC = '../../../data/processed/nuscenes/camera/labels'
+OUT_ROOT = '../../../data/datasets/camera'
+SPLIT_META_PATH = '../../../data/meta/train_val_split.json'
+SPLITS = ['train', 'val', 'test']
+# 'list' = tidak menyalin apa pun, hanya menulis train.txt/val.txt/test.txt berisi path image
+# 'shards' = tulis shard tar berurutan per split (lihat image_shards.py) + data_shards.yaml
+SPLIT_STRATEGIES = STRATEGIES + ('list', 'shards')
+# scene = scene nuScenes (dari manifest konversi), log = nama log di nama file, image = per gambar
+GROUP_BY = ('scene', 'log', 'image')
+
+def parse_ratio(ratio_str):
+    ratios = [int(x) for x in ratio_str.strip().split(":")]
+    if len(ratios) != 3:
+        raise ValueError("Rasio harus dalam format 3 angka, mis: 8:1:1")
+    if any(r < 0 for r in ratios):
+        raise ValueError("Rasio tidak boleh negatif.")
+    total = sum(ratios)
+    if total == 0:
+        raise ValueError("Jumlah rasio harus lebih dari 0.")
+    return ratios, [r/total for r in ratios]
 
 def get_user_ratio():
     while True:
         try:
             ratio_str = input("Masukkan rasio split (train:val:test), misal 8:1:1 untuk 80% train, 10% val, 10% test (total 10): ")
-            ratios = [int(x) for x in ratio_str.strip().split(":")]
-            if len(ratios) != 3:
-                raise ValueError("Rasio harus dalam format 3 angka, mis: 8:1:1")
-            total = sum(ratios)
-            if total != 10:
+            ratios, normalized = parse_ratio(ratio_str)
+            if sum(ratios) != 10:
                 raise ValueError("Jumlah rasio harus tepat 10, mis: 8:1:1")
-            if any(r < 0 for r in ratios):
-                raise ValueError("Rasio tidak boleh negatif.")
-            return ratios, [r/total for r in ratios]
+            return ratios, normalized
         except Exception as e:
             print(f"Input tidak valid: {e}\nContoh input yang benar: 8:1:1 (total 10)")
 
-def main():
-    IMAGE_SRC = '../../../data/processed/nuscenes/camera/images'
-    LABEL_SRC = '../../../data/processed/nuscenes/camera/labels'
-    OUT_ROOT = '../../../data/datasets/camera'
-    SPLITS = ['train', 'val', 'test']
+def parse_args():
+    parser = argparse.ArgumentParser(description="Split dataset YOLO (images & labels) ke train/val/test.")
+    parser.add_argument('--ratios', help="Rasio train:val:test, mis. 8:1:1. Jika kosong dan terminal interaktif, akan ditanya.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed untuk urutan grup (hasil split deterministik).")
+    parser.add_argument('--group-by', choices=GROUP_BY, default='scene',
+                        help="Unit split: semua frame dalam satu grup selalu masuk split yang sama.")
+    parser.add_argument('--no-stratify', action='store_true',
+                        help="Jangan seimbangkan jumlah box per kelas antar split (hanya jumlah gambar).")
+    parser.add_argument('--image-src', default=IMAGE_SRC)
+    parser.add_argument('--label-src', default=LABEL_SRC)
+    parser.add_argument('--packed-dir', default=None,
+                        help="Baca label dari store terpaket; label per split di-export ke .txt.")
+    parser.add_argument('--out-root', default=OUT_ROOT)
+    parser.add_argument('--materialize', choices=SPLIT_STRATEGIES, default='copy',
+                        help="copy, hardlink, symlink, reflink, auto (reflink -> hardlink -> copy), "
+                             "list (hanya tulis file daftar image per split), atau shards (shard tar berurutan).")
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help="Jumlah gambar per shard (--materialize shards).")
+    return parser.parse_args()
 
-    print("=== Script Split Data YOLO (images & labels) ===\n")
-    raw_ratios, ratios = get_user_ratio()
-    print(f"\nRasio split: train={ratios[0]*100:.1f}%, val={ratios[1]*100:.1f}%, test={ratios[2]*100:.1f}%\n")
+def load_scene_index(manifest_path=MANIFEST_PATH):
+    """image -> scene_token dari manifest konversi nuScenes (kosong jika belum ada)."""
+    scenes = {}
+    if not os.path.exists(manifest_path):
+        return scenes
+    with open(manifest_path) as f:
+        next(f, None)
+        for line in f:
+            parts = line.rstrip('\n').split(',')
+            if len(parts) == 4:
+                scenes[parts[3]] = parts[1]
+    return scenes
 
-    all_images = sorted([f for f in os.listdir(IMAGE_SRC) if f.lower().endswith('.jpg')])
-    random.shuffle(all_images)
-    n = len(all_images)
+def group_key(img_file, group_by, scene_index):
+    if group_by == 'image':
+        return img_file
+    if group_by == 'scene' and img_file in scene_index:
+        return scene_index[img_file]
+    # Nama file nuScenes: <log>__<CHANNEL>__<timestamp>.jpg
+    return img_file.split('__', 1)[0]
+
+def scan_dataset(image_src, label_src, group_by, scene_index, packed=None):
+    """
+    Satu pass os.scandir di folder image dan label (atau store terpaket). Return list image,
+    index grup per image, nama grup, dan matriks jumlah box per kelas per grup (G, C).
+    Baris label yang formatnya tidak valid dilewati dan hanya dihitung.
+    """
+    images = sorted(entry.name for entry in os.scandir(image_src) if entry.name.lower().endswith('.jpg'))
+    label_entries = {}
+    if packed is None and os.path.isdir(label_src):
+        label_entries = {entry.name: entry.path for entry in os.scandir(label_src) if entry.name.endswith('.txt')}
+
+    group_names = []
+    group_ids = {}
+    image_groups = np.empty(len(images), dtype=np.int64)
+    counts = []  # list of dict per grup: class_id -> jumlah box
+    invalid_lines = 0
+    for i, img_file in enumerate(tqdm(images, desc="Scan label", unit='file')):
+        key = group_key(img_file, group_by, scene_index)
+        gid = group_ids.get(key)
+        if gid is None:
+            gid = group_ids[key] = len(group_names)
+            group_names.append(key)
+            counts.append({})
+        image_groups[i] = gid
+        if packed is not None:
+            if img_file in packed:
+                group_counts = counts[gid]
+                for class_id in packed.labels(img_file)[0].tolist():
+                    group_counts[class_id] = group_counts.get(class_id, 0) + 1
+            continue
+        label_path = label_entries.get(img_file[:-4] + '.txt')
+        if label_path is None:
+            continue
+        group_counts = counts[gid]
+        with open(label_path, errors='replace') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                # Baris rusak dilewati (seperti verify_camera_data), bukan menghentikan split
+                if check_label_line(line) is not None:
+                    invalid_lines += 1
+                    continue
+                class_id = int(float(line.split(None, 1)[0]))
+                group_counts[class_id] = group_counts.get(class_id, 0) + 1
+    if invalid_lines:
+        print(f"Peringatan: {invalid_lines} baris label tidak valid dilewati (cek dengan verify_camera_data.py)")
 
-    split_counts = [int(r * n) for r in ratios]
-    # Koreksi agar total = n (misal saat pembulatan)
-    split_counts[-1] = n - sum(split_counts[:-1])
+    num_classes = 1 + max((max(c) for c in counts if c), default=-1)
+    class_counts = np.zeros((len(group_names), max(num_classes, 1)), dtype=np.int64)
+    for gid, group_counts in enumerate(counts):
+        for class_id, count in group_counts.items():
+            if class_id >= 0:
+                class_counts[gid, class_id] = count
+    return images, image_groups, group_names, class_counts
 
+def assign_groups(group_sizes, class_counts, ratios, seed=0, stratify=True):
+    """
+    Bagi grup ke split secara deterministik (per seed). Grup diacak dengan seed lalu diurutkan dari
+    yang paling banyak memuat kelas langka (rarity dikuantisasi, jadi seed tetap mengacak grup dengan
+    rarity serupa); tiap grup masuk split dengan kekurangan (relatif ke target) terbesar, baik dari
+    jumlah gambar maupun jumlah box per kelas. Return index split per grup.
+    """
+    ratios = np.asarray(ratios, dtype=np.float64)
+    active = np.nonzero(ratios > 0)[0]
+    num_groups = len(group_sizes)
+    assignment = np.full(num_groups, active[0], dtype=np.int64)
+    if num_groups == 0 or len(active) == 1:
+        return assignment
+
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(num_groups)
+    class_totals = class_counts.sum(axis=0).astype(np.float64)
+    if stratify and class_totals.sum() > 0:
+        rarity = (class_counts / np.maximum(class_totals, 1.0)).sum(axis=1)
+        # Rarity dikuantisasi (skala log, 2 bucket per faktor 2): tanpa ini urutan hanya ditentukan
+        # nilai float dan seed cuma memecah nilai yang persis sama, sehingga --seed tidak berpengaruh
+        bucket = np.floor(2 * np.log2(np.maximum(rarity, 1e-12)))
+        order = order[np.argsort(-bucket[order], kind='stable')]
+
+    target_images = ratios[active] * float(np.sum(group_sizes))
+    target_classes = ratios[active][:, None] * class_totals[None, :]
+    cur_images = np.zeros(len(active))
+    cur_classes = np.zeros((len(active), class_counts.shape[1]))
+    for gid in order:
+        score = (target_images - cur_images) / np.maximum(target_images, 1.0)
+        group_classes = class_counts[gid]
+        if stratify and group_classes.any():
+            deficit = (target_classes - cur_classes) / np.maximum(target_classes, 1.0)
+            score = 0.5 * score + 0.5 * (deficit @ group_classes) / group_classes.sum()
+        best = int(np.argmax(score))
+        assignment[gid] = active[best]
+        cur_images[best] += group_sizes[gid]
+        cur_classes[best] += group_classes
+    return assignment
+
+def build_split(image_src, label_src, ratios, seed=0, group_by='scene', stratify=True, scene_index=None,
+                packed=None):
+    """
+    API split: return dict split -> list image, dan ringkasan (jumlah grup/gambar/box per kelas per split).
+    """
+    if scene_index is None:
+        scene_index = load_scene_index() if group_by == 'scene' else {}
+    images, image_groups, group_names, class_counts = scan_dataset(image_src, label_src, group_by, scene_index, packed)
+    group_sizes = np.bincount(image_groups, minlength=len(group_names))
+    assignment = assign_groups(group_sizes, class_counts, ratios, seed, stratify)
+
+    image_splits = assignment[image_groups] if len(images) else np.zeros(0, dtype=np.int64)
     split_files = {}
-    idx = 0
-    for i, split in enumerate(SPLITS):
-        count = split_counts[i]
-        if count > 0:
-            split_files[split] = all_images[idx:idx + count]
-        idx += count
+    summary = {}
+    for s, split in enumerate(SPLITS):
+        if ratios[s] <= 0:
+            continue
+        split_files[split] = [img for img, sid in zip(images, image_splits) if sid == s]
+        in_split = assignment == s
+        summary[split] = {
+            'groups': int(in_split.sum()),
+            'images': len(split_files[split]),
+            'boxes_per_class': class_counts[in_split].sum(axis=0).tolist(),
+        }
+    return split_files, summary
 
-    # Hanya proses split dengan count > 0
+def write_split_lists(out_root, image_src, split_files):
+    """Tulis <split>.txt berisi path absolut image. Ultralytics mencari label di folder labels/ sebelahnya."""
+    os.makedirs(out_root, exist_ok=True)
+    paths = {}
+    for split, images_list in split_files.items():
+        path = os.path.join(out_root, f'{split}.txt')
+        with open(path, 'w') as f:
+            for img_file in images_list:
+                f.write(os.path.abspath(os.path.join(image_src, img_file)) + '\n')
+        paths[split] = path
+    return paths
+
+def write_split_meta(path, args, raw_ratios, summary):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            'ratios': raw_ratios,
+            'seed': args.seed,
+            'group_by': args.group_by,
+            'stratify': not args.no_stratify,
+            'splits': summary,
+        }, f, indent=2)
+
+def prune_split_dirs(out_root, split_files):
+    """
+    Hapus file di images/<split> dan labels/<split> yang tidak ada di assignment baru (termasuk
+    split yang kini kosong), agar rerun dengan rasio/grup/seed lain tidak meninggalkan grup di dua split.
+    """
+    removed = 0
     for split in SPLITS:
-        if raw_ratios[SPLITS.index(split)] == 0:
-            continue
-        os.makedirs(os.path.join(OUT_ROOT, 'images', split), exist_ok=True)
-        os.makedirs(os.path.join(OUT_ROOT, 'labels', split), exist_ok=True)
+        keep = {os.path.splitext(img_file)[0] for img_file in split_files.get(split, [])}
+        for kind in ('images', 'labels'):
+            split_dir = os.path.join(out_root, kind, split)
+            if not os.path.isdir(split_dir):
+                continue
+            for entry in os.scandir(split_dir):
+                if os.path.splitext(entry.name)[0] not in keep and not entry.is_dir(follow_symlinks=False):
+                    os.unlink(entry.path)
+                    removed += 1
+    return removed
 
-    print("Mulai menyalin file gambar & label ke folder split...\n")
+def write_shard_yaml(out_root, shard_dirs):
+    """data_shards.yaml: sama dengan data.yaml (nc/names) tetapi train/val/test menunjuk ke folder shard."""
+    data_yaml = os.path.join(out_root, 'data.yaml')
+    config = {}
+    if os.path.exists(data_yaml):
+        with open(data_yaml) as f:
+            config = yaml.safe_load(f) or {}
     for split in SPLITS:
-        if raw_ratios[SPLITS.index(split)] == 0:
-            continue
-        images_list = split_files.get(split, [])
+        config.pop(split, None)
+    config['path'] = os.path.abspath(out_root)
+    config['format'] = 'shards'
+    for split, shard_dir in shard_dirs.items():
+        config[split] = os.path.relpath(shard_dir, out_root)
+    path = os.path.join(out_root, 'data_shards.yaml')
+    with open(path, 'w') as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+    return path
+
+def main():
+    args = parse_args()
+
+    print("=== Script Split Data YOLO (images & labels) ===\n")
+    if args.ratios:
+        raw_ratios, ratios = parse_ratio(args.ratios)
+    elif sys.stdin.isatty():
+        raw_ratios, ratios = get_user_ratio()
+    else:
+        sys.exit("Rasio wajib diisi lewat --ratios saat tidak interaktif (mis. --ratios 8:1:1).")
+    print(f"\nRasio split: train={ratios[0]*100:.1f}%, val={ratios[1]*100:.1f}%, test={ratios[2]*100:.1f}%")
+    print(f"Grup: {args.group_by}, seed: {args.seed}, stratifikasi kelas: {'tidak' if args.no_stratify else 'ya'}\n")
+
+    packed = PackedLabels(args.packed_dir) if args.packed_dir else None
+    start = time.time()
+    split_files, summary = build_split(
+        args.image_src, args.label_src, ratios, seed=args.seed,
+        group_by=args.group_by, stratify=not args.no_stratify, packed=packed
+    )
+    print(f"\nSplit dihitung dalam {time.time() - start:.2f} detik")
+    for split, info in summary.items():
+        print(f"  {split:5s}: {info['groups']} grup, {info['images']} gambar, {sum(info['boxes_per_class'])} box")
+    write_split_meta(SPLIT_META_PATH, args, raw_ratios, summary)
+    print(f"  Ringkasan split: {SPLIT_META_PATH}\n")
+
+    if args.materialize == 'list':
+        if packed is not None and not os.path.isdir(args.label_src):
+            # Ultralytics butuh .txt di folder labels/ sebelah images/
+            os.makedirs(args.label_src, exist_ok=True)
+            for image_name in packed.image_names():
+                export_label(packed, image_name, os.path.join(args.label_src, image_name[:-4] + '.txt'))
+        start = time.time()
+        paths = write_split_lists(args.out_root, args.image_src, split_files)
+        print("=== Selesai menulis daftar split (tanpa menyalin image/label) ===")
+        for split, path in paths.items():
+            print(f"    {split}: {path} ({len(split_files[split])} image)")
+        print(f"  Waktu: {time.time() - start:.2f} detik. Arahkan train/val di data.yaml ke file .txt di atas.\n")
+        return
+
+    if args.materialize == 'shards':
+        if packed is not None:
+            def label_text(img_file):
+                if img_file not in packed:
+                    return ''
+                return ''.join(line + '\n' for line in arrays_to_lines(*packed.labels(img_file)))
+        else:
+            label_text = txt_label_reader(args.label_src)
+        start = time.time()
+        shard_dirs = {}
+        for split, images_list in split_files.items():
+            shard_dirs[split] = os.path.join(args.out_root, 'shards', split)
+            count = write_shards(args.image_src, images_list, shard_dirs[split], args.shard_size, label_text)
+            print(f"Split '{split}': {len(images_list)} gambar -> {count} shard")
+        yaml_path = write_shard_yaml(args.out_root, shard_dirs)
+        print(f"\n=== Selesai menulis shard dalam {time.time() - start:.2f} detik ===")
+        print(f"  Data yaml untuk training dari shard: {yaml_path}\n")
+        return
+
+    removed = prune_split_dirs(args.out_root, split_files)
+    if removed:
+        print(f"Hapus {removed} file dari split lama yang tidak ada di assignment baru.")
+    # Hanya proses split dengan count > 0
+    for split in split_files:
+        os.makedirs(os.path.join(args.out_root, 'images', split), exist_ok=True)
+        os.makedirs(os.path.join(args.out_root, 'labels', split), exist_ok=True)
+
+    print(f"Mulai materialisasi ({args.materialize}) file gambar & label ke folder split...\n")
+    image_stats = MaterializeStats()
+    label_stats = MaterializeStats()
+    start = time.time()
+    for split, images_list in split_files.items():
         print(f"Split '{split}' ({len(images_list)} file):")
         for img_file in tqdm(images_list, desc=f"  Copying {split}", unit='file'):
             label_file = img_file.replace('.jpg', '.txt')
-            src_img = os.path.join(IMAGE_SRC, img_file)
-            dst_img = os.path.join(OUT_ROOT, 'images', split, img_file)
-            shutil.copy2(src_img, dst_img)
-            src_lbl = os.path.join(LABEL_SRC, label_file)
-            dst_lbl = os.path.join(OUT_ROOT, 'labels', split, label_file)
-            if os.path.exists(src_lbl):
-                shutil.copy2(src_lbl, dst_lbl)
+            src_img = os.path.join(args.image_src, img_file)
+            dst_img = os.path.join(args.out_root, 'images', split, img_file)
+            materialize(src_img, dst_img, args.materialize, image_stats, overwrite=True)
+            src_lbl = os.path.join(args.label_src, label_file)
+            dst_lbl = os.path.join(args.out_root, 'labels', split, label_file)
+            if packed is not None:
+                if os.path.lexists(dst_lbl):
+                    os.unlink(dst_lbl)
+                if img_file in packed:
+                    export_label(packed, img_file, dst_lbl)
+                else:
+                    open(dst_lbl, 'a').close()
+            elif os.path.exists(src_lbl):
+                materialize(src_lbl, dst_lbl, args.materialize, label_stats, overwrite=True)
             else:
                 open(dst_lbl, 'a').close()
 
+    image_stats.report("Materialisasi image")
+    label_stats.report("Materialisasi label")
+    print(f"\nTotal waktu: {time.time() - start:.2f} detik")
     print("\n=== Selesai split data ke folder images/ dan labels/ per split ===")
     print("  Lokasi contoh hasil:")
-    for split in SPLITS:
-        if raw_ratios[SPLITS.index(split)] == 0:
-            continue
+    for split in split_files:
         print(f"    images/{split}/, labels/{split}/")
     print()
 
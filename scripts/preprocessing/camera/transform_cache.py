@@ -0,0 +1,117 @@
+import os
+import json
+import shutil
+import numpy as np
+from projection import camera_projection_matrix
+
+# Index transformasi persisten: sample_data kamera -> matriks proyeksi world->image 3x4
+CACHE_DIR = '../../../data/meta/transform_cache'
+# Tabel sumber; jika salah satu berubah (ukuran/mtime) cache dibangun ulang
+SOURCE_TABLES = ('sample_data', 'calibrated_sensor', 'ego_pose')
+TOKEN_DTYPE = 'S32'
+
+def table_fingerprint(dataroot, version):
+    fingerprint = {'version': version}
+    for table in SOURCE_TABLES:
+        stat = os.stat(os.path.join(dataroot, version, f'{table}.json'))
+        fingerprint[table] = [stat.st_size, stat.st_mtime_ns]
+    return fingerprint
+
+def _load_table(dataroot, version, table):
+    with open(os.path.join(dataroot, version, f'{table}.json')) as f:
+        return json.load(f)
+
+def build_transform_cache(dataroot, version, out_dir):
+    """
+    Hitung matriks proyeksi untuk semua sample_data kamera (keyframe dan sweep) langsung
+    dari JSON, tanpa NuScenes devkit. Hasil ditulis atomik ke out_dir.
+    """
+    fingerprint = table_fingerprint(dataroot, version)
+    calibs = {cs['token']: cs for cs in _load_table(dataroot, version, 'calibrated_sensor') if cs['camera_intrinsic']}
+    camera_data = [sd for sd in _load_table(dataroot, version, 'sample_data') if sd['calibrated_sensor_token'] in calibs]
+    camera_data.sort(key=lambda sd: sd['token'])
+    ego_needed = {sd['ego_pose_token'] for sd in camera_data}
+    ego_poses = {ep['token']: ep for ep in _load_table(dataroot, version, 'ego_pose') if ep['token'] in ego_needed}
+
+    # Transformasi sensor & intrinsic hanya dihitung per calibrated_sensor unik, lalu diindeks
+    calib_tokens = sorted(calibs)
+    calib_index = {token: i for i, token in enumerate(calib_tokens)}
+    calib_rows = np.array([calib_index[sd['calibrated_sensor_token']] for sd in camera_data], dtype=np.int64)
+    intrinsics = np.array([calibs[t]['camera_intrinsic'] for t in calib_tokens], dtype=np.float64).reshape(-1, 3, 3)
+    sensor_t = np.array([calibs[t]['translation'] for t in calib_tokens], dtype=np.float64).reshape(-1, 3)
+    sensor_r = np.array([calibs[t]['rotation'] for t in calib_tokens], dtype=np.float64).reshape(-1, 4)
+    ego_t = np.array([ego_poses[sd['ego_pose_token']]['translation'] for sd in camera_data], dtype=np.float64).reshape(-1, 3)
+    ego_r = np.array([ego_poses[sd['ego_pose_token']]['rotation'] for sd in camera_data], dtype=np.float64).reshape(-1, 4)
+
+    projections = camera_projection_matrix(
+        intrinsics[calib_rows], sensor_t[calib_rows], sensor_r[calib_rows], ego_t, ego_r
+    )
+    tokens = np.array([sd['token'] for sd in camera_data], dtype=TOKEN_DTYPE)
+
+    tmp_dir = out_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, 'tokens.npy'), tokens)
+    np.save(os.path.join(tmp_dir, 'projections.npy'), projections)
+    with open(os.path.join(tmp_dir, 'fingerprint.json'), 'w') as f:
+        json.dump(fingerprint, f)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return len(tokens)
+
+class TransformCache:
+    """Reader memory-mapped untuk index transformasi. Lookup token lewat binary search."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.tokens = np.load(os.path.join(cache_dir, 'tokens.npy'), mmap_mode='r')
+        self.matrices = np.load(os.path.join(cache_dir, 'projections.npy'), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def indices(self, sample_data_tokens):
+        keys = np.asarray(sample_data_tokens, dtype=TOKEN_DTYPE)
+        idx = np.searchsorted(self.tokens, keys)
+        idx_clipped = np.minimum(idx, len(self.tokens) - 1)
+        if len(self.tokens) == 0 or not np.all(self.tokens[idx_clipped] == keys):
+            raise KeyError("sample_data token tidak ada di transform cache")
+        return idx
+
+    def projections(self, sample_data_tokens):
+        """Matriks (N,3,4) untuk list token sample_data kamera."""
+        return np.asarray(self.matrices[self.indices(sample_data_tokens)])
+
+    def projection(self, sample_data_token):
+        return self.projections([sample_data_token])[0]
+
+def load_or_build(dataroot, version, cache_dir=CACHE_DIR, verbose=True):
+    """
+    Buka cache untuk versi dataset ini. Dibangun (ulang) jika belum ada atau jika tabel
+    JSON sumber berubah sejak cache dibuat.
+    """
+    out_dir = os.path.join(cache_dir, version)
+    fingerprint_path = os.path.join(out_dir, 'fingerprint.json')
+    current = table_fingerprint(dataroot, version)
+    stored = None
+    if os.path.exists(fingerprint_path):
+        with open(fingerprint_path) as f:
+            stored = json.load(f)
+    if stored != current:
+        if verbose:
+            reason = "belum ada" if stored is None else "tabel sumber berubah"
+            print(f"Membangun transform cache {version} ({reason}) ...")
+        count = build_transform_cache(dataroot, version, out_dir)
+        if verbose:
+            print(f"Transform cache: {count} sample_data kamera -> {out_dir}")
+    return TransformCache(out_dir)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Bangun/cek index transformasi world->image nuScenes.")
+    parser.add_argument('--dataroot', default='../../../data/raw/nuscenes')
+    parser.add_argument('--version', default='v1.0-mini')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+    cache = load_or_build(args.dataroot, args.version, args.cache_dir)
+    print(f"{len(cache)} matriks proyeksi siap dipakai.")
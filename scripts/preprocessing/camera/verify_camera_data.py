@@ -1,16 +1,32 @@
 import os
+import json
+import time
+import struct
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, ProcessPoolExecutor, wait
+import numpy as np
+import yaml
+from packed_labels import PackedLabels, arrays_to_lines
 
 IMAGE_DIR = '../../../data/processed/nuscenes/camera/images'
 LABEL_DIR = '../../../data/processed/nuscenes/camera/labels'
+DATA_YAML = '../../../data/datasets/camera/data.yaml'
+REPORT_PATH = '../../../data/meta/camera_verification.json'
+EXPECTED_SIZE = (1600, 900)
 
-num_images = 0
-num_labels = 0
-num_pairs = 0
-num_missing_label = 0
-num_empty_label = 0
-num_invalid_format = 0
+# Jenis masalah per pasangan image-label (urutan = urutan tampilan ringkasan)
+STATUSES = {
+    'valid': "Pasangan gambar-label valid",
+    'missing_label': "Label hilang",
+    'empty_label': "File label kosong",
+    'invalid_format': "Invalid label format",
+    'invalid_class': "Class id di luar range nc",
+    'bad_image': "Header JPEG tidak terbaca",
+    'size_mismatch': "Ukuran gambar tidak sesuai",
+}
 
-invalid_files = []
+# Marker SOF JPEG yang memuat tinggi & lebar (bukan DHT/JPG/DAC)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
 
 def check_label_format(line):
     """
@@ -31,56 +47,267 @@ def check_label_format(line):
         return False
     return True
 
-all_images = [f for f in os.listdir(IMAGE_DIR) if f.lower().endswith('.jpg')]
-
-for img_file in all_images:
-    num_images += 1
-    label_file = img_file.replace('.jpg', '.txt')
-    label_path = os.path.join(LABEL_DIR, label_file)
-    if not os.path.exists(label_path):
-        num_missing_label += 1
-        invalid_files.append((img_file, "File label tidak ditemukan"))
-        continue
-    num_labels += 1
-    with open(label_path, 'r') as f:
-        lines = f.readlines()
-    if len(lines) == 0:
-        num_empty_label += 1
-        invalid_files.append((img_file, "File label kosong"))
-        continue
-    valid = True
-    for line in lines:
-        if not check_label_format(line):
-            num_invalid_format += 1
-            invalid_files.append((img_file, f"Format label tidak valid: {line.strip()}"))
-            valid = False
-            break
-    if valid:
-        num_pairs += 1
-
-print("\n=== Verifikasi Data Kamera ===")
-print(f"Total gambar ditemukan      : {len(all_images)}")
-print(f"Total label ditemukan       : {num_labels}")
-print(f"Pasangan gambar-label valid : {num_pairs}")
-print(f"Label hilang                : {num_missing_label}")
-print(f"File label kosong           : {num_empty_label}")
-print(f"Invalid label format        : {num_invalid_format}")
-print("\n=== Detail Verifikasi ===")
-
-total_invalid = num_missing_label + num_empty_label + num_invalid_format
-total_checked = num_pairs + total_invalid
-print(f"Total pasangan dicek        : {total_checked}")
-print(f"Total pasangan tidak valid  : {total_invalid}\n")
-
-if total_invalid > 0:
-    print("Ada masalah pada beberapa pasangan image-label:")
-    print(f" - {num_missing_label} label hilang")
-    print(f" - {num_empty_label} label kosong")
-    print(f" - {num_invalid_format} label dengan format tidak valid")
-    if invalid_files:
-        print("\nDaftar file bermasalah :")
-        for f, err in invalid_files[:]:
-            print(f" - {f}: {err}")
-    print("\nMohon periksa dan perbaiki sebelum melanjutkan ke training YOLO.\n")
-else:
-    print("Semua pasangan image-label valid! Siap untuk training YOLO.\n")
\ No newline at end of file
+def check_label_line(line, num_classes=None):
+    """Seperti check_label_format, tapi juga cek class id dalam [0, nc). Return status atau None jika valid."""
+    if not check_label_format(line):
+        return 'invalid_format'
+    if num_classes is not None:
+        cls = float(line.split(None, 1)[0])
+        if cls != int(cls) or not 0 <= cls < num_classes:
+            return 'invalid_class'
+    return None
+
+def jpeg_size(path, chunk_size=65536):
+    """Baca (width, height) dari marker SOF JPEG tanpa decode gambar. None jika tidak terbaca."""
+    with open(path, 'rb') as f:
+        data = f.read(chunk_size)
+        if data[:2] != b'\xff\xd8':
+            return None
+        pos = 2
+        while True:
+            # Pastikan header segment (marker + panjang + data SOF) ada di buffer
+            while len(data) < pos + 9:
+                more = f.read(chunk_size)
+                if not more:
+                    return None
+                data += more
+            if data[pos] != 0xFF:
+                return None
+            marker = data[pos + 1]
+            if marker == 0xFF:  # padding
+                pos += 1
+                continue
+            if marker in _SOF_MARKERS:
+                height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+                return width, height
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                pos += 2
+                continue
+            if marker in (0xD9, 0xDA):  # EOI / SOS sebelum SOF
+                return None
+            length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+            pos += 2 + length
+
+def check_label_arrays(class_ids, boxes, num_classes=None):
+    """Versi vektorisasi check_label_line untuk label terpaket. Return list (index_box, status)."""
+    bad_format = ~np.all((boxes >= 0.0) & (boxes <= 1.0), axis=1)
+    bad_class = np.zeros(len(class_ids), dtype=bool)
+    if num_classes is not None:
+        bad_class = class_ids >= num_classes
+    return [(int(i), 'invalid_format' if bad_format[i] else 'invalid_class')
+            for i in np.nonzero(bad_format | bad_class)[0]]
+
+# Store terpaket dibuka sekali per proses worker
+_PACKED = {}
+
+def _open_packed(packed_dir):
+    if packed_dir not in _PACKED:
+        _PACKED[packed_dir] = PackedLabels(packed_dir)
+    return _PACKED[packed_dir]
+
+def load_num_classes(data_yaml):
+    with open(data_yaml) as f:
+        data = yaml.safe_load(f)
+    if 'nc' in data:
+        return int(data['nc'])
+    return len(data['names'])
+
+def verify_pair(image_dir, label_dir, img_file, num_classes=None, expected_size=None, packed_dir=None):
+    """
+    Verifikasi satu pasangan image-label. Semua baris label dicek, bukan hanya sampai error pertama.
+    Jika packed_dir diberikan, label dibaca dari store terpaket (baris = index box + 1).
+    """
+    result = {'image': img_file, 'status': 'valid', 'boxes': 0, 'errors': []}
+    if expected_size is not None:
+        size = jpeg_size(os.path.join(image_dir, img_file))
+        if size is None:
+            result['errors'].append(('bad_image', None, None))
+        elif tuple(size) != tuple(expected_size):
+            result['errors'].append(('size_mismatch', None, f"{size[0]}x{size[1]}"))
+
+    if packed_dir is not None:
+        packed = _open_packed(packed_dir)
+        if img_file not in packed:
+            result['errors'].append(('missing_label', None, None))
+        else:
+            class_ids, boxes = packed.labels(img_file)
+            if len(class_ids) == 0:
+                result['errors'].append(('empty_label', None, None))
+            bad = check_label_arrays(class_ids, boxes, num_classes)
+            result['boxes'] += len(class_ids) - len(bad)
+            for i, status in bad:
+                line = arrays_to_lines(class_ids[i:i + 1], boxes[i:i + 1])[0]
+                result['errors'].append((status, i + 1, line))
+        if result['errors']:
+            result['status'] = result['errors'][0][0]
+        return result
+
+    label_path = os.path.join(label_dir, img_file[:-4] + '.txt')
+    try:
+        with open(label_path) as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        result['errors'].append(('missing_label', None, None))
+        lines = None
+    if lines is not None:
+        if len(lines) == 0:
+            result['errors'].append(('empty_label', None, None))
+        for line_no, line in enumerate(lines, 1):
+            status = check_label_line(line, num_classes)
+            if status is None:
+                result['boxes'] += 1
+            else:
+                result['errors'].append((status, line_no, line.strip()))
+    if result['errors']:
+        result['status'] = result['errors'][0][0]
+    return result
+
+def _verify_batch(job):
+    image_dir, label_dir, names, num_classes, expected_size, packed_dir = job
+    return [verify_pair(image_dir, label_dir, name, num_classes, expected_size, packed_dir) for name in names]
+
+def iter_image_batches(image_dir, batch_size):
+    """Stream nama file .jpg dari os.scandir dalam batch, tanpa membangun list penuh dulu."""
+    batch = []
+    with os.scandir(image_dir) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith('.jpg'):
+                batch.append(entry.name)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+def verify_dataset(image_dir=IMAGE_DIR, label_dir=LABEL_DIR, data_yaml=DATA_YAML, workers=None,
+                   executor='thread', batch_size=1024, expected_size=EXPECTED_SIZE, max_issues=None,
+                   packed_dir=None):
+    """
+    Verifikasi semua pasangan image-label secara paralel (thread untuk I/O seperti NFS,
+    process untuk parsing CPU-bound). Return report dict: summary, per_status, issues.
+    """
+    num_classes = load_num_classes(data_yaml) if data_yaml else None
+    workers = workers or os.cpu_count()
+    pool_cls = ThreadPoolExecutor if executor == 'thread' else ProcessPoolExecutor
+    counts = {status: 0 for status in STATUSES}
+    issues = []
+    num_images = num_boxes = num_lines_invalid = 0
+    start = time.time()
+
+    def consume(results):
+        nonlocal num_images, num_boxes, num_lines_invalid
+        for result in results:
+            num_images += 1
+            num_boxes += result['boxes']
+            # Satu pasangan bisa punya beberapa jenis masalah; hitung sekali per jenis
+            for status in {e[0] for e in result['errors']} or {'valid'}:
+                counts[status] += 1
+            line_errors = [e for e in result['errors'] if e[1] is not None]
+            num_lines_invalid += len(line_errors)
+            if result['errors'] and (max_issues is None or len(issues) < max_issues):
+                errors = result['errors'] if max_issues is None else result['errors'][:max_issues - len(issues)]
+                for status, line_no, detail in errors:
+                    issues.append({'image': result['image'], 'status': status, 'line': line_no, 'detail': detail})
+
+    with pool_cls(max_workers=workers) as pool:
+        # Jendela terbatas batch yang sedang diproses: listing scandir dan hasil tidak pernah
+        # ditampung penuh di memori (pool.map akan men-submit seluruh generator sekaligus)
+        pending = set()
+        for names in iter_image_batches(image_dir, batch_size):
+            pending.add(pool.submit(_verify_batch, (image_dir, label_dir, names, num_classes, expected_size,
+                                                    packed_dir)))
+            if len(pending) >= 2 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    consume(future.result())
+        for future in pending:
+            consume(future.result())
+
+    elapsed = time.time() - start
+    return {
+        'summary': {
+            'image_dir': os.path.abspath(image_dir),
+            'label_dir': os.path.abspath(packed_dir or label_dir),
+            'num_classes': num_classes,
+            'expected_size': list(expected_size) if expected_size else None,
+            'images': num_images,
+            'boxes': num_boxes,
+            'invalid_lines': num_lines_invalid,
+            'seconds': round(elapsed, 3),
+            'images_per_sec': round(num_images / elapsed, 1) if elapsed > 0 else None,
+        },
+        'per_status': counts,
+        'issues': issues,
+    }
+
+def write_report(report, path):
+    """Tulis report sebagai JSON, atau Parquet (tabel issues) jika path berakhiran .parquet."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if path.endswith('.parquet'):
+        import pandas as pd  # butuh pyarrow/fastparquet
+        df = pd.DataFrame(report['issues'], columns=['image', 'status', 'line', 'detail'])
+        df.to_parquet(path, index=False)
+        with open(path[:-len('.parquet')] + '.summary.json', 'w') as f:
+            json.dump({k: v for k, v in report.items() if k != 'issues'}, f, indent=2)
+    else:
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+def print_report(report, max_list=50):
+    summary = report['summary']
+    counts = report['per_status']
+    print("\n=== Verifikasi Data Kamera ===")
+    print(f"Total gambar ditemukan      : {summary['images']}")
+    print(f"Total box valid             : {summary['boxes']}")
+    for status, desc in STATUSES.items():
+        print(f"{desc:<28s}: {counts[status]}")
+    print(f"Baris label tidak valid     : {summary['invalid_lines']}")
+    print(f"Waktu                       : {summary['seconds']:.2f} detik ({summary['images_per_sec']} gambar/detik)")
+
+    total_invalid = summary['images'] - counts['valid']
+    print(f"\nTotal pasangan tidak valid  : {total_invalid}\n")
+    if total_invalid > 0:
+        print("Ada masalah pada beberapa pasangan image-label.")
+        if report['issues']:
+            print(f"\nDaftar file bermasalah (maks {max_list}):")
+            for issue in report['issues'][:max_list]:
+                where = f" baris {issue['line']}" if issue['line'] else ""
+                detail = f": {issue['detail']}" if issue['detail'] else ""
+                print(f" - {issue['image']}{where} [{STATUSES[issue['status']]}]{detail}")
+        print("\nMohon periksa dan perbaiki sebelum melanjutkan ke training YOLO.\n")
+    else:
+        print("Semua pasangan image-label valid! Siap untuk training YOLO.\n")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Verifikasi pasangan image-label YOLO kamera.")
+    parser.add_argument('--image-dir', default=IMAGE_DIR)
+    parser.add_argument('--label-dir', default=LABEL_DIR)
+    parser.add_argument('--packed-dir', default=None,
+                        help="Baca label dari store terpaket (labels_packed/) alih-alih .txt per gambar.")
+    parser.add_argument('--data-yaml', default=DATA_YAML, help="Sumber nc untuk cek range class id.")
+    parser.add_argument('--workers', type=int, default=0, help="Jumlah worker (0 = jumlah core CPU).")
+    parser.add_argument('--executor', choices=('thread', 'process'), default='thread',
+                        help="thread untuk storage lambat (NFS), process untuk parsing CPU-bound.")
+    parser.add_argument('--batch-size', type=int, default=1024, help="Jumlah file per batch scandir.")
+    parser.add_argument('--expected-size', default=f"{EXPECTED_SIZE[0]}x{EXPECTED_SIZE[1]}",
+                        help="Ukuran gambar WxH yang diharapkan; 'none' untuk melewati cek header JPEG.")
+    parser.add_argument('--report', default=REPORT_PATH, help="Path report .json atau .parquet.")
+    parser.add_argument('--max-issues', type=int, default=None, help="Batas jumlah issue yang disimpan di report.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    expected_size = None
+    if args.expected_size.lower() != 'none':
+        expected_size = tuple(int(v) for v in args.expected_size.lower().split('x'))
+    report = verify_dataset(
+        args.image_dir, args.label_dir, args.data_yaml, workers=args.workers or None,
+        executor=args.executor, batch_size=args.batch_size, expected_size=expected_size,
+        max_issues=args.max_issues, packed_dir=args.packed_dir,
+    )
+    print_report(report)
+    write_report(report, args.report)
+    print(f"Report: {args.report}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+import numpy as np
+from tqdm import tqdm
+from sample_store import SampleStore, SampleStoreWriter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'camera'))
+from nuscenes_to_yolo import CLASS_MAPPING, DATAROOT, NUSC_VERSION, list_samples_by_scene
+from projection import inverse_transform_matrix, quaternion_to_matrix, transform_matrix
+
+# Preprocessing LiDAR (nuScenes LIDAR_TOP atau sesi recorder CARLA) ke dataset voxel:
+#   1. baca sweep lewat memmap (.pcd.bin nuScenes / .ply biner CARLA), tanpa parsing per titik
+#   2. gabungkan N sweep ke frame sensor keyframe dengan kompensasi gerak ego (satu matriks 4x4 per sweep)
+#      dan kolom selisih waktu dt, seperti LidarPointCloud.from_file_multisweep
+#   3. crop ke POINT_RANGE lalu voxelisasi vektorisasi: key voxel linear (z*ny + y)*nx + x per titik,
+#      dikelompokkan dengan np.unique, slot dalam voxel dari urutan stabil
+#   4. tulis array float32 layout tetap ke SampleStore (memmap) + box 3D di frame sensor keyframe
+# Kolom titik: x, y, z, intensity, dt. Box: x, y, z, w, l, h, yaw (frame LiDAR, tangan kanan).
+CARLA_RAW_DIR = '../../../data/raw/carla'
+LIDAR_OUT_DIR = '../../../data/datasets/lidar/pointclouds'
+LABEL_OUT_DIR = '../../../data/datasets/lidar/labels'
+LIDAR_CHANNEL = 'LIDAR_TOP'
+NSWEEPS = 10
+# Pillar 0.2 x 0.2 m (PointPillars/CenterPoint nuScenes), range +-51.2 m
+POINT_RANGE = (-51.2, -51.2, -5.0, 51.2, 51.2, 3.0)
+VOXEL_SIZE = (0.2, 0.2, 8.0)
+MAX_POINTS = 20
+MAX_VOXELS = 30000
+NUM_FEATURES = 5
+BOX_DIM = 7
+MIN_SWEEP_DISTANCE = 1.0   # titik di sekitar atap mobil sendiri dibuang (seperti remove_close devkit)
+
+def read_pcd_bin(path):
+    """Sweep nuScenes .pcd.bin (float32 x, y, z, intensity, ring) -> view memmap (N, 4)."""
+    return np.memmap(path, dtype=np.float32, mode='r').reshape(-1, 5)[:, :4]
+
+def read_ply(path):
+    """PLY biner recorder CARLA (float32 x, y, z, intensity) -> view memmap (N, 4)."""
+    with open(path, 'rb') as f:
+        header = b''
+        while not header.endswith(b'end_header\n'):
+            line = f.readline()
+            if not line:
+                raise ValueError(f"Header PLY tidak lengkap: {path}")
+            header += line
+    count = int(header.split(b'element vertex ')[1].split(b'\n')[0])
+    if count == 0:
+        return np.zeros((0, 4), dtype=np.float32)
+    return np.memmap(path, dtype='<f4', mode='r', offset=len(header), shape=(count, 4))
+
+READERS = {
+    '.bin': read_pcd_bin,
+    '.ply': read_ply,
+}
+
+def load_sweeps(sweeps, min_distance=MIN_SWEEP_DISTANCE):
+    """
+    sweeps: list (path, matriks 4x4 sweep -> frame keyframe, dt detik). Output float32 (N, 5)
+    [x, y, z, intensity, dt]; satu matmul per sweep, tidak ada loop per titik.
+    """
+    clouds = []
+    for path, matrix, dt in sweeps:
+        points = READERS[os.path.splitext(path)[1]](path)
+        near = (np.abs(points[:, 0]) < min_distance) & (np.abs(points[:, 1]) < min_distance)
+        points = points[~near]
+        cloud = np.empty((len(points), NUM_FEATURES), dtype=np.float32)
+        cloud[:, :3] = points[:, :3] @ matrix[:3, :3].T.astype(np.float32) + matrix[:3, 3].astype(np.float32)
+        cloud[:, 3] = points[:, 3]
+        cloud[:, 4] = dt
+        clouds.append(cloud)
+    if not clouds:
+        return np.zeros((0, NUM_FEATURES), dtype=np.float32)
+    return np.concatenate(clouds)
+
+def voxelize(points, voxel_size=VOXEL_SIZE, point_range=POINT_RANGE, max_points=MAX_POINTS, max_voxels=MAX_VOXELS):
+    """
+    Voxelisasi vektorisasi. Titik di luar range dibuang; voxel diurutkan sesuai kemunculan titik pertama
+    (sama dengan voxel generator spconv), maksimal max_voxels voxel dan max_points titik per voxel.
+    Return voxels float32 (V, max_points, C), coords int32 (V, 3) [z, y, x], num_points int32 (V,).
+    """
+    lower = np.asarray(point_range[:3], dtype=np.float32)
+    size = np.asarray(voxel_size, dtype=np.float32)
+    grid = np.round((np.asarray(point_range[3:]) - np.asarray(point_range[:3])) / np.asarray(voxel_size)).astype(np.int64)
+    idx = np.floor((points[:, :3] - lower) / size).astype(np.int64)
+    inside = np.all((idx >= 0) & (idx < grid), axis=1)
+    points, idx = points[inside], idx[inside]
+    channels = points.shape[1]
+    if len(points) == 0:
+        return (np.zeros((0, max_points, channels), dtype=np.float32), np.zeros((0, 3), dtype=np.int32),
+                np.zeros(0, dtype=np.int32))
+
+    keys = (idx[:, 2] * grid[1] + idx[:, 1]) * grid[0] + idx[:, 0]
+    unique_keys, first, inverse, counts = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+    by_first = np.argsort(first, kind='stable')
+    voxel_rank = np.empty_like(by_first)
+    voxel_rank[by_first] = np.arange(len(by_first))
+    voxel_id = voxel_rank[inverse]
+
+    order = np.argsort(voxel_id, kind='stable')
+    sorted_id = voxel_id[order]
+    starts = np.concatenate([[0], np.cumsum(counts[by_first])[:-1]])
+    slot = np.arange(len(order)) - starts[sorted_id]
+    keep = (slot < max_points) & (sorted_id < max_voxels)
+
+    num_voxels = min(len(unique_keys), max_voxels)
+    voxels = np.zeros((num_voxels, max_points, channels), dtype=np.float32)
+    voxels[sorted_id[keep], slot[keep]] = points[order[keep]]
+    kept_keys = unique_keys[by_first[:num_voxels]]
+    coords = np.stack([kept_keys // (grid[0] * grid[1]), (kept_keys // grid[0]) % grid[1], kept_keys % grid[0]],
+                      axis=1).astype(np.int32)
+    num_points = np.minimum(counts[by_first[:num_voxels]], max_points).astype(np.int32)
+    return voxels, coords, num_points
+
+def boxes_in_range(boxes, point_range=POINT_RANGE):
+    lower, upper = np.asarray(point_range[:3]), np.asarray(point_range[3:])
+    return np.all((boxes[:, :3] >= lower) & (boxes[:, :3] <= upper), axis=1)
+
+# --- sumber nuScenes ----------------------------------------------------------
+def nuscenes_sample_job(nusc, sample_token, dataroot, nsweeps=NSWEEPS, channel=LIDAR_CHANNEL):
+    """Sweep (path, matriks ke frame keyframe, dt) + box 3D anotasi di frame LiDAR keyframe."""
+    sample_row = nusc.tables['sample'].row(sample_token)
+    sample = nusc.get('sample', sample_token)
+    sd = nusc.columns['sample_data']
+    calib = nusc.columns['calibrated_sensor']
+    ego = nusc.columns['ego_pose']
+    ref_row = nusc.tables['sample_data'].row(sample['data'][channel])
+
+    def sensor_to_global(row):
+        c, e = sd['calibrated_sensor'][row], sd['ego_pose'][row]
+        return transform_matrix(ego['translation'][e], ego['rotation'][e]) @ \
+            transform_matrix(calib['translation'][c], calib['rotation'][c])
+
+    ref_c, ref_e = sd['calibrated_sensor'][ref_row], sd['ego_pose'][ref_row]
+    global_to_ref = inverse_transform_matrix(calib['translation'][ref_c], calib['rotation'][ref_c]) @ \
+        inverse_transform_matrix(ego['translation'][ref_e], ego['rotation'][ref_e])
+    ref_time = sd['timestamp'][ref_row]
+
+    sweeps = []
+    row = ref_row
+    while row >= 0 and len(sweeps) < nsweeps:
+        matrix = global_to_ref @ sensor_to_global(row)
+        sweeps.append((os.path.join(dataroot, sd['filename'][row].decode()), matrix, (ref_time - sd['timestamp'][row]) / 1e6))
+        row = sd['prev'][row]
+
+    anns = nusc.columns['sample_annotation']
+    rows = nusc.sample_annotation_rows(sample_row)
+    class_ids = np.array([CLASS_MAPPING.get(nusc.category_names[c], -1) for c in anns['category'][rows]], dtype=np.int64)
+    keep = class_ids >= 0
+    rows, class_ids = rows[keep], class_ids[keep]
+    boxes = np.zeros((len(rows), BOX_DIM), dtype=np.float32)
+    if len(rows):
+        centers = anns['translation'][rows] @ global_to_ref[:3, :3].T + global_to_ref[:3, 3]
+        rot = global_to_ref[:3, :3] @ quaternion_to_matrix(anns['rotation'][rows])
+        boxes[:, :3] = centers
+        boxes[:, 3:6] = anns['size'][rows]          # w, l, h
+        boxes[:, 6] = np.arctan2(rot[:, 1, 0], rot[:, 0, 0])
+    return {'id': sample_token, 'sweeps': sweeps, 'boxes': boxes, 'classes': class_ids}
+
+# --- sumber CARLA -------------------------------------------------------------
+def carla_session_jobs(session_dir, nsweeps=NSWEEPS):
+    """
+    Job per frame recorder yang punya LiDAR. Koordinat CARLA (tangan kiri, y kanan) dibalik ke
+    tangan kanan (y kiri) agar sama dengan konvensi nuScenes.
+    """
+    from carla_to_yolo import carla_class_ids, carla_transform_matrices, load_session
+
+    flip = np.diag([1.0, -1.0, 1.0, 1.0])
+    session = os.path.basename(os.path.normpath(session_dir))
+    records = [r for r in load_session(session_dir) if 'file' in r['sensors'].get('lidar', {})]
+    jobs = []
+    for i, record in enumerate(records):
+        lidar = record['sensors']['lidar']
+        world_to_ref = flip @ np.linalg.inv(carla_transform_matrices(lidar['transform'])[0])
+        sweeps = []
+        for prev in records[max(0, i - nsweeps + 1):i + 1][::-1]:
+            matrix = world_to_ref @ carla_transform_matrices(prev['sensors']['lidar']['transform'])[0]
+            sweeps.append((os.path.join(session_dir, prev['sensors']['lidar']['file']), matrix,
+                           record['timestamp'] - prev['timestamp']))
+        actors = [a for a in record.get('actors', []) if a['id'] != record.get('ego_id')]
+        class_ids = carla_class_ids(actors)
+        actors = [a for a, c in zip(actors, class_ids) if c >= 0]
+        class_ids = class_ids[class_ids >= 0]
+        boxes = np.zeros((len(actors), BOX_DIM), dtype=np.float32)
+        if actors:
+            actor_mats = carla_transform_matrices([a['transform'] for a in actors])
+            local = np.array([a['box_location'] + [1.0] for a in actors])
+            centers = np.einsum('ij,nj->ni', world_to_ref, np.einsum('nij,nj->ni', actor_mats, local))
+            extents = np.array([a['extent'] for a in actors])
+            boxes[:, :3] = centers[:, :3]
+            boxes[:, 3] = extents[:, 1] * 2   # w
+            boxes[:, 4] = extents[:, 0] * 2   # l
+            boxes[:, 5] = extents[:, 2] * 2   # h
+            yaw = np.array([a['transform'][4] for a in actors]) - lidar['transform'][4]
+            boxes[:, 6] = -np.radians(yaw)
+        jobs.append({'id': f"{session}_{record['frame']:08d}", 'sweeps': sweeps, 'boxes': boxes,
+                     'classes': class_ids})
+    return jobs
+
+# --- worker -------------------------------------------------------------------
+_WORKER = {}
+
+def _init_worker(options):
+    _WORKER.update(options)
+    if options['source'] == 'nuscenes':
+        from nuscenes_lite import load_cached
+
+        _WORKER['nusc'] = load_cached(version=options['version'], dataroot=options['dataroot'], verbose=False,
+                                      channels=[LIDAR_CHANNEL])
+
+def process_job(job, options):
+    points = load_sweeps(job['sweeps'])
+    voxels, coords, num_points = voxelize(points, options['voxel_size'], options['point_range'],
+                                          options['max_points'], options['max_voxels'])
+    keep = boxes_in_range(job['boxes'], options['point_range'])
+    return {
+        'id': job['id'],
+        'points': len(points),
+        'lidar': {'voxels': voxels, 'coords': coords, 'num_points': num_points},
+        'labels': {'boxes': job['boxes'][keep], 'classes': job['classes'][keep]},
+    }
+
+def _process(task):
+    if _WORKER['source'] == 'nuscenes':
+        job = nuscenes_sample_job(_WORKER['nusc'], task, _WORKER['dataroot'], _WORKER['nsweeps'])
+    else:
+        job = task
+    return process_job(job, _WORKER)
+
+def store_fields(max_points):
+    lidar = {'voxels': (np.float32, (max_points, NUM_FEATURES)), 'coords': (np.int32, (3,)),
+             'num_points': (np.int32, ())}
+    labels = {'boxes': (np.float32, (BOX_DIM,)), 'classes': (np.int16, ())}
+    return lidar, labels
+
+def store_meta(args):
+    return {
+        'source': args.source,
+        'version': args.version if args.source == 'nuscenes' else None,
+        'nsweeps': args.nsweeps,
+        'point_range': list(args.range),
+        'voxel_size': list(args.voxel_size),
+        'max_points': args.max_points,
+        'max_voxels': args.max_voxels,
+        'point_features': ['x', 'y', 'z', 'intensity', 'dt'],
+        'box_format': ['x', 'y', 'z', 'w', 'l', 'h', 'yaw'],
+        'class_mapping': CLASS_MAPPING,
+    }
+
+def check_store_meta(path, meta, restart):
+    """Store lama hanya dilanjutkan jika parameter preprocessing sama; meta.json ditulis ulang."""
+    meta_path = os.path.join(path, 'meta.json')
+    if not restart and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f) != json.loads(json.dumps(meta)):
+                sys.exit(f"Parameter berbeda dengan store {path}; jalankan dengan --restart.")
+    os.makedirs(path, exist_ok=True)
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Preprocessing LiDAR nuScenes/CARLA ke dataset voxel memory-mapped.")
+    parser.add_argument('--source', choices=('nuscenes', 'carla'), default='nuscenes')
+    parser.add_argument('--version', default=NUSC_VERSION, help="Versi nuScenes, mis. v1.0-trainval.")
+    parser.add_argument('--dataroot', default=DATAROOT)
+    parser.add_argument('--sessions', nargs='*', default=None, help="Folder sesi CARLA (default: semua di data/raw/carla).")
+    parser.add_argument('--nsweeps', type=int, default=NSWEEPS, help="Jumlah sweep yang digabung per sample (1 = keyframe saja).")
+    parser.add_argument('--range', type=float, nargs=6, default=POINT_RANGE, metavar=('X0', 'Y0', 'Z0', 'X1', 'Y1', 'Z1'))
+    parser.add_argument('--voxel-size', type=float, nargs=3, default=VOXEL_SIZE, metavar=('VX', 'VY', 'VZ'))
+    parser.add_argument('--max-points', type=int, default=MAX_POINTS, help="Titik maksimum per voxel.")
+    parser.add_argument('--max-voxels', type=int, default=MAX_VOXELS, help="Voxel maksimum per sample.")
+    parser.add_argument('--workers', type=int, default=0, help="Jumlah proses. 0 = semua core CPU.")
+    parser.add_argument('--out-dir', default=LIDAR_OUT_DIR)
+    parser.add_argument('--label-dir', default=LABEL_OUT_DIR)
+    parser.add_argument('--restart', action='store_true', help="Kosongkan store dan proses ulang semua sample.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.source == 'nuscenes':
+        scenes = list_samples_by_scene(args.dataroot, args.version)
+        tasks = [token for tokens in scenes.values() for token in tokens]
+    else:
+        sessions = args.sessions or sorted(
+            os.path.join(CARLA_RAW_DIR, name) for name in os.listdir(CARLA_RAW_DIR)
+            if os.path.isfile(os.path.join(CARLA_RAW_DIR, name, 'manifest.jsonl'))
+        )
+        tasks = [job for session_dir in sessions for job in carla_session_jobs(session_dir, args.nsweeps)]
+
+    check_store_meta(args.out_dir, store_meta(args), args.restart)
+    lidar_fields, label_fields = store_fields(args.max_points)
+    lidar_store = SampleStoreWriter(args.out_dir, lidar_fields, restart=args.restart)
+    label_store = SampleStoreWriter(args.label_dir, label_fields, restart=args.restart)
+    # Checkpoint: sample yang sudah ada di kedua store dilewati
+    done = set(lidar_store.samples) & set(label_store.samples)
+    task_id = (lambda t: t) if args.source == 'nuscenes' else (lambda t: t['id'])
+    pending = [t for t in tasks if task_id(t) not in done]
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+    workers = max(1, min(workers, len(pending)))
+    options = dict(source=args.source, version=args.version, dataroot=args.dataroot, nsweeps=args.nsweeps,
+                   voxel_size=tuple(args.voxel_size), point_range=tuple(args.range),
+                   max_points=args.max_points, max_voxels=args.max_voxels)
+    print(f"\n=== Preprocessing LiDAR {args.source}: {len(tasks)} sample, sisa {len(pending)}, "
+          f"{args.nsweeps} sweep, {workers} worker ===")
+
+    total_points = total_voxels = 0
+    start = time.time()
+    pool = None
+    if workers == 1:
+        _init_worker(options)
+        results = map(_process, pending)
+    else:
+        if args.source == 'nuscenes':
+            from nuscenes_lite import load_cached
+
+            # Parse JSON sekali di proses utama (cache kolom .npy); worker cukup memmap
+            load_cached(args.version, args.dataroot, verbose=False, channels=[LIDAR_CHANNEL])
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(options,))
+        results = pool.imap(_process, pending, chunksize=2)
+    try:
+        for result in tqdm(results, total=len(pending), desc="LiDAR", unit="sample"):
+            # Label dulu, lalu voxel: sample dianggap selesai jika ada di kedua store
+            label_store.append(result['id'], result['labels'])
+            lidar_store.append(result['id'], result['lidar'])
+            total_points += result['points']
+            total_voxels += len(result['lidar']['num_points'])
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        lidar_store.close()
+        label_store.close()
+        if pool is not None:
+            pool.close()
+            pool.join()
+    elapsed = time.time() - start
+
+    processed = len(pending)
+    print(f"\n=== Selesai {processed} sample dalam {elapsed:.1f} detik ===")
+    if processed:
+        print(f"- Titik input     : {total_points} ({total_points / max(elapsed, 1e-9) / 1e6:.2f} juta titik/detik)")
+        print(f"- Voxel per sample: {total_voxels / processed:.0f} (maks {args.max_voxels})")
+        print(f"- Data ditulis    : {(lidar_store.bytes_written + label_store.bytes_written) / 1e6:.1f} MB "
+              f"({lidar_store.bytes_written / processed / 1e6:.2f} MB/sample)")
+    print(f"- Store voxel     : {args.out_dir} ({len(SampleStore(args.out_dir))} sample)")
+    print(f"- Store label     : {args.label_dir}")
+
+if __name__ == "__main__":
+    main()
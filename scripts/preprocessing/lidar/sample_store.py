@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'camera'))
+from packed_labels import read_append_index, recover_append_index
+
+# Store append-only untuk array per sample dengan layout tetap (pengganti satu file per sample):
+#   layout.json     nama field -> dtype & bentuk per baris, mis. voxels float32 (20, 5)
+#   <field>.bin     semua baris field itu digabung, bisa di-memmap sebagai (M, *shape)
+#   offsets.i64     int64 (N+1, F): baris sample ke-i untuk field f = [offsets[i, f], offsets[i+1, f])
+#   samples.txt     id sample (token nuScenes / sesi_frame CARLA), satu per baris
+# Seperti packed_labels: setelah crash store dipotong ke sample terakhir yang lengkap.
+
+class SampleStoreWriter:
+    """fields: dict nama -> (dtype, shape per baris). restart=True mengosongkan store lama."""
+
+    def __init__(self, path, fields, restart=False):
+        self.path = path
+        self.fields = {name: (np.dtype(dtype), tuple(shape)) for name, (dtype, shape) in fields.items()}
+        os.makedirs(path, exist_ok=True)
+        layout = {name: {'dtype': dtype.str, 'shape': list(shape)} for name, (dtype, shape) in self.fields.items()}
+        layout_path = os.path.join(path, 'layout.json')
+        offsets_path = os.path.join(path, 'offsets.i64')
+        if not restart and os.path.exists(offsets_path):
+            with open(layout_path) as f:
+                if json.load(f) != layout:
+                    raise ValueError(f"Layout store {path} berbeda dengan parameter sekarang; jalankan dengan --restart.")
+        else:
+            with open(layout_path, 'w') as f:
+                json.dump(layout, f, indent=2)
+            for name in self.fields:
+                open(os.path.join(path, name + '.bin'), 'wb').close()
+            open(os.path.join(path, 'samples.txt'), 'w').close()
+            np.zeros((1, len(self.fields)), dtype=np.int64).tofile(offsets_path)
+
+        samples_path = os.path.join(path, 'samples.txt')
+        self.samples, offsets = recover_append_index(offsets_path, samples_path, len(self.fields))
+        self._rows = offsets[-1].copy()
+        self._files = {}
+        for f, (name, (dtype, shape)) in enumerate(self.fields.items()):
+            handle = open(os.path.join(path, name + '.bin'), 'r+b')
+            handle.truncate(int(self._rows[f]) * dtype.itemsize * int(np.prod(shape, dtype=np.int64)))
+            handle.seek(0, os.SEEK_END)
+            self._files[name] = handle
+        self._offsets = open(offsets_path, 'ab')
+        self._samples = open(samples_path, 'a', newline='\n')
+        self.bytes_written = 0
+
+    def append(self, sample_id, arrays):
+        """arrays: dict nama field -> array (K, *shape). Field yang tidak ada = 0 baris."""
+        for f, (name, (dtype, shape)) in enumerate(self.fields.items()):
+            data = np.ascontiguousarray(arrays.get(name, np.zeros((0,) + shape)), dtype=dtype).reshape((-1,) + shape)
+            buf = data.tobytes()
+            self._files[name].write(buf)
+            self.bytes_written += len(buf)
+            self._rows[f] += len(data)
+        self._offsets.write(self._rows.tobytes())
+        self._samples.write(sample_id + '\n')
+        self.samples.append(sample_id)
+
+    def flush(self):
+        # Data field dulu (sampai ke disk), baru offset & id, agar setelah crash tidak ada
+        # offset yang menunjuk ke data yang belum tersimpan
+        for handle in list(self._files.values()) + [self._offsets, self._samples]:
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def close(self):
+        self.flush()
+        for handle in list(self._files.values()) + [self._offsets, self._samples]:
+            handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class SampleStore:
+    """Reader memory-mapped. store[i] atau store.get(sample_id) -> dict nama field -> view array."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'layout.json')) as f:
+            layout = json.load(f)
+        self.fields = {name: (np.dtype(spec['dtype']), tuple(spec['shape'])) for name, spec in layout.items()}
+        self.samples, self.offsets = read_append_index(os.path.join(path, 'offsets.i64'),
+                                                       os.path.join(path, 'samples.txt'), len(self.fields))
+        self.arrays = {}
+        for f, (name, (dtype, shape)) in enumerate(self.fields.items()):
+            rows = int(self.offsets[-1, f])
+            if rows == 0:
+                self.arrays[name] = np.zeros((0,) + shape, dtype=dtype)
+            else:
+                self.arrays[name] = np.memmap(os.path.join(path, name + '.bin'), dtype=dtype, mode='r',
+                                              shape=(rows,) + shape)
+        # Sample yang ditulis ulang (run dilanjutkan) -> entri terakhir yang dipakai
+        self.index = {name: i for i, name in enumerate(self.samples)}
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, i):
+        return {name: self.arrays[name][self.offsets[i, f]:self.offsets[i + 1, f]]
+                for f, name in enumerate(self.fields)}
+
+    def get(self, sample_id):
+        return self[self.index[sample_id]]
+
+    def nbytes(self):
+        return sum(os.path.getsize(os.path.join(self.path, name + '.bin')) for name in self.fields)
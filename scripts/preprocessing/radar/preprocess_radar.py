@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+import numpy as np
+from tqdm import tqdm
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'camera'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lidar'))
+from nuscenes_to_yolo import CLASS_MAPPING, DATAROOT, NUSC_VERSION, list_samples_by_scene
+from projection import inverse_transform_matrix, quaternion_to_matrix, transform_matrix
+from sample_store import SampleStore, SampleStoreWriter
+
+# Preprocessing radar nuScenes (5 channel RADAR_*) per sample:
+#   1. file PCD biner dibaca langsung ke structured dtype NumPy yang dibangun dari header (tanpa loop per titik)
+#   2. filter state seperti default RadarPointCloud devkit (invalid_state 0, dyn_prop 0..6, ambig_state 3)
+#   3. N sweep terakhir dari semua radar ditumpuk, lalu satu transformasi vektorisasi ke frame ego keyframe
+#      (matriks 4x4 per sweep, di-gather per titik). Kecepatan terkompensasi (vx_comp, vy_comp) diputar ke
+#      frame ego dan posisi digeser v * dt ke waktu keyframe (kompensasi kecepatan radial)
+#   4. array float32 ringkas per sample ke SampleStore + box 3D di frame ego yang sama
+RADAR_OUT_DIR = '../../../data/datasets/radar/raw'
+LABEL_OUT_DIR = '../../../data/datasets/radar/labels'
+RADARS = ['RADAR_FRONT', 'RADAR_FRONT_LEFT', 'RADAR_FRONT_RIGHT', 'RADAR_BACK_LEFT', 'RADAR_BACK_RIGHT']
+REF_CHANNEL = 'LIDAR_TOP'   # frame ego pada timestamp keyframe LiDAR (= timestamp sample)
+NSWEEPS = 6
+INVALID_STATES = (0,)
+DYNPROP_STATES = tuple(range(7))
+AMBIG_STATES = (3,)
+POINT_FEATURES = ('x', 'y', 'z', 'vx', 'vy', 'rcs', 'dyn_prop', 'dt', 'sensor')
+BOX_DIM = 7
+
+PCD_TYPES = {('F', 4): '<f4', ('F', 8): '<f8', ('I', 1): 'i1', ('I', 2): '<i2', ('I', 4): '<i4',
+             ('U', 1): 'u1', ('U', 2): '<u2', ('U', 4): '<u4'}
+_DTYPE_CACHE = {}
+
+def pcd_dtype(fields, sizes, types):
+    """Structured dtype dari FIELDS/SIZE/TYPE header PCD (di-cache; semua file radar sama)."""
+    key = (tuple(fields), tuple(sizes), tuple(types))
+    if key not in _DTYPE_CACHE:
+        _DTYPE_CACHE[key] = np.dtype({'names': list(fields),
+                                      'formats': [PCD_TYPES[(t, int(size))] for t, size in zip(types, sizes)]})
+    return _DTYPE_CACHE[key]
+
+def read_radar_pcd(path):
+    """File .pcd radar nuScenes -> structured array (N,) field x, y, z, dyn_prop, id, rcs, vx, ..."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    end = data.index(b'DATA binary\n') + len(b'DATA binary\n')
+    meta = {}
+    for line in data[:end].decode('ascii').splitlines():
+        parts = line.split()
+        if parts and not parts[0].startswith('#'):
+            meta[parts[0]] = parts[1:]
+    dtype = pcd_dtype(meta['FIELDS'], meta['SIZE'], meta['TYPE'])
+    return np.frombuffer(data, dtype=dtype, count=int(meta['POINTS'][0]), offset=end)
+
+def valid_mask(points, invalid_states=INVALID_STATES, dynprop_states=DYNPROP_STATES, ambig_states=AMBIG_STATES):
+    return (np.isin(points['invalid_state'], invalid_states) & np.isin(points['dyn_prop'], dynprop_states) &
+            np.isin(points['ambig_state'], ambig_states))
+
+def accumulate_sweeps(sweeps, velocity_compensation=True):
+    """
+    sweeps: list (structured points, matriks 4x4 sensor sweep -> frame referensi, dt detik, index sensor).
+    Semua titik ditransformasi dalam satu einsum (matriks per titik lewat index sweep). Output float32
+    (N, len(POINT_FEATURES)).
+    """
+    if not sweeps:
+        return np.zeros((0, len(POINT_FEATURES)), dtype=np.float32)
+    points = np.concatenate([s[0] for s in sweeps])
+    counts = [len(s[0]) for s in sweeps]
+    sweep_index = np.repeat(np.arange(len(sweeps)), counts)
+    matrices = np.stack([s[1] for s in sweeps])[sweep_index]                     # (N,4,4)
+    dt = np.repeat(np.array([s[2] for s in sweeps], dtype=np.float64), counts)
+
+    xyz = np.stack([points['x'], points['y'], points['z']], axis=1).astype(np.float64)
+    vel = np.stack([points['vx_comp'], points['vy_comp'], np.zeros(len(points))], axis=1).astype(np.float64)
+    xyz = np.einsum('nij,nj->ni', matrices[:, :3, :3], xyz) + matrices[:, :3, 3]
+    vel = np.einsum('nij,nj->ni', matrices[:, :3, :3], vel)
+    if velocity_compensation:
+        xyz[:, :2] += vel[:, :2] * dt[:, None]
+
+    out = np.empty((len(points), len(POINT_FEATURES)), dtype=np.float32)
+    out[:, 0:3] = xyz
+    out[:, 3:5] = vel[:, :2]
+    out[:, 5] = points['rcs']
+    out[:, 6] = points['dyn_prop']
+    out[:, 7] = dt
+    out[:, 8] = np.repeat(np.array([s[3] for s in sweeps]), counts)
+    return out
+
+def sample_job(nusc, sample_token, dataroot, nsweeps=NSWEEPS, channels=RADARS, ref_channel=REF_CHANNEL):
+    """Sweep semua radar untuk satu sample + box 3D di frame ego referensi."""
+    sample_row = nusc.tables['sample'].row(sample_token)
+    sample = nusc.get('sample', sample_token)
+    sd = nusc.columns['sample_data']
+    calib = nusc.columns['calibrated_sensor']
+    ego = nusc.columns['ego_pose']
+    ref_row = nusc.tables['sample_data'].row(sample['data'][ref_channel])
+    ref_e = sd['ego_pose'][ref_row]
+    global_to_ref = inverse_transform_matrix(ego['translation'][ref_e], ego['rotation'][ref_e])
+    ref_time = sd['timestamp'][ref_row]
+
+    sweeps = []
+    for sensor, channel in enumerate(channels):
+        if channel not in sample['data']:
+            continue
+        row = nusc.tables['sample_data'].row(sample['data'][channel])
+        taken = 0
+        while row >= 0 and taken < nsweeps:
+            c, e = sd['calibrated_sensor'][row], sd['ego_pose'][row]
+            matrix = global_to_ref @ transform_matrix(ego['translation'][e], ego['rotation'][e]) @ \
+                transform_matrix(calib['translation'][c], calib['rotation'][c])
+            sweeps.append((os.path.join(dataroot, sd['filename'][row].decode()), matrix,
+                           (ref_time - sd['timestamp'][row]) / 1e6, sensor))
+            row = sd['prev'][row]
+            taken += 1
+
+    anns = nusc.columns['sample_annotation']
+    rows = nusc.sample_annotation_rows(sample_row)
+    class_ids = np.array([CLASS_MAPPING.get(nusc.category_names[c], -1) for c in anns['category'][rows]], dtype=np.int64)
+    keep = class_ids >= 0
+    rows, class_ids = rows[keep], class_ids[keep]
+    boxes = np.zeros((len(rows), BOX_DIM), dtype=np.float32)
+    if len(rows):
+        rot = global_to_ref[:3, :3] @ quaternion_to_matrix(anns['rotation'][rows])
+        boxes[:, :3] = anns['translation'][rows] @ global_to_ref[:3, :3].T + global_to_ref[:3, 3]
+        boxes[:, 3:6] = anns['size'][rows]
+        boxes[:, 6] = np.arctan2(rot[:, 1, 0], rot[:, 0, 0])
+    return sweeps, boxes, class_ids
+
+# --- worker -------------------------------------------------------------------
+_WORKER = {}
+
+def _init_worker(options):
+    from nuscenes_lite import load_cached
+
+    _WORKER.update(options)
+    _WORKER['nusc'] = load_cached(version=options['version'], dataroot=options['dataroot'], verbose=False,
+                                  channels=RADARS + [REF_CHANNEL])
+
+def _convert_scene(job):
+    scene_token, sample_tokens = job
+    results = []
+    for sample_token in sample_tokens:
+        sweeps, boxes, class_ids = sample_job(_WORKER['nusc'], sample_token, _WORKER['dataroot'], _WORKER['nsweeps'])
+        loaded = []
+        raw_points = 0
+        for path, matrix, dt, sensor in sweeps:
+            points = read_radar_pcd(path)
+            raw_points += len(points)
+            if _WORKER['filter']:
+                points = points[valid_mask(points)]
+            loaded.append((points, matrix, dt, sensor))
+        points = accumulate_sweeps(loaded, _WORKER['velocity_compensation'])
+        results.append((sample_token, raw_points, {'points': points}, {'boxes': boxes, 'classes': class_ids}))
+    return results
+
+def store_fields():
+    return {'points': (np.float32, (len(POINT_FEATURES),))}, {'boxes': (np.float32, (BOX_DIM,)), 'classes': (np.int16, ())}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Preprocessing radar nuScenes (multi-sweep) ke store memory-mapped.")
+    parser.add_argument('--version', default=NUSC_VERSION)
+    parser.add_argument('--dataroot', default=DATAROOT)
+    parser.add_argument('--nsweeps', type=int, default=NSWEEPS, help="Sweep per radar per sample.")
+    parser.add_argument('--no-velocity-compensation', action='store_true',
+                        help="Jangan geser posisi titik sweep lama dengan v * dt.")
+    parser.add_argument('--no-filter', action='store_true', help="Simpan semua titik (tanpa filter state devkit).")
+    parser.add_argument('--workers', type=int, default=0, help="Jumlah proses (per scene). 0 = semua core CPU.")
+    parser.add_argument('--out-dir', default=RADAR_OUT_DIR)
+    parser.add_argument('--label-dir', default=LABEL_OUT_DIR)
+    parser.add_argument('--restart', action='store_true')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    meta = {'version': args.version, 'nsweeps': args.nsweeps, 'channels': RADARS, 'ref_channel': REF_CHANNEL,
+            'velocity_compensation': not args.no_velocity_compensation, 'filter': not args.no_filter,
+            'point_features': list(POINT_FEATURES), 'box_format': ['x', 'y', 'z', 'w', 'l', 'h', 'yaw'],
+            'class_mapping': CLASS_MAPPING}
+    meta_path = os.path.join(args.out_dir, 'meta.json')
+    if not args.restart and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f) != json.loads(json.dumps(meta)):
+                sys.exit(f"Parameter berbeda dengan store {args.out_dir}; jalankan dengan --restart.")
+
+    point_fields, label_fields = store_fields()
+    radar_store = SampleStoreWriter(args.out_dir, point_fields, restart=args.restart)
+    label_store = SampleStoreWriter(args.label_dir, label_fields, restart=args.restart)
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    scenes = list_samples_by_scene(args.dataroot, args.version)
+    done = set(radar_store.samples) & set(label_store.samples)
+    jobs = [(scene, [t for t in tokens if t not in done]) for scene, tokens in scenes.items()]
+    jobs = [job for job in jobs if job[1]]
+    num_pending = sum(len(tokens) for _, tokens in jobs)
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+    workers = max(1, min(workers, len(jobs)))
+    options = dict(version=args.version, dataroot=args.dataroot, nsweeps=args.nsweeps,
+                   velocity_compensation=not args.no_velocity_compensation, filter=not args.no_filter)
+    print(f"\n=== Preprocessing radar: {num_pending} sample di {len(jobs)} scene, {args.nsweeps} sweep x "
+          f"{len(RADARS)} radar, {workers} worker ===")
+
+    raw_points = kept_points = 0
+    start = time.time()
+    pool = None
+    if workers == 1:
+        if jobs:
+            _init_worker(options)
+        results = map(_convert_scene, jobs)
+    else:
+        from nuscenes_lite import load_cached
+
+        # Parse JSON sekali di proses utama (cache kolom .npy); worker cukup memmap
+        load_cached(args.version, args.dataroot, verbose=False, channels=RADARS + [REF_CHANNEL])
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(options,))
+        results = pool.imap_unordered(_convert_scene, jobs, chunksize=1)
+    try:
+        with tqdm(total=num_pending, desc="Radar", unit="sample") as pbar:
+            for scene_results in results:
+                for sample_token, raw, points, labels in scene_results:
+                    label_store.append(sample_token, labels)
+                    radar_store.append(sample_token, points)
+                    raw_points += raw
+                    kept_points += len(points['points'])
+                radar_store.flush()
+                label_store.flush()
+                pbar.update(len(scene_results))
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        radar_store.close()
+        label_store.close()
+        if pool is not None:
+            pool.close()
+            pool.join()
+    elapsed = time.time() - start
+
+    print(f"\n=== Selesai {num_pending} sample dalam {elapsed:.1f} detik ===")
+    if num_pending:
+        print(f"- Titik dibaca    : {raw_points} ({raw_points / max(elapsed, 1e-9) / 1e3:.1f} ribu titik/detik), "
+              f"{kept_points} lolos filter")
+        print(f"- Titik per sample: {kept_points / num_pending:.0f}")
+        print(f"- Output          : {radar_store.bytes_written / num_pending / 1e3:.1f} KB titik + "
+              f"{label_store.bytes_written / num_pending / 1e3:.1f} KB label per sample")
+    print(f"- Store radar     : {args.out_dir} ({len(SampleStore(args.out_dir))} sample)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import time
+import argparse
+import cv2
+import numpy as np
+from ultralytics.data import YOLODataset
+from ultralytics.utils import LOGGER
+from ultralytics.utils.torch_utils import de_parallel
+
+from image_cache import CACHE_ROOT, MAX_CACHE_GB, open_cache
+from image_shards import is_shard_dir
+from shard_dataset import ShardYOLODataset, ShardDetectionTrainer, build_shard_dataset, build_shard_dataloader
+
+class ResizedCacheMixin:
+    """
+    load_image membaca gambar yang sudah di-resize dari image_cache (memmap) jika ada; gambar
+    yang tidak ada di cache (budget penuh) di-decode seperti biasa oleh kelas dasar.
+    """
+    cache_root = CACHE_ROOT
+    max_cache_bytes = MAX_CACHE_GB * 1e9
+    # Default kelas: __init__ dasar sudah bisa memanggil load_image (cache='ram') sebelum cache dibuka
+    resized_cache = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if isinstance(self.img_path, (str, os.PathLike)) and os.path.isdir(self.img_path):
+            self.resized_cache = open_cache(self.img_path, self.imgsz, self.cache_root, max_bytes=self.max_cache_bytes)
+        if self.resized_cache is not None:
+            LOGGER.info(f"{self.prefix}Cache resize: {len(self.resized_cache)}/{self.ni} gambar dari {self.resized_cache.path}")
+
+    def load_image(self, i, rect_mode=True):
+        # Cache hanya berisi gambar BGR 3 kanal; mode lain (grayscale dll) di-decode kelas dasar
+        if (self.ims[i] is not None or not rect_mode or self.resized_cache is None
+                or getattr(self, 'cv2_flag', cv2.IMREAD_COLOR) != cv2.IMREAD_COLOR):
+            return super().load_image(i, rect_mode)
+        hit = self.resized_cache.get(os.path.splitext(os.path.basename(self.im_files[i]))[0])
+        if hit is None:
+            return super().load_image(i, rect_mode)
+        # Salin dari memmap: augmentasi (HSV dll) bisa mengubah array secara in-place
+        im, hw0, hw = np.array(hit[0]), hit[1], hit[2]
+        if self.augment:
+            # Sama dengan BaseDataset.load_image: buffer dipakai mosaic untuk memilih gambar tambahan
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = im, hw0, hw
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                if self.cache != 'ram':
+                    self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return im, hw0, hw
+
+class CachedYOLODataset(ResizedCacheMixin, YOLODataset):
+    pass
+
+class CachedShardYOLODataset(ResizedCacheMixin, ShardYOLODataset):
+    pass
+
+def cached_dataset_cls(img_path):
+    return CachedShardYOLODataset if is_shard_dir(img_path) else CachedYOLODataset
+
+class CachedDetectionTrainer(ShardDetectionTrainer):
+    """Trainer (folder gambar biasa atau shard) yang membaca gambar ter-resize dari image_cache."""
+
+    def build_dataset(self, img_path, mode='train', batch=None):
+        gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+        return build_shard_dataset(self.args, img_path, batch, self.data, mode=mode, rect=mode == 'val',
+                                   stride=gs, dataset_cls=cached_dataset_cls(img_path))
+
+def run_benchmark(data_yaml, split='train', imgsz=640, batch=16, workers=4, epochs=2):
+    """Waktu satu epoch data pipeline (decode + augmentasi, tanpa model) dengan dan tanpa cache."""
+    from ultralytics.cfg import get_cfg
+    from ultralytics.data.utils import check_det_dataset
+
+    data = check_det_dataset(data_yaml)
+    img_path = data[split]
+    cfg = get_cfg(overrides={'imgsz': imgsz, 'task': 'detect'})
+    base_cls = ShardYOLODataset if is_shard_dir(img_path) else YOLODataset
+
+    print(f"\n=== Benchmark epoch data loading ({split}, imgsz={imgsz}, batch={batch}, workers={workers}) ===")
+    for name, dataset_cls in (('tanpa cache', base_cls), ('dengan cache', cached_dataset_cls(img_path))):
+        dataset = build_shard_dataset(cfg, img_path, batch, data, mode='train', dataset_cls=dataset_cls)
+        loader = build_shard_dataloader(dataset, batch, workers, shuffle=True)
+        times = []
+        for _ in range(epochs):
+            start = time.perf_counter()
+            for _ in loader:
+                pass
+            times.append(time.perf_counter() - start)
+        # Epoch pertama termasuk start worker; ambil yang tercepat
+        best = min(times)
+        print(f"- {name:12s}: {best:.2f} detik/epoch ({len(dataset) / best:.1f} gambar/detik)")
+    print()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark epoch data loading dengan/tanpa cache gambar ter-resize.")
+    parser.add_argument('--data', default='../../../data/datasets/camera/data.yaml')
+    parser.add_argument('--split', default='train')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--batch', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--epochs', type=int, default=2)
+    args = parser.parse_args()
+    run_benchmark(args.data, args.split, args.imgsz, args.batch, args.workers, args.epochs)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+import csv
+import json
+import time
+import shutil
+import argparse
+import numpy as np
+
+# Tahap setelah training: export best.pt ke ONNX, OpenVINO FP32 dan OpenVINO INT8, cek mAP val
+# tidak turun melebihi toleransi, lalu benchmark latency/throughput di CPU untuk kombinasi
+# imgsz x batch x jumlah thread. Hasil: <run>/export/benchmark.csv + benchmark.json.
+VARIANTS = {
+    # nama: (format ultralytics, int8)
+    'pytorch': (None, False),
+    'onnx': ('onnx', False),
+    'openvino': ('openvino', False),
+    'openvino_int8': ('openvino', True),
+}
+DATA_YAML = '../../../data/datasets/camera/data.yaml'
+FIELDS = ['variant', 'imgsz', 'batch', 'threads', 'p50_ms', 'p90_ms', 'images_per_sec',
+          'map50', 'map50_95', 'map_drop', 'accuracy_ok', 'path']
+
+def export_variant(weights, variant, imgsz, data_yaml, out_dir, calib_batch=8):
+    """Export satu varian untuk satu imgsz ke out_dir; return path model (file .onnx / folder OpenVINO)."""
+    from ultralytics import YOLO
+
+    fmt, int8 = VARIANTS[variant]
+    if fmt is None:
+        return weights
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    suffix = '.onnx' if fmt == 'onnx' else ('_int8_openvino_model' if int8 else '_openvino_model')
+    dst = os.path.join(out_dir, f"{stem}_{imgsz}{suffix}")
+    if os.path.exists(dst):
+        return dst
+    # dynamic=True: batch (dan ukuran) bisa berubah saat benchmark; data dipakai untuk kalibrasi INT8
+    exported = YOLO(weights).export(format=fmt, imgsz=imgsz, dynamic=True, int8=int8, data=data_yaml,
+                                    batch=calib_batch, device='cpu')
+    os.makedirs(out_dir, exist_ok=True)
+    shutil.move(str(exported).rstrip(os.sep), dst)
+    return dst
+
+def evaluate(model_path, data_yaml, imgsz, batch=8):
+    """mAP50 dan mAP50-95 di split val (Ultralytics val, device CPU)."""
+    from ultralytics import YOLO
+
+    metrics = YOLO(model_path, task='detect').val(data=data_yaml, imgsz=imgsz, batch=batch, device='cpu',
+                                                 plots=False, verbose=False)
+    return float(metrics.box.map50), float(metrics.box.map)
+
+def make_runner(variant, model_path, threads):
+    """Return fungsi infer(x) untuk array float32 (B, 3, H, W) yang hanya menjalankan model (tanpa pre/post)."""
+    fmt, _ = VARIANTS[variant]
+    if fmt is None:
+        import torch
+        from ultralytics import YOLO
+        torch.set_num_threads(threads)
+        model = YOLO(model_path).model.float().eval()
+
+        def infer(x):
+            with torch.inference_mode():
+                return model(torch.from_numpy(x))
+        return infer
+    if fmt == 'onnx':
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        name = session.get_inputs()[0].name
+        return lambda x: session.run(None, {name: x})
+    import openvino as ov
+    core = ov.Core()
+    xml = next(os.path.join(model_path, f) for f in os.listdir(model_path) if f.endswith('.xml'))
+    compiled = core.compile_model(xml, 'CPU', {'INFERENCE_NUM_THREADS': threads, 'PERFORMANCE_HINT': 'LATENCY'})
+    request = compiled.create_infer_request()
+    return lambda x: request.infer({0: x})
+
+def benchmark(infer, batch, imgsz, warmup=3, iters=20):
+    """Latency per batch (p50, p90 dalam ms) dan gambar/detik."""
+    x = np.random.default_rng(0).random((batch, 3, imgsz, imgsz), dtype=np.float32)
+    for _ in range(warmup):
+        infer(x)
+    times = []
+    for _ in range(iters):
+        start = time.perf_counter()
+        infer(x)
+        times.append(time.perf_counter() - start)
+    times = np.array(times) * 1e3
+    return float(np.percentile(times, 50)), float(np.percentile(times, 90)), batch * 1e3 / float(times.mean())
+
+def pick_best(rows, objective='latency'):
+    """Varian tercepat yang lolos batas akurasi: latency batch 1 terendah atau throughput tertinggi."""
+    ok = [r for r in rows if r['accuracy_ok'] and r['p50_ms'] is not None]
+    if objective == 'latency':
+        ok = [r for r in ok if r['batch'] == 1]
+        return min(ok, key=lambda r: r['p50_ms'], default=None)
+    return max(ok, key=lambda r: r['images_per_sec'], default=None)
+
+def print_table(rows):
+    print(f"\n{'varian':14s} {'imgsz':>5s} {'batch':>5s} {'thr':>3s} {'p50 ms':>8s} {'p90 ms':>8s} "
+          f"{'img/s':>8s} {'mAP50-95':>8s} {'drop':>7s} ok")
+    for r in rows:
+        if r['p50_ms'] is None:
+            print(f"{r['variant']:14s} {r['imgsz']:5d} {'-':>5s} {'-':>3s} {'gagal':>8s}")
+            continue
+        print(f"{r['variant']:14s} {r['imgsz']:5d} {r['batch']:5d} {r['threads']:3d} {r['p50_ms']:8.1f} "
+              f"{r['p90_ms']:8.1f} {r['images_per_sec']:8.1f} {r['map50_95']:8.4f} "
+              f"{'-' if r['map_drop'] is None else format(r['map_drop'], '7.4f'):>7} "
+              f"{'?' if r['accuracy_ok'] is None else 'ya' if r['accuracy_ok'] else 'tidak'}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export best.pt ke ONNX/OpenVINO(INT8), cek akurasi, benchmark CPU.")
+    parser.add_argument('weights', help="Path best.pt hasil training.")
+    parser.add_argument('--data', default=DATA_YAML, help="Data yaml (val split untuk cek akurasi dan kalibrasi INT8).")
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument('--imgsz', type=int, nargs='+', default=[640, 480, 320])
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--threads', type=int, nargs='+', default=None,
+                        help="Jumlah thread CPU yang dicoba (default: 1, setengah core, semua core).")
+    parser.add_argument('--max-drop', type=float, default=0.01,
+                        help="Penurunan mAP50-95 maksimum terhadap PyTorch pada imgsz yang sama.")
+    parser.add_argument('--min-map', type=float, default=0.0, help="Batas bawah mAP50-95 absolut.")
+    parser.add_argument('--objective', choices=('latency', 'throughput'), default='latency')
+    parser.add_argument('--iters', type=int, default=20)
+    parser.add_argument('--out-dir', default=None, help="Default: <folder run>/export")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    cores = os.cpu_count() or 1
+    threads = args.threads or sorted({1, max(1, cores // 2), cores})
+    out_dir = args.out_dir or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(args.weights))), 'export')
+    os.makedirs(out_dir, exist_ok=True)
+
+    rows = []
+    for imgsz in args.imgsz:
+        # Acuan akurasi selalu best.pt (PyTorch) pada imgsz ini, apa pun urutan/isi --variants
+        print(f"\n=== acuan pytorch imgsz={imgsz} ===")
+        try:
+            baseline_maps = evaluate(args.weights, args.data, imgsz)
+        except Exception as e:
+            print(f"Evaluasi acuan gagal, akurasi tidak dibandingkan: {type(e).__name__}: {e}")
+            baseline_maps = None
+        for variant in args.variants:
+            print(f"\n=== {variant} imgsz={imgsz} ===")
+            try:
+                path = export_variant(args.weights, variant, imgsz, args.data, out_dir)
+                if VARIANTS[variant][0] is None and baseline_maps is not None:
+                    map50, map5095 = baseline_maps
+                else:
+                    map50, map5095 = evaluate(path, args.data, imgsz)
+            except Exception as e:
+                # Runtime/exporter opsional (onnxruntime, openvino) bisa tidak terpasang
+                print(f"Lewati {variant}: {type(e).__name__}: {e}")
+                rows.append(dict(variant=variant, imgsz=imgsz, batch=None, threads=None, p50_ms=None, p90_ms=None,
+                                 images_per_sec=None, map50=None, map50_95=None, map_drop=None,
+                                 accuracy_ok=False, path=None))
+                continue
+            if baseline_maps is None:
+                # Tanpa acuan: jangan loloskan/gagalkan varian secara diam-diam
+                drop = accuracy_ok = None
+            else:
+                drop = baseline_maps[1] - map5095
+                accuracy_ok = drop <= args.max_drop and map5095 >= args.min_map
+            for n_threads in threads:
+                infer = make_runner(variant, path, n_threads)
+                for batch in args.batch:
+                    p50, p90, rate = benchmark(infer, batch, imgsz, iters=args.iters)
+                    rows.append(dict(variant=variant, imgsz=imgsz, batch=batch, threads=n_threads,
+                                     p50_ms=round(p50, 2), p90_ms=round(p90, 2), images_per_sec=round(rate, 2),
+                                     map50=round(map50, 4), map50_95=round(map5095, 4),
+                                     map_drop=round(drop, 4) if drop is not None else None,
+                                     accuracy_ok=accuracy_ok, path=path))
+                    print(f"  batch={batch} threads={n_threads}: p50 {p50:.1f} ms, {rate:.1f} gambar/detik")
+
+    print_table(rows)
+    best = pick_best(rows, args.objective)
+    csv_path = os.path.join(out_dir, 'benchmark.csv')
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(os.path.join(out_dir, 'benchmark.json'), 'w') as f:
+        json.dump({'objective': args.objective, 'max_drop': args.max_drop, 'min_map': args.min_map,
+                   'best': best, 'rows': rows}, f, indent=2)
+
+    print(f"\nTabel benchmark: {csv_path}")
+    if best is None:
+        print("Tidak ada varian yang memenuhi batas akurasi (atau acuan PyTorch gagal dievaluasi).")
+    else:
+        print(f"Terbaik ({args.objective}): {best['variant']} imgsz={best['imgsz']} batch={best['batch']} "
+              f"threads={best['threads']} -> {best['p50_ms']} ms, {best['images_per_sec']} gambar/detik, "
+              f"mAP50-95 {best['map50_95']} ({best['path']})")
+
+if __name__ == "__main__":
+    main()
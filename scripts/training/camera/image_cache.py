@@ -0,0 +1,320 @@
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import hashlib
+import argparse
+import multiprocessing
+import numpy as np
+import cv2
+from tqdm import tqdm
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'preprocessing', 'camera'))
+from image_shards import ShardReader, is_shard_dir
+from verify_camera_data import jpeg_size
+
+# Cache gambar yang sudah di-decode dan di-resize ke imgsz (sama dengan BaseDataset.load_image
+# Ultralytics: sisi terpanjang = imgsz, rasio aspek dipertahankan). Satu entri per (folder sumber, imgsz):
+#   <root>/<nama>-<hash>-<imgsz>/images.u8   uint8 (N, H, W, 3) BGR, gambar ke-i di pojok kiri atas slot
+#   <root>/<nama>-<hash>-<imgsz>/meta.json   key, ukuran asli & hasil resize, fingerprint sumber
+#   <root>/<nama>-<hash>-<imgsz>/last_used   mtime = terakhir dipakai (untuk eviction LRU)
+# Total ukuran root dibatasi max_bytes; entri yang paling lama tidak dipakai dihapus lebih dulu.
+CACHE_ROOT = '../../../data/datasets/camera/cache'
+MAX_CACHE_GB = 20.0
+CACHE_VERSION = 1
+
+def resized_shape(h0, w0, imgsz):
+    """(h, w) hasil resize sisi terpanjang ke imgsz, identik dengan Ultralytics."""
+    r = imgsz / max(h0, w0)
+    if r == 1:
+        return h0, w0
+    return min(math.ceil(h0 * r), imgsz), min(math.ceil(w0 * r), imgsz)
+
+def resize_image(im, imgsz):
+    h0, w0 = im.shape[:2]
+    h, w = resized_shape(h0, w0, imgsz)
+    if (h, w) != (h0, w0):
+        im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+    return im
+
+def list_source(source):
+    """
+    Return (keys, shape asli (h, w) per gambar, stamp (ukuran, mtime_ns) per gambar) untuk folder gambar
+    atau folder shard, tanpa decode. Stamp None untuk shard.
+    """
+    if is_shard_dir(source):
+        reader = ShardReader(source)
+        return list(reader.keys), list(reader.shapes), None
+    names = sorted(e.name for e in os.scandir(source) if e.name.lower().endswith('.jpg'))
+    shapes = []
+    stamps = []
+    for name in names:
+        path = os.path.join(source, name)
+        size = jpeg_size(path)
+        if size is None:
+            size = cv2.imread(path).shape[1::-1]
+        shapes.append((size[1], size[0]))
+        st = os.stat(path)
+        stamps.append([st.st_size, st.st_mtime_ns])
+    return [os.path.splitext(name)[0] for name in names], shapes, stamps
+
+def source_fingerprint(source):
+    """Jumlah file, total ukuran dan mtime terbaru; berubah jika gambar ditambah/diganti."""
+    if is_shard_dir(source):
+        st = os.stat(os.path.join(source, 'index.json'))
+        return {'files': 1, 'bytes': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    files = total = newest = 0
+    for entry in os.scandir(source):
+        if entry.name.lower().endswith('.jpg'):
+            st = entry.stat()
+            files += 1
+            total += st.st_size
+            newest = max(newest, st.st_mtime_ns)
+    return {'files': files, 'bytes': total, 'mtime_ns': newest}
+
+def entry_name(source, imgsz):
+    path = os.path.abspath(str(source))
+    digest = hashlib.sha1(path.encode()).hexdigest()[:10]
+    return f"{os.path.basename(path.rstrip(os.sep))}-{digest}-{imgsz}"
+
+def _dir_bytes(path):
+    return sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+
+def list_entries(cache_root=CACHE_ROOT):
+    """Entri cache yang lengkap: list dict (path, bytes, last_used), urut dari yang paling lama tidak dipakai."""
+    entries = []
+    if not os.path.isdir(cache_root):
+        return entries
+    for entry in os.scandir(cache_root):
+        meta_path = os.path.join(entry.path, 'meta.json')
+        if not entry.is_dir() or not os.path.exists(meta_path):
+            continue
+        last_used = os.path.join(entry.path, 'last_used')
+        entries.append({
+            'path': entry.path,
+            'bytes': _dir_bytes(entry.path),
+            'last_used': os.path.getmtime(last_used if os.path.exists(last_used) else meta_path),
+        })
+    return sorted(entries, key=lambda e: e['last_used'])
+
+def evict(cache_root, need_bytes, max_bytes, keep=()):
+    """Hapus entri LRU sampai need_bytes muat di bawah max_bytes. Return byte yang masih tersedia."""
+    entries = [e for e in list_entries(cache_root) if os.path.abspath(e['path']) not in keep]
+    used = sum(e['bytes'] for e in entries)
+    for e in entries:
+        if used + need_bytes <= max_bytes:
+            break
+        print(f"Evict cache: {os.path.basename(e['path'])} ({e['bytes'] / 1e9:.2f} GB)")
+        shutil.rmtree(e['path'], ignore_errors=True)
+        used -= e['bytes']
+    return max(0, max_bytes - used)
+
+class ResizedImageCache:
+    """Reader memory-mapped satu entri cache. get(key) -> (image, (h0, w0), (h, w)) atau None."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.imgsz = self.meta['imgsz']
+        count = self.meta['cached']
+        self.images = np.memmap(os.path.join(path, 'images.u8'), dtype=np.uint8, mode='r',
+                                shape=(count,) + tuple(self.meta['slot_shape'])) if count else None
+        self.index = {key: i for i, key in enumerate(self.meta['keys'][:count])}
+        self.touch()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def touch(self):
+        with open(os.path.join(self.path, 'last_used'), 'a'):
+            pass
+        os.utime(os.path.join(self.path, 'last_used'))
+
+    def get(self, key):
+        i = self.index.get(key)
+        if i is None:
+            return None
+        h, w = self.meta['hw'][i]
+        return self.images[i, :h, :w], tuple(self.meta['hw0'][i]), (h, w)
+
+_BUILD = {}
+
+def _init_build(source, images_path, count, slot_shape, keys, imgsz):
+    _BUILD.update(source=source, keys=keys, imgsz=imgsz)
+    _BUILD['reader'] = ShardReader(source) if is_shard_dir(source) else None
+    _BUILD['images'] = np.memmap(images_path, dtype=np.uint8, mode='r+', shape=(count,) + tuple(slot_shape))
+
+def _build_indices(indices):
+    images = _BUILD['images']
+    reader = _BUILD['reader']
+    for i in indices:
+        key = _BUILD['keys'][i]
+        if reader is not None:
+            im = cv2.imdecode(np.frombuffer(reader.read(reader.index[key]), dtype=np.uint8), cv2.IMREAD_COLOR)
+        else:
+            im = cv2.imread(os.path.join(_BUILD['source'], key + '.jpg'), cv2.IMREAD_COLOR)
+        if im is None:
+            raise RuntimeError(f"Gambar tidak bisa dibaca: {key}")
+        im = resize_image(im, _BUILD['imgsz'])
+        images[i, :im.shape[0], :im.shape[1]] = im
+    images.flush()
+    return len(indices)
+
+def reusable_slots(path, keys, hw, stamps, imgsz):
+    """
+    Entri lama di path yang bisa dipakai ulang: dict index baru -> index lama untuk gambar dengan
+    stamp & ukuran resize yang sama (tidak perlu di-decode ulang). Return (cache lama, dict).
+    """
+    meta_path = os.path.join(path, 'meta.json')
+    if stamps is None or not os.path.exists(meta_path):
+        return None, {}
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get('version') != CACHE_VERSION or meta.get('imgsz') != imgsz or not meta.get('stamps'):
+        return None, {}
+    previous = ResizedImageCache(path)
+    old = {key: (j, meta['stamps'][j], meta['hw'][j]) for key, j in previous.index.items()}
+    reuse = {}
+    for i, key in enumerate(keys):
+        entry = old.get(key)
+        if entry is not None and entry[1] == stamps[i] and tuple(entry[2]) == tuple(hw[i]):
+            reuse[i] = entry[0]
+    return previous, reuse
+
+def build_cache(source, imgsz, cache_root=CACHE_ROOT, max_bytes=MAX_CACHE_GB * 1e9, workers=0):
+    """
+    Pre-pass: decode + resize semua gambar source (folder .jpg atau folder shard) ke satu entri cache.
+    Gambar yang tidak berubah sejak entri lama (ukuran & mtime sama) disalin dari entri lama, bukan
+    di-decode ulang. Jika budget tidak cukup walau sudah evict, hanya sebagian gambar pertama yang di-cache
+    (sisanya tetap di-decode saat training). Return path entri, atau None jika tidak ada yang muat.
+    """
+    path = os.path.join(cache_root, entry_name(source, imgsz))
+    keys, shapes, stamps = list_source(source)
+    if not keys:
+        return None
+    hw = [resized_shape(h0, w0, imgsz) for h0, w0 in shapes]
+    slot_shape = (max(h for h, _ in hw), max(w for _, w in hw), 3)
+    slot_bytes = int(np.prod(slot_shape))
+
+    os.makedirs(cache_root, exist_ok=True)
+    previous, reuse = reusable_slots(path, keys, hw, stamps, imgsz)
+    if not reuse:
+        # Tidak ada yang bisa dipakai ulang: hapus entri lama sekarang, bukan setelah entri baru ditulis
+        previous = None
+        shutil.rmtree(path, ignore_errors=True)
+    # Entri lama tetap di disk sampai entri baru selesai: ukurannya ikut dihitung dalam budget
+    old_bytes = _dir_bytes(path) if os.path.isdir(path) else 0
+    available = evict(cache_root, len(keys) * slot_bytes + old_bytes, max_bytes, keep={os.path.abspath(path)})
+    count = min(len(keys), int(max(0, available - old_bytes) // slot_bytes))
+    if count == 0:
+        print(f"Budget cache {max_bytes / 1e9:.1f} GB tidak cukup untuk satu gambar {slot_shape}")
+        return None
+
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    images_path = os.path.join(tmp_path, 'images.u8')
+    with open(images_path, 'wb') as f:
+        f.truncate(count * slot_bytes)
+
+    start = time.time()
+    reuse = {i: j for i, j in reuse.items() if i < count}
+    if reuse:
+        images = np.memmap(images_path, dtype=np.uint8, mode='r+', shape=(count,) + tuple(slot_shape))
+        for i, j in reuse.items():
+            h, w = hw[i]
+            images[i, :h, :w] = previous.images[j, :h, :w]
+        images.flush()
+        del images
+    previous = None
+    pending = [i for i in range(count) if i not in reuse]
+
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, min(256, len(pending) // (workers * 4) or 1))
+    jobs = [pending[i:i + chunk] for i in range(0, len(pending), chunk)]
+    initargs = (str(source), images_path, count, slot_shape, keys, imgsz)
+    with tqdm(total=len(pending), desc=f"Cache imgsz={imgsz}", unit='img') as pbar:
+        if workers == 1 or len(jobs) <= 1:
+            _init_build(*initargs)
+            for job in jobs:
+                pbar.update(_build_indices(job))
+            _BUILD.clear()
+        else:
+            with multiprocessing.Pool(workers, initializer=_init_build, initargs=initargs) as pool:
+                for done in pool.imap_unordered(_build_indices, jobs):
+                    pbar.update(done)
+
+    meta = {
+        'version': CACHE_VERSION,
+        'source': os.path.abspath(str(source)),
+        'imgsz': imgsz,
+        'slot_shape': list(slot_shape),
+        'cached': count,
+        'keys': keys,
+        'hw0': [list(s) for s in shapes],
+        'hw': [list(s) for s in hw],
+        'stamps': stamps[:count] if stamps is not None else None,
+        'fingerprint': source_fingerprint(source),
+    }
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    print(f"Cache {count}/{len(keys)} gambar ({count * slot_bytes / 1e9:.2f} GB, {len(reuse)} dipakai ulang) "
+          f"dalam {time.time() - start:.1f} detik: {path}")
+    return path
+
+def open_cache(source, imgsz, cache_root=CACHE_ROOT, build=True, max_bytes=MAX_CACHE_GB * 1e9, workers=0):
+    """Buka entri cache untuk (source, imgsz); bangun ulang jika belum ada/usang (build=True)."""
+    path = os.path.join(cache_root, entry_name(source, imgsz))
+    meta_path = os.path.join(path, 'meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('version') == CACHE_VERSION and meta.get('fingerprint') == source_fingerprint(source):
+            return ResizedImageCache(path)
+    if not build:
+        return None
+    path = build_cache(source, imgsz, cache_root, max_bytes, workers)
+    return ResizedImageCache(path) if path else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache gambar ter-resize (memmap uint8) untuk training di CPU.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('build', help="Decode + resize sekali semua gambar ke cache.")
+    p.add_argument('sources', nargs='+', help="Folder gambar (images/train) atau folder shard.")
+    p.add_argument('--imgsz', type=int, nargs='+', default=[640])
+    p.add_argument('--cache-root', default=CACHE_ROOT)
+    p.add_argument('--max-gb', type=float, default=MAX_CACHE_GB, help="Batas total ukuran cache (eviction LRU).")
+    p.add_argument('--workers', type=int, default=0, help="Jumlah proses decode (0 = semua core).")
+    p = sub.add_parser('list', help="Tampilkan entri cache.")
+    p.add_argument('--cache-root', default=CACHE_ROOT)
+    p = sub.add_parser('evict', help="Hapus entri LRU sampai total ukuran <= --max-gb.")
+    p.add_argument('--cache-root', default=CACHE_ROOT)
+    p.add_argument('--max-gb', type=float, default=MAX_CACHE_GB)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        for source in args.sources:
+            for imgsz in args.imgsz:
+                build_cache(source, imgsz, args.cache_root, args.max_gb * 1e9, args.workers)
+    elif args.command == 'evict':
+        available = evict(args.cache_root, 0, args.max_gb * 1e9)
+        print(f"Sisa budget: {available / 1e9:.2f} GB")
+    else:
+        entries = list_entries(args.cache_root)
+        if not entries:
+            print("Cache kosong")
+        for e in entries:
+            used = time.strftime('%Y-%m-%d %H:%M', time.localtime(e['last_used']))
+            print(f"- {os.path.basename(e['path'])}: {e['bytes'] / 1e9:.2f} GB, terakhir dipakai {used}")
+        print(f"Total: {sum(e['bytes'] for e in entries) / 1e9:.2f} GB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import os
+import csv
+import sys
+import time
+import argparse
+import itertools
+import multiprocessing
+import yaml
+
+# Runner training YOLOv8 tanpa interaksi (untuk antrian training / sweep hyperparameter).
+# Konfigurasi dari YAML dan/atau argumen CLI:
+#
+#   defaults:                  # berlaku untuk semua run
+#     model: s                 # n/s/m/l/x atau path .pt
+#     data: ../../../data/datasets/camera/data.yaml
+#     epochs: 50
+#   runs:                      # satu entri = satu training; field menimpa defaults
+#     - name: s640
+#       imgsz: 640
+#     - name: s512
+#       imgsz: 512
+#
+# --sweep imgsz=512,640 lr0=0.01,0.001 membuat kombinasi (cartesian) dari setiap run.
+# sampling: none/class/loss/class+loss (weighted_sampler.py); bandingkan waktu sampai mAP baseline dengan
+#   --sweep sampling=none,class+loss lalu `python weighted_sampler.py compare <run none> <run class+loss>`.
+DEFAULTS = dict(
+    model="s",
+    data="../../../data/datasets/camera/data.yaml",
+    epochs=50,
+    imgsz=640,
+    batch=16,
+    lr0=None,
+    device="cpu",
+    workers=4,
+    amp=False,
+    image_cache=False,
+    sampling="none",
+    sample_fraction=1.0,
+)
+RESULTS_PATH = '../../../runs/detect/camera/training_runs.csv'
+RESULT_FIELDS = [
+    'name', 'status', 'model', 'data', 'epochs', 'imgsz', 'batch', 'lr0', 'device', 'workers', 'amp', 'image_cache',
+    'sampling', 'sample_fraction',
+    'wall_time_s', 'train_images', 'images_per_sec', 'data_wait_frac', 'bound', 'peak_rss_mb',
+    'precision', 'recall', 'map50', 'map50_95',
+    'save_dir', 'error',
+]
+# Kolom metrik di DetMetrics.results_dict Ultralytics
+METRIC_KEYS = {
+    'precision': 'metrics/precision(B)',
+    'recall': 'metrics/recall(B)',
+    'map50': 'metrics/mAP50(B)',
+    'map50_95': 'metrics/mAP50-95(B)',
+}
+
+def parse_value(text):
+    """'640' -> 640, '0.01' -> 0.01, 'true' -> True, selain itu string (pakai parser YAML)."""
+    value = yaml.safe_load(text)
+    return text if isinstance(value, (dict, list)) else value
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Training YOLOv8 non-interaktif dari config YAML/CLI.")
+    parser.add_argument('--config', help="File YAML berisi defaults dan/atau daftar runs.")
+    for key, default in DEFAULTS.items():
+        if key == 'amp':
+            parser.add_argument('--amp', action='store_true', default=None, help="Aktifkan mixed precision.")
+            continue
+        if key == 'image_cache':
+            parser.add_argument('--image-cache', action='store_true', default=None,
+                                help="Baca gambar ter-resize dari cache memmap (image_cache.py).")
+            continue
+        if key == 'sample_fraction':
+            parser.add_argument('--sample-fraction', type=float, default=None,
+                                help="Jumlah gambar per epoch relatif terhadap dataset untuk weighted sampler "
+                                     f"(default: {default}).")
+            continue
+        parser.add_argument(f'--{key}', type=parse_value, default=None,
+                            help=f"Menimpa nilai config untuk semua run (default: {default}).")
+    parser.add_argument('--name', help="Nama run (hanya jika tidak ada daftar runs).")
+    parser.add_argument('--sweep', nargs='+', default=[], metavar='KEY=V1,V2',
+                        help="Kombinasikan nilai hyperparameter, mis. --sweep imgsz=512,640 lr0=0.01,0.001")
+    parser.add_argument('--parallel', type=int, default=1,
+                        help="Jumlah run bersamaan. 1 = berurutan, 0 = otomatis sesuai jumlah core CPU.")
+    parser.add_argument('--results', default=RESULTS_PATH, help="File CSV tabel hasil semua run (append).")
+    parser.add_argument('--dry-run', action='store_true', help="Tampilkan daftar run tanpa training.")
+    return parser.parse_args()
+
+def build_runs(args):
+    """Gabungkan DEFAULTS <- YAML defaults <- entri runs <- argumen CLI <- sweep menjadi list config."""
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = yaml.safe_load(f) or {}
+    base = dict(DEFAULTS)
+    base.update(config.get('defaults', {}))
+    entries = config.get('runs') or [{'name': args.name}]
+
+    overrides = {key: getattr(args, key) for key in DEFAULTS if getattr(args, key) is not None}
+    sweep_keys, sweep_values = [], []
+    for item in args.sweep:
+        key, _, values = item.partition('=')
+        if key not in DEFAULTS or not values:
+            raise ValueError(f"Sweep tidak valid: {item} (format KEY=V1,V2, KEY salah satu dari {list(DEFAULTS)})")
+        sweep_keys.append(key)
+        sweep_values.append([parse_value(v) for v in values.split(',')])
+
+    runs = []
+    for i, entry in enumerate(entries):
+        run = dict(base)
+        run.update(entry)
+        run.update(overrides)
+        for combo in itertools.product(*sweep_values):
+            variant = dict(run)
+            variant.update(zip(sweep_keys, combo))
+            suffix = ''.join(f"_{k}{v}" for k, v in zip(sweep_keys, combo))
+            variant['name'] = f"{run.get('name') or f'run{i + 1}'}{suffix}"
+            runs.append(variant)
+    return runs
+
+def auto_parallel(runs):
+    """Run bersamaan sebanyak core CPU dibagi core yang dipakai per run (worker dataloader + 1)."""
+    per_run = max(max(int(run['workers']) for run in runs) + 1, 1)
+    return max(1, min(len(runs), (os.cpu_count() or 1) // per_run))
+
+def _init_worker(threads):
+    # Dipanggil sebelum torch di-import di proses anak: batasi thread agar run paralel tidak berebut core
+    os.environ.setdefault('OMP_NUM_THREADS', str(threads))
+    os.environ.setdefault('MKL_NUM_THREADS', str(threads))
+
+def run_one(run):
+    """Satu training (di proses anak). Return satu baris tabel hasil; error dicatat, tidak dilempar."""
+    row = {key: run.get(key) for key in RESULT_FIELDS if key in run or key in DEFAULTS}
+    row.update(name=run['name'], status='ok', error='')
+    start = time.time()
+    try:
+        from ultralytics import YOLO
+        from train_yolov8 import PROJECT_DIR, resolve_model, select_trainer
+        from training_telemetry import TrainingTelemetry
+
+        model_obj = YOLO(resolve_model(str(run['model'])))
+        telemetry = TrainingTelemetry().attach(model_obj)
+        train_kwargs = dict(
+            data=run['data'],
+            epochs=int(run['epochs']),
+            imgsz=int(run['imgsz']),
+            batch=int(run['batch']),
+            project=PROJECT_DIR,
+            name=run['name'],
+            workers=int(run['workers']),
+            device=str(run['device']),
+            amp=bool(run['amp']),
+            verbose=False,
+        )
+        if run.get('lr0') is not None:
+            train_kwargs['lr0'] = float(run['lr0'])
+        trainer_cls = select_trainer(run['data'], bool(run['image_cache']), run['sampling'],
+                                     float(run['sample_fraction']))
+        if trainer_cls is not None:
+            train_kwargs['trainer'] = trainer_cls
+        results = model_obj.train(**train_kwargs)
+
+        trainer = model_obj.trainer
+        row['save_dir'] = str(trainer.save_dir)
+        metrics = getattr(results, 'results_dict', None) or trainer.metrics or {}
+        for column, key in METRIC_KEYS.items():
+            if key in metrics:
+                row[column] = round(float(metrics[key]), 5)
+        row['train_images'] = len(trainer.train_loader.dataset)
+        row['wall_time_s'] = round(time.time() - start, 1)
+        summary = telemetry.summary() or {}
+        row['images_per_sec'] = summary.get('mean_images_per_sec')
+        row['data_wait_frac'] = summary.get('data_wait_frac')
+        row['bound'] = summary.get('bound')
+        row['peak_rss_mb'] = summary.get('peak_rss_mb')
+    except Exception as e:
+        row.update(status='error', error=f"{type(e).__name__}: {e}", wall_time_s=round(time.time() - start, 1))
+    return row
+
+def append_results(path, rows):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    new_file = not os.path.exists(path)
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction='ignore')
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+def print_results(rows):
+    print("\n=== Hasil Training ===")
+    print(f"{'name':24s} {'status':6s} {'waktu(s)':>9s} {'img/s':>8s} {'mAP50':>7s} {'mAP50-95':>9s}")
+    for row in rows:
+        print(f"{row['name'][:24]:24s} {row['status']:6s} {row.get('wall_time_s') or '-':>9} "
+              f"{row.get('images_per_sec') or '-':>8} {row.get('map50') or '-':>7} {row.get('map50_95') or '-':>9}")
+        if row['error']:
+            print(f"    error: {row['error']}")
+
+def main():
+    args = parse_args()
+    try:
+        runs = build_runs(args)
+    except ValueError as e:
+        sys.exit(str(e))
+    parallel = args.parallel or auto_parallel(runs)
+    parallel = max(1, min(parallel, len(runs)))
+
+    print(f"=== {len(runs)} run training, {parallel} bersamaan ===")
+    for run in runs:
+        print(f"- {run['name']}: " + ", ".join(f"{k}={run[k]}" for k in DEFAULTS))
+    if args.dry_run:
+        return
+
+    rows = []
+    if parallel == 1:
+        for run in runs:
+            rows.append(run_one(run))
+            append_results(args.results, rows[-1:])
+    else:
+        threads = max(1, (os.cpu_count() or 1) // parallel)
+        # spawn: torch/CUDA tidak aman di-fork; satu proses per run agar memori dibebaskan setelah selesai
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(parallel, initializer=_init_worker, initargs=(threads,), maxtasksperchild=1) as pool:
+            for row in pool.imap_unordered(run_one, runs):
+                rows.append(row)
+                append_results(args.results, [row])
+                print(f">>> Selesai: {row['name']} ({row['status']}, {row.get('wall_time_s')} detik)")
+    print_results(rows)
+    print(f"\nTabel hasil: {args.results}")
+
+if __name__ == "__main__":
+    main()
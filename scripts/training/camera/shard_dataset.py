@@ -0,0 +1,239 @@
+import os
+import sys
+import math
+import time
+import argparse
+import numpy as np
+import cv2
+import torch
+import yaml
+from ultralytics.data import YOLODataset
+from ultralytics.data.build import InfiniteDataLoader, build_yolo_dataset, seed_worker
+from ultralytics.models.yolo.detect import DetectionTrainer, DetectionValidator
+from ultralytics.utils import LOGGER, RANK, colorstr
+from ultralytics.utils.torch_utils import de_parallel, torch_distributed_zero_first
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'preprocessing', 'camera'))
+from image_shards import ShardReader, is_shard_dir
+
+DATA_SHARDS_YAML = '../../../data/datasets/camera/data_shards.yaml'
+
+class ShardYOLODataset(YOLODataset):
+    """
+    YOLODataset yang membaca gambar dan label dari shard tar (image_shards.py), bukan file lepas.
+    Label diambil dari index shard; gambar dibaca dengan pread + prefetch per shard.
+    """
+
+    def __init__(self, *args, **kwargs):
+        if kwargs.get('cache') == 'disk':
+            # Cache disk menulis .npy di sebelah file gambar, tidak ada untuk shard
+            LOGGER.warning("cache='disk' tidak didukung untuk shard, pakai cache=False")
+            kwargs['cache'] = None
+        super().__init__(*args, **kwargs)
+
+    def get_img_files(self, img_path):
+        self.reader = ShardReader(img_path)
+        # Path semu <shard_dir>/<key>.jpg, hanya dipakai sebagai nama (plot, log)
+        im_files = [os.path.join(str(img_path), key + '.jpg') for key in self.reader.keys]
+        if self.fraction < 1:
+            im_files = im_files[:round(len(im_files) * self.fraction)]
+        return im_files
+
+    def get_labels(self):
+        self.label_files = []
+        labels = []
+        for im_file in self.im_files:
+            i = self.reader.index[os.path.splitext(os.path.basename(im_file))[0]]
+            rows = [line.split() for line in self.reader.labels[i].splitlines() if line.strip()]
+            values = np.array(rows, dtype=np.float32).reshape(-1, 5)
+            labels.append({
+                'im_file': im_file,
+                'shape': self.reader.shapes[i],
+                'cls': values[:, 0:1],
+                'bboxes': values[:, 1:],
+                'segments': [],
+                'keypoints': None,
+                'normalized': True,
+                'bbox_format': 'xywh',
+            })
+        if not labels:
+            raise RuntimeError(f"Tidak ada gambar di shard {self.img_path}")
+        return labels
+
+    def reader_index(self, i):
+        # Index dataset bisa berbeda dari index shard (set_rectangle / filter kelas mengurutkan ulang)
+        return self.reader.index[os.path.splitext(os.path.basename(self.im_files[i]))[0]]
+
+    def load_image(self, i, rect_mode=True):
+        """Sama dengan BaseDataset.load_image, tetapi decode dari byte shard, bukan imread path."""
+        if self.ims[i] is not None:
+            return self.ims[i], self.im_hw0[i], self.im_hw[i]
+        data = self.reader.read(self.reader_index(i))
+        im = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), self.cv2_flag)
+        if im is None:
+            raise FileNotFoundError(f"Gambar tidak bisa di-decode {self.im_files[i]}")
+        h0, w0 = im.shape[:2]
+        if rect_mode:
+            r = self.imgsz / max(h0, w0)
+            if r != 1:
+                w, h = (min(math.ceil(w0 * r), self.imgsz), min(math.ceil(h0 * r), self.imgsz))
+                im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+        elif not (h0 == w0 == self.imgsz):
+            im = cv2.resize(im, (self.imgsz, self.imgsz), interpolation=cv2.INTER_LINEAR)
+        if im.ndim == 2:
+            im = im[..., None]
+        if self.augment:
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = im, (h0, w0), im.shape[:2]
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                if self.cache != 'ram':
+                    self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return im, (h0, w0), im.shape[:2]
+
+class ShardBlockSampler(torch.utils.data.Sampler):
+    """
+    Acak urutan shard dan urutan gambar di dalam tiap shard (bukan seluruh dataset), sehingga
+    pembacaan tetap berurutan per file tar. Epoch baru = seed baru.
+    """
+
+    def __init__(self, dataset, seed=0):
+        self.dataset = dataset
+        self.seed = seed
+        self.epoch = 0
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __iter__(self):
+        rng = np.random.default_rng(self.seed + self.epoch)
+        self.epoch += 1
+        shard_ids = np.array([self.dataset.reader.shard_ids[self.dataset.reader_index(i)]
+                              for i in range(len(self.dataset))])
+        order = []
+        for shard_id in rng.permutation(np.unique(shard_ids)):
+            members = np.nonzero(shard_ids == shard_id)[0]
+            order.extend(rng.permutation(members).tolist())
+        return iter(order)
+
+def build_shard_dataset(cfg, img_path, batch, data, mode='train', rect=False, stride=32, dataset_cls=ShardYOLODataset):
+    """Padanan build_yolo_dataset untuk folder shard (atau kelas dataset lain dengan argumen yang sama)."""
+    return dataset_cls(
+        img_path=img_path,
+        imgsz=cfg.imgsz,
+        batch_size=batch,
+        augment=mode == 'train',
+        hyp=cfg,
+        rect=cfg.rect or rect,
+        cache=cfg.cache or None,
+        single_cls=cfg.single_cls or False,
+        stride=int(stride),
+        pad=0.0 if mode == 'train' else 0.5,
+        prefix=colorstr(f"{mode}: "),
+        task=cfg.task,
+        classes=cfg.classes,
+        data=data,
+        fraction=cfg.fraction if mode == 'train' else 1.0,
+    )
+
+def build_shard_dataloader(dataset, batch, workers, shuffle=True, seed=0, sampler=None):
+    """Seperti ultralytics build_dataloader, tetapi shuffle memakai ShardBlockSampler (atau sampler yang diberikan)."""
+    batch = min(batch, len(dataset))
+    nd = torch.cuda.device_count()
+    nw = min(os.cpu_count() // max(nd, 1), workers)
+    generator = torch.Generator()
+    generator.manual_seed(6148914691236517205 + RANK)
+    if sampler is None and shuffle:
+        sampler = ShardBlockSampler(dataset, seed)
+    return InfiniteDataLoader(
+        dataset=dataset,
+        batch_size=batch,
+        shuffle=False,
+        num_workers=nw,
+        sampler=sampler,
+        pin_memory=torch.cuda.is_available(),
+        collate_fn=getattr(dataset, 'collate_fn', None),
+        worker_init_fn=seed_worker,
+        generator=generator,
+    )
+
+class ShardDetectionTrainer(DetectionTrainer):
+    """DetectionTrainer yang membaca train/val dari shard jika path split adalah folder shard."""
+
+    def build_dataset(self, img_path, mode='train', batch=None):
+        if not is_shard_dir(img_path):
+            return super().build_dataset(img_path, mode, batch)
+        gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+        return build_shard_dataset(self.args, img_path, batch, self.data, mode=mode, rect=mode == 'val', stride=gs)
+
+    def get_dataloader(self, dataset_path, batch_size=16, rank=0, mode='train'):
+        if not is_shard_dir(dataset_path) or rank != -1:
+            # DDP: dataset shard tetap dipakai, tetapi dengan DistributedSampler bawaan
+            return super().get_dataloader(dataset_path, batch_size, rank, mode)
+        with torch_distributed_zero_first(rank):
+            dataset = self.build_dataset(dataset_path, mode, batch_size)
+        shuffle = mode == 'train' and not getattr(dataset, 'rect', False)
+        workers = self.args.workers if mode == 'train' else self.args.workers * 2
+        return build_shard_dataloader(dataset, batch_size, workers, shuffle, seed=self.args.seed)
+
+class ShardDetectionValidator(DetectionValidator):
+    """Validator untuk model.val(...) langsung pada data yaml shard."""
+
+    def build_dataset(self, img_path, mode='val', batch=None):
+        if not is_shard_dir(img_path):
+            return super().build_dataset(img_path, mode, batch)
+        return build_shard_dataset(self.args, img_path, batch, self.data, mode=mode, stride=self.stride)
+
+    def get_dataloader(self, dataset_path, batch_size):
+        if not is_shard_dir(dataset_path):
+            return super().get_dataloader(dataset_path, batch_size)
+        dataset = self.build_dataset(dataset_path, batch=batch_size, mode='val')
+        return build_shard_dataloader(dataset, batch_size, self.args.workers, shuffle=False)
+
+def run_benchmark(data_yaml, split='train', imgsz=640, batch=16, workers=4, num_batches=50):
+    """Gambar/detik yang sampai ke trainer (DataLoader + augmentasi): file lepas vs shard."""
+    from ultralytics.cfg import get_cfg
+    from ultralytics.data.build import build_dataloader
+    from ultralytics.data.utils import check_det_dataset
+
+    with open(data_yaml) as f:
+        config = yaml.safe_load(f)
+    root = config.get('path', os.path.dirname(os.path.abspath(data_yaml)))
+    shard_dir = os.path.join(root, config[split])
+    loose_dir = os.path.join(root, 'images', split)
+    data = check_det_dataset(data_yaml)
+    cfg = get_cfg(overrides={'imgsz': imgsz, 'task': 'detect'})
+
+    loaders = []
+    if os.path.isdir(loose_dir):
+        dataset = build_yolo_dataset(cfg, loose_dir, batch, data, mode='train')
+        loaders.append(('loose', build_dataloader(dataset, batch, workers, shuffle=True)))
+    dataset = build_shard_dataset(cfg, shard_dir, batch, data, mode='train')
+    loaders.append(('shards', build_shard_dataloader(dataset, batch, workers, shuffle=True)))
+
+    print(f"\n=== Benchmark data loading ({split}, imgsz={imgsz}, batch={batch}, workers={workers}) ===")
+    for name, loader in loaders:
+        iterator = iter(loader)
+        next(iterator)  # warm-up: start worker
+        count = 0
+        start = time.perf_counter()
+        for _ in range(min(num_batches, len(loader) - 1)):
+            count += len(next(iterator)['im_file'])
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else float('inf')
+        print(f"- {name:6s}: {count} gambar, {elapsed:.2f} detik ({rate:.1f} gambar/detik)")
+    print()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark data loading YOLO dari file lepas vs shard.")
+    parser.add_argument('--data', default=DATA_SHARDS_YAML)
+    parser.add_argument('--split', default='train')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--batch', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--batches', type=int, default=50)
+    args = parser.parse_args()
+    run_benchmark(args.data, args.split, args.imgsz, args.batch, args.workers, args.batches)
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,56 @@ import os
 import time
 import pandas as pd
 import numpy as np
+import yaml
 from ultralytics import YOLO
+from training_telemetry import TrainingTelemetry, load_telemetry, TELEMETRY_CSV
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../runs/detect/camera"))
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'models'))
+MODEL_SIZES = ("n", "s", "m", "l", "x")
+
+def resolve_model(model):
+    """'n'/'s'/'m'/'l'/'x' -> models/yolov8<ukuran>.pt, selain itu dianggap path file .pt."""
+    if model not in MODEL_SIZES:
+        return model
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    path = os.path.join(MODELS_DIR, f"yolov8{model}.pt")
+    if not os.path.exists(path):
+        print(f">>> Model {path} belum ada, akan otomatis diunduh oleh YOLO.")
+    return path
+
+def select_trainer(dataset_yaml, image_cache=False, sampling='none', sample_fraction=1.0):
+    """
+    Kelas trainer sesuai data: cache gambar ter-resize, shard tar, atau None (trainer bawaan).
+    sampling selain 'none' membungkusnya dengan sampling epoch berbobot (weighted_sampler.py).
+    """
+    trainer_cls = None
+    if image_cache:
+        # Gambar sudah di-decode + resize sekali ke memmap (image_cache.py), tidak decode JPEG tiap epoch
+        from cached_dataset import CachedDetectionTrainer
+        trainer_cls = CachedDetectionTrainer
+    elif is_shard_yaml(dataset_yaml):
+        # Data yaml dari split_yolo_dataset.py --materialize shards: baca gambar dari shard tar
+        from shard_dataset import ShardDetectionTrainer
+        trainer_cls = ShardDetectionTrainer
+    if sampling and sampling != 'none':
+        # Kelas langka / gambar sulit lebih sering diambil; ShardDetectionTrainer juga menangani folder biasa
+        from shard_dataset import ShardDetectionTrainer
+        from weighted_sampler import weighted_trainer
+        trainer_cls = weighted_trainer(trainer_cls or ShardDetectionTrainer, sampling, sample_fraction)
+    return trainer_cls
+
+def shard_validator():
+    from shard_dataset import ShardDetectionValidator
+    return ShardDetectionValidator
+
+def is_shard_yaml(data_yaml):
+    """True jika data yaml dibuat oleh split_yolo_dataset.py --materialize shards."""
+    try:
+        with open(data_yaml) as f:
+            return (yaml.safe_load(f) or {}).get('format') == 'shards'
+    except OSError:
+        return False
 
 def clear():
     os.system('cls' if os.name == 'nt' else 'clear')
@@ -60,15 +109,19 @@ def print_training_summary(results, val_results, model_dir, start_time, end_time
 
     # Epoch terbaik & waktu training
     csv_path = os.path.join(model_dir, "results.csv")
+    telemetry = load_telemetry(model_dir)
     best_epoch = best_map = None
     epoch_time = "-"
     if os.path.exists(csv_path):
         try:
             df = pd.read_csv(csv_path)
-            best_idx = df['metrics/mAP_0.5'].idxmax()
+            df.columns = [c.strip() for c in df.columns]
+            map_col = 'metrics/mAP50(B)' if 'metrics/mAP50(B)' in df else 'metrics/mAP_0.5'
+            best_idx = df[map_col].idxmax()
             best_epoch = int(df.iloc[best_idx]['epoch'])
-            best_map = df.iloc[best_idx]['metrics/mAP_0.5']
-            total_time = df['epoch_time'].sum() if 'epoch_time' in df else None
+            best_map = df.iloc[best_idx][map_col]
+            # Ultralytics tidak menulis kolom epoch_time; ambil dari telemetry (jika ada)
+            total_time = telemetry['summary']['total_epoch_time_s'] if telemetry and telemetry.get('summary') else None
             if total_time:
                 epoch_time = f"{total_time/3600:.2f} jam ({total_time/60:.0f} menit)"
             else:
@@ -88,12 +141,15 @@ def print_training_summary(results, val_results, model_dir, start_time, end_time
         precision = safe_float_fmt(box.precision.mean()) if box and hasattr(box, "precision") and hasattr(box.precision, "mean") else "?"
         recall = safe_float_fmt(box.recall.mean()) if box and hasattr(box, "recall") and hasattr(box.recall, "mean") else "?"
 
-    # Inference speed
-    speed = getattr(val_results, "speed", {}).get("inference", "?")
+    # Inference speed (per fase, postprocess = NMS)
+    speeds = getattr(val_results, "speed", {}) or {}
+    speed = speeds.get("inference", "?")
     try:
         speed_str = f"{float(speed):.1f} ms/gambar"
     except Exception:
         speed_str = f"{speed} ms/gambar"
+    phase_str = ", ".join(f"{k} {safe_float_fmt(v, '.1f')}" for k, v in speeds.items()) or "-"
+    telemetry_summary = (telemetry or {}).get("summary") or {}
 
     # File model terbaik
     best_pt = os.path.join(model_dir, "weights", "best.pt")
@@ -104,11 +160,20 @@ def print_training_summary(results, val_results, model_dir, start_time, end_time
     print(f"- Epoch terbaik        : {best_epoch if best_epoch is not None else '-'} (mAP50: {safe_float_fmt(best_map) if best_map is not None else '-'})")
     print(f"- Total waktu training : {epoch_time}")
     print(f"- Inference speed      : {speed_str}")
+    print(f"- Latency per fase (ms): {phase_str}")
+    if telemetry_summary:
+        print(f"- Throughput training  : {safe_float_fmt(telemetry_summary.get('mean_images_per_sec'), '.1f')} gambar/detik")
+        print(f"- Menunggu data        : {safe_float_fmt(100 * telemetry_summary['data_wait_frac'], '.0f')}% waktu train "
+              f"({'I/O-bound' if telemetry_summary['bound'] == 'io' else 'compute-bound'})")
+        print(f"- Peak RSS             : {safe_float_fmt(telemetry_summary.get('peak_rss_mb'), '.0f')} MB")
     print(f"- mAP50 (IoU 0.5)      : {map50}")
     print(f"- mAP50-95 (COCO)      : {map5095}")
     print(f"- Precision rata-rata  : {precision}")
     print(f"- Recall rata-rata     : {recall}")
     print(f"- File model terbaik   : {best_pt}")
+    print(f"- Export & benchmark CPU: python export_benchmark.py {best_pt}")
+    if telemetry_summary:
+        print(f"- Telemetry per epoch  : {os.path.join(model_dir, TELEMETRY_CSV)}")
     print("\nKeterangan:")
     print("• mAP50 >0.5: Sudah cukup baik untuk deteksi objek.")
     print("• Precision: Persentase prediksi benar.")
@@ -147,11 +212,7 @@ def main():
             "Path ke file model .pt yang sudah Anda siapkan sendiri."
         )
     else:
-        models_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'models'))
-        os.makedirs(models_dir, exist_ok=True)
-        model = os.path.join(models_dir, f"yolov8{model_choice}.pt")
-        if not os.path.exists(model):
-            print(f">>> Model {model} belum ada, akan otomatis diunduh oleh YOLO.")
+        model = resolve_model(model_choice)
 
     # Path data.yaml
     dataset_yaml = input_with_default(
@@ -231,17 +292,55 @@ def main():
         except ValueError:
             print("  Input harus angka.")
 
+    # Cache gambar ter-resize
+    image_cache = input_with_default(
+        "Pakai cache gambar ter-resize? (y/n):",
+        "n",
+        "Decode + resize JPEG sekali ke cache memmap (disk, maks. MAX_CACHE_GB di image_cache.py), "
+        "sehingga epoch di CPU tidak habis untuk decode gambar. Disarankan 'y' untuk training di CPU."
+    ).lower()
+
+    # Sampling epoch
+    sampling = select_from_list(
+        "Sampling gambar per epoch:",
+        {
+            "none": "Seragam (tiap gambar sekali per epoch)",
+            "class": "Berbobot kelas (kelas langka lebih sering)",
+            "loss": "Hard example (bobot dari loss epoch sebelumnya)",
+            "class+loss": "Berbobot kelas + hard example",
+        },
+        "none",
+        "Kelas langka (ambulance, police, debris) jarang terlihat bila sampling seragam; sampling berbobot mengulanginya."
+    )
+    sample_fraction = 1.0
+    if sampling != "none":
+        while True:
+            try:
+                sample_fraction = float(input_with_default(
+                    "Gambar per epoch (fraksi dari jumlah gambar train):",
+                    "1.0",
+                    "Kurang dari 1.0 mempersingkat epoch; gambar diambil dengan pengembalian sesuai bobot."
+                ))
+                if sample_fraction > 0:
+                    break
+                print("  Input harus > 0.")
+            except ValueError:
+                print("  Input harus angka.")
+
     # Ringkasan
     clear()
     print_section("Ringkasan Konfigurasi Training")
     print(f"Model        : {model} {'(custom)' if model_choice == 'custom' else ''}")
-    print(f"Dataset yaml : {dataset_yaml}")
+    use_shards = is_shard_yaml(dataset_yaml)
+    print(f"Dataset yaml : {dataset_yaml}{' (shard)' if use_shards else ''}")
     print(f"Epochs       : {epochs}")
     print(f"Img size     : {imgsz}")
     print(f"Batch size   : {batch}")
     print(f"Learning rate: {'default' if not lr else lr}")
     print(f"Device       : {device}")
     print(f"Workers      : {workers}")
+    print(f"Cache gambar : {'ya' if image_cache == 'y' else 'tidak'}")
+    print(f"Sampling     : {sampling}{f' ({sample_fraction:g} x gambar per epoch)' if sampling != 'none' else ''}")
     print("\nLanjutkan training? (Y/n)")
     confirm = input("  > ").strip().lower()
     if confirm == "n":
@@ -249,7 +348,7 @@ def main():
         return
 
     # Tentukan project_dir (history tetap, tidak pernah dihapus)
-    project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../runs/detect/camera"))
+    project_dir = PROJECT_DIR
 
     print("\nMemulai training YOLOv8 ...\n")
     model_obj = YOLO(model)
@@ -271,6 +370,13 @@ def main():
         except Exception:
             print("Learning rate tidak valid, gunakan default.")
 
+    trainer_cls = select_trainer(dataset_yaml, image_cache == "y", sampling, sample_fraction)
+    if trainer_cls is not None:
+        train_kwargs["trainer"] = trainer_cls
+
+    # Telemetry per epoch (data wait vs compute, gambar/detik, RSS, latency validasi) ke telemetry.csv/json
+    TrainingTelemetry().attach(model_obj)
+
     start_time = time.time()
     results = model_obj.train(**train_kwargs)
     end_time = time.time()
@@ -287,7 +393,10 @@ def main():
 
         # Jalankan validasi ulang pada model terbaik, output ke folder yang sama agar tidak buat train baru
         weights_path = os.path.join(runs_path, "weights", "best.pt")
-        val_results = model_obj.val(model=weights_path, project=project_dir, name=os.path.basename(runs_path), exist_ok=True, amp=False)
+        val_kwargs = dict(model=weights_path, project=project_dir, name=os.path.basename(runs_path), exist_ok=True, amp=False)
+        if use_shards:
+            val_kwargs["validator"] = shard_validator()
+        val_results = model_obj.val(**val_kwargs)
 
         print_training_summary(results, val_results, runs_path, start_time, end_time)
     except Exception as e:
@@ -0,0 +1,156 @@
+import os
+import csv
+import json
+import time
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Telemetry per epoch lewat callback trainer Ultralytics, ditulis ke telemetry.csv dan
+# telemetry.json di folder run (sebelah results.csv):
+#   data_wait_s   waktu menunggu batch dari dataloader (akhir batch -> awal batch berikutnya)
+#   compute_s     waktu forward/backward/optimizer (awal -> akhir batch)
+#   images_per_sec gambar training per detik fase train
+#   peak_rss_mb   puncak RSS proses trainer; workers_rss_mb RSS worker dataloader saat akhir epoch
+#   val_*_ms      latency validasi per gambar per fase (postprocess = NMS)
+TELEMETRY_CSV = 'telemetry.csv'
+TELEMETRY_JSON = 'telemetry.json'
+# Epoch dianggap I/O-bound jika lebih dari fraksi ini waktu train habis menunggu data
+DATA_BOUND_FRACTION = 0.3
+FIELDS = [
+    'epoch', 'epoch_time_s', 'train_time_s', 'val_time_s', 'batches', 'images', 'images_per_sec',
+    'data_wait_s', 'compute_s', 'data_wait_frac', 'bound', 'peak_rss_mb', 'workers_rss_mb', 'gpu_mem_mb',
+    'val_preprocess_ms', 'val_inference_ms', 'val_loss_ms', 'val_postprocess_ms',
+]
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss dalam KB di Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def _workers_rss_mb():
+    try:
+        import psutil
+        children = psutil.Process().children(recursive=True)
+        return round(sum(child.memory_info().rss for child in children) / 1e6, 1)
+    except Exception:
+        return None
+
+class TrainingTelemetry:
+    """Kumpulkan telemetry per epoch. Pakai attach(model) sebelum model.train(...)."""
+
+    def __init__(self, sync_cuda=True):
+        self.sync_cuda = sync_cuda
+        self.rows = []
+        self._reset()
+
+    def _reset(self):
+        self.batches = 0
+        self.data_wait = 0.0
+        self.compute = 0.0
+        self.epoch_start = self.last_batch_end = self.batch_start = self.train_end = time.perf_counter()
+
+    def _sync(self, trainer):
+        # Kernel CUDA asinkron: tanpa sinkronisasi waktu compute akan terhitung sebagai waktu tunggu data
+        if self.sync_cuda and getattr(trainer.device, 'type', 'cpu') == 'cuda':
+            import torch
+            torch.cuda.synchronize(trainer.device)
+
+    def on_train_epoch_start(self, trainer):
+        self._reset()
+
+    def on_train_batch_start(self, trainer):
+        now = time.perf_counter()
+        self.data_wait += now - self.last_batch_end
+        self.batch_start = now
+
+    def on_train_batch_end(self, trainer):
+        self._sync(trainer)
+        now = time.perf_counter()
+        self.compute += now - self.batch_start
+        self.batches += 1
+        self.last_batch_end = now
+
+    def on_train_epoch_end(self, trainer):
+        self.train_end = time.perf_counter()
+
+    def on_fit_epoch_end(self, trainer):
+        train_time = self.train_end - self.epoch_start
+        # Batas = jumlah gambar per epoch menurut sampler (weighted sampler bisa memakai
+        # sample_fraction != 1); tanpa sampler = ukuran dataset
+        loader = trainer.train_loader
+        sampler = getattr(loader, 'sampler', None)
+        per_epoch = len(sampler) if sampler is not None else len(loader.dataset)
+        images = min(self.batches * trainer.batch_size, per_epoch)
+        busy = self.data_wait + self.compute
+        wait_frac = self.data_wait / busy if busy > 0 else 0.0
+        speed = getattr(getattr(trainer, 'validator', None), 'speed', None) or {}
+        gpu_mem = None
+        if getattr(trainer.device, 'type', 'cpu') == 'cuda':
+            import torch
+            gpu_mem = round(torch.cuda.max_memory_allocated(trainer.device) / 1e6, 1)
+        row = {
+            'epoch': trainer.epoch + 1,
+            'epoch_time_s': round(trainer.epoch_time or 0.0, 3),
+            'train_time_s': round(train_time, 3),
+            'val_time_s': round(time.perf_counter() - self.train_end, 3),
+            'batches': self.batches,
+            'images': images,
+            'images_per_sec': round(images / train_time, 2) if train_time > 0 else None,
+            'data_wait_s': round(self.data_wait, 3),
+            'compute_s': round(self.compute, 3),
+            'data_wait_frac': round(wait_frac, 4),
+            'bound': 'io' if wait_frac > DATA_BOUND_FRACTION else 'compute',
+            'peak_rss_mb': _peak_rss_mb(),
+            'workers_rss_mb': _workers_rss_mb(),
+            'gpu_mem_mb': gpu_mem,
+        }
+        for phase in ('preprocess', 'inference', 'loss', 'postprocess'):
+            value = speed.get(phase)
+            row[f'val_{phase}_ms'] = round(value, 3) if value is not None else None
+        self.rows.append(row)
+        self.write(trainer.save_dir)
+
+    def summary(self):
+        """Rata-rata per epoch seluruh run (None jika belum ada epoch)."""
+        if not self.rows:
+            return None
+        total_wait = sum(r['data_wait_s'] for r in self.rows)
+        total_busy = total_wait + sum(r['compute_s'] for r in self.rows)
+        rates = [r['images_per_sec'] for r in self.rows if r['images_per_sec']]
+        wait_frac = total_wait / total_busy if total_busy > 0 else 0.0
+        return {
+            'epochs': len(self.rows),
+            'total_epoch_time_s': round(sum(r['epoch_time_s'] for r in self.rows), 3),
+            'mean_images_per_sec': round(sum(rates) / len(rates), 2) if rates else None,
+            'data_wait_frac': round(wait_frac, 4),
+            'bound': 'io' if wait_frac > DATA_BOUND_FRACTION else 'compute',
+            'peak_rss_mb': max((r['peak_rss_mb'] or 0) for r in self.rows) or None,
+        }
+
+    def write(self, save_dir):
+        save_dir = str(save_dir)
+        os.makedirs(save_dir, exist_ok=True)
+        with open(os.path.join(save_dir, TELEMETRY_CSV), 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(self.rows)
+        with open(os.path.join(save_dir, TELEMETRY_JSON), 'w') as f:
+            json.dump({'summary': self.summary(), 'epochs': self.rows}, f, indent=2)
+
+    def attach(self, model):
+        """Daftarkan callback ke model YOLO (atau trainer) yang punya add_callback."""
+        for event in ('on_train_epoch_start', 'on_train_batch_start', 'on_train_batch_end',
+                      'on_train_epoch_end', 'on_fit_epoch_end'):
+            model.add_callback(event, getattr(self, event))
+        return self
+
+def load_telemetry(run_dir):
+    """Baca telemetry.json dari folder run; None jika tidak ada."""
+    path = os.path.join(run_dir, TELEMETRY_JSON)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,288 @@
+import os
+import csv
+import sys
+import argparse
+import numpy as np
+
+from training_telemetry import load_telemetry
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'preprocessing', 'camera'))
+
+# Sampling epoch training berbobot, pengganti shuffle seragam (tiap gambar tepat sekali per epoch):
+#   class       bobot gambar dari frekuensi kelas; gambar berisi kelas langka (wheelchair, ambulance,
+#               police, debris) lebih sering diambil daripada ribuan frame yang hanya berisi mobil
+#   loss        bobot dikali loss gambar pada epoch sebelumnya (hard example), dihaluskan EMA
+#   class+loss  keduanya
+# Gambar diambil dengan pengembalian sebanyak sample_fraction x jumlah gambar per epoch, sehingga epoch
+# bisa dipersingkat (< 1.0) tanpa membuang kelas langka. Bandingkan hasilnya dengan `compare`.
+SAMPLING_MODES = ('none', 'class', 'loss', 'class+loss')
+CLASS_POWER = 0.5
+LOSS_POWER = 1.0
+# EMA loss per gambar: porsi nilai lama
+LOSS_MOMENTUM = 0.7
+# Bobot gambar dibatasi dalam [1/rasio, rasio] x rata-rata, agar satu gambar tidak mendominasi epoch
+MAX_WEIGHT_RATIO = 20.0
+# Indeks diambil bertahap per potongan: prefetch dataloader lintas epoch hanya memakai bobot lama sebentar
+SAMPLE_CHUNK = 256
+RESULTS_CSV = 'results.csv'
+MAP_COLUMN = 'metrics/mAP50(B)'
+
+def image_class_counts(labels, num_classes):
+    """Matriks (jumlah gambar, jumlah kelas) box per kelas per gambar dari dataset.labels Ultralytics."""
+    counts = np.zeros((len(labels), num_classes), dtype=np.int32)
+    for i, label in enumerate(labels):
+        cls = np.asarray(label['cls'], dtype=np.int64).reshape(-1)
+        np.add.at(counts[i], cls[(cls >= 0) & (cls < num_classes)], 1)
+    return counts
+
+def normalize(weights, max_ratio=MAX_WEIGHT_RATIO):
+    """Rata-rata 1, dibatasi dalam [1/max_ratio, max_ratio]."""
+    weights = np.asarray(weights, dtype=np.float64)
+    weights = np.clip(weights / weights.mean(), 1 / max_ratio, max_ratio)
+    return weights / weights.mean()
+
+def class_weights(counts, power=CLASS_POWER):
+    """Bobot per kelas = (jumlah gambar / gambar yang memuat kelas) ^ power; kelas tanpa gambar = 0."""
+    present = np.count_nonzero(counts, axis=0).astype(np.float64)
+    weights = np.zeros(counts.shape[1])
+    weights[present > 0] = (len(counts) / present[present > 0]) ** power
+    return weights
+
+def image_weights(counts, power=CLASS_POWER, max_ratio=MAX_WEIGHT_RATIO):
+    """
+    Bobot per gambar = bobot kelas paling langka di gambar itu (satu ambulans di antara 20 mobil tetap
+    dihitung langka). Gambar tanpa box memakai bobot kelas paling umum.
+    """
+    per_class = class_weights(counts, power)
+    if not np.any(per_class > 0):
+        return np.ones(len(counts))
+    weights = np.where(counts > 0, per_class[None, :], 0.0).max(axis=1)
+    weights[weights == 0] = per_class[per_class > 0].min()
+    return normalize(weights, max_ratio)
+
+class WeightedImageSampler:
+    """
+    Sampler indeks dataset dengan bobot per gambar (dengan pengembalian). Epoch baru = seed baru.
+    record(indices, loss) dipanggil trainer setiap batch; end_epoch() memasukkan loss ke bobot (mode loss).
+    """
+
+    def __init__(self, base_weights, mode='class', sample_fraction=1.0, loss_power=LOSS_POWER,
+                 momentum=LOSS_MOMENTUM, max_ratio=MAX_WEIGHT_RATIO, seed=0):
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Mode sampling tidak dikenal: {mode} (pilih dari {SAMPLING_MODES})")
+        self.base_weights = np.asarray(base_weights, dtype=np.float64)
+        self.weights = self.base_weights.copy()
+        self.mode = mode
+        self.num_samples = max(1, int(round(len(self.weights) * sample_fraction)))
+        self.loss_power = loss_power
+        self.momentum = momentum
+        self.max_ratio = max_ratio
+        self.seed = seed
+        self.epoch = 0
+        self.losses = np.full(len(self.weights), np.nan)
+        self._reset_epoch()
+
+    def _reset_epoch(self):
+        self.epoch_loss = np.zeros(len(self.weights))
+        self.epoch_count = np.zeros(len(self.weights))
+
+    def __len__(self):
+        return self.num_samples
+
+    def __iter__(self):
+        rng = np.random.default_rng(self.seed + self.epoch)
+        self.epoch += 1
+        remaining = self.num_samples
+        while remaining > 0:
+            n = min(remaining, SAMPLE_CHUNK)
+            yield from rng.choice(len(self.weights), n, p=self.weights / self.weights.sum()).tolist()
+            remaining -= n
+
+    def record(self, indices, loss):
+        """Loss (per gambar) untuk indeks yang baru dilatih; indeks duplikat dirata-rata."""
+        np.add.at(self.epoch_loss, indices, loss)
+        np.add.at(self.epoch_count, indices, 1)
+
+    def end_epoch(self):
+        """Gabungkan loss epoch ini ke EMA per gambar dan hitung bobot epoch berikutnya."""
+        seen = self.epoch_count > 0
+        if 'loss' in self.mode and seen.any():
+            mean = self.epoch_loss[seen] / self.epoch_count[seen]
+            old = self.losses[seen]
+            self.losses[seen] = np.where(np.isnan(old), mean, self.momentum * old + (1 - self.momentum) * mean)
+            known = ~np.isnan(self.losses)
+            # Gambar yang belum pernah diambil memakai loss rata-rata: tidak diunggulkan, tidak dihukum
+            losses = np.where(known, self.losses, self.losses[known].mean())
+            factor = (np.maximum(losses, 1e-12) / max(losses.mean(), 1e-12)) ** self.loss_power
+            self.weights = normalize(self.base_weights * factor, self.max_ratio)
+        self._reset_epoch()
+
+    def effective_images(self):
+        """Jumlah gambar efektif (1 / sum p^2): = jumlah gambar bila seragam, kecil bila bobot timpang."""
+        p = self.weights / self.weights.sum()
+        return 1.0 / float(np.sum(p ** 2))
+
+class WeightedSamplingMixin:
+    """
+    Dataloader train memakai WeightedImageSampler. Opsi lewat atribut kelas (lihat weighted_trainer).
+    Ultralytics hanya memberi loss per batch, jadi loss gambar didekati dengan loss batch tempat gambar
+    itu diambil; karena batch diacak ulang tiap epoch, EMA merata-ratakan pengaruh gambar lain di batch.
+    """
+    sampling = 'class'
+    sample_fraction = 1.0
+    class_power = CLASS_POWER
+    loss_power = LOSS_POWER
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sampler = None
+        self.sample_index = {}
+        self.batch_indices = []
+        self.add_callback('on_train_batch_end', self._record_batch_loss)
+        self.add_callback('on_train_epoch_end', self._end_sampling_epoch)
+
+    def get_dataloader(self, dataset_path, batch_size=16, rank=0, mode='train'):
+        if mode != 'train' or rank != -1 or self.args.rect:
+            # Validasi, DDP (DistributedSampler) dan rect training tetap memakai dataloader kelas dasar
+            return super().get_dataloader(dataset_path, batch_size, rank, mode)
+        from ultralytics.utils import LOGGER
+        from shard_dataset import build_shard_dataloader
+
+        dataset = self.build_dataset(dataset_path, mode, batch_size)
+        counts = image_class_counts(dataset.labels, len(self.data['names']))
+        base = image_weights(counts, self.class_power) if 'class' in self.sampling else np.ones(len(counts))
+        self.sampler = WeightedImageSampler(base, self.sampling, self.sample_fraction, self.loss_power,
+                                            seed=self.args.seed)
+        self.sample_index = {im_file: i for i, im_file in enumerate(dataset.im_files)}
+        LOGGER.info(f"Sampling {self.sampling}: {len(self.sampler)}/{len(dataset)} gambar per epoch, "
+                    f"gambar efektif {self.sampler.effective_images():.0f}, bobot maks {base.max():.1f}x")
+        return build_shard_dataloader(dataset, batch_size, self.args.workers, seed=self.args.seed,
+                                      sampler=self.sampler)
+
+    def preprocess_batch(self, batch):
+        if self.sampler is not None:
+            self.batch_indices = [self.sample_index[im_file] for im_file in batch['im_file']]
+        return super().preprocess_batch(batch)
+
+    def _record_batch_loss(self, trainer):
+        if self.sampler is None or not self.batch_indices or getattr(self, 'loss_items', None) is None:
+            return
+        loss = float(self.loss_items.sum())
+        if np.isfinite(loss):
+            self.sampler.record(self.batch_indices, loss)
+        self.batch_indices = []
+
+    def _end_sampling_epoch(self, trainer):
+        if self.sampler is not None:
+            self.sampler.end_epoch()
+
+def weighted_trainer(base, sampling='class', sample_fraction=1.0, **options):
+    """Subkelas trainer `base` dengan sampling berbobot; options menimpa class_power/loss_power."""
+    if sampling not in SAMPLING_MODES:
+        raise ValueError(f"Mode sampling tidak dikenal: {sampling} (pilih dari {SAMPLING_MODES})")
+    attrs = dict(sampling=sampling, sample_fraction=float(sample_fraction), **options)
+    return type(f"Weighted{base.__name__}", (WeightedSamplingMixin, base), attrs)
+
+def load_curve(run_dir):
+    """mAP50 per epoch dan waktu kumulatif (detik) dari results.csv + telemetry.json folder run."""
+    with open(os.path.join(run_dir, RESULTS_CSV), newline='') as f:
+        rows = [{key.strip(): value for key, value in row.items()} for row in csv.DictReader(f)]
+    maps = np.array([float(row[MAP_COLUMN]) for row in rows])
+    telemetry = load_telemetry(run_dir)
+    if telemetry and len(telemetry.get('epochs') or []) >= len(maps):
+        times = np.cumsum([row['epoch_time_s'] for row in telemetry['epochs']][:len(maps)])
+    elif rows and 'time' in rows[0]:
+        # Ultralytics versi baru menulis waktu kumulatif di results.csv
+        times = np.array([float(row['time']) for row in rows])
+    else:
+        times = np.full(len(maps), np.nan)
+    return maps, times
+
+def compare_runs(baseline_dir, run_dirs, target=None, tolerance=0.0):
+    """
+    Epoch dan waktu training sampai mAP50 pertama kali >= target (default: mAP50 terbaik baseline
+    dikurangi tolerance), untuk baseline dan tiap run pembanding.
+    """
+    base_maps, base_times = load_curve(baseline_dir)
+    if target is None:
+        target = float(base_maps.max()) - tolerance
+    rows = []
+    base_time = None
+    for run_dir in [baseline_dir] + list(run_dirs):
+        maps, times = (base_maps, base_times) if run_dir == baseline_dir else load_curve(run_dir)
+        hit = np.nonzero(maps >= target)[0]
+        epoch = int(hit[0]) + 1 if len(hit) else None
+        seconds = float(times[hit[0]]) if len(hit) and np.isfinite(times[hit[0]]) else None
+        if run_dir == baseline_dir:
+            base_time = seconds
+        saving = 1 - seconds / base_time if seconds is not None and base_time else None
+        rows.append({'run': run_dir, 'best_map50': float(maps.max()), 'epochs': len(maps),
+                     'epoch_to_target': epoch, 'time_to_target_s': seconds, 'saving': saving})
+    return target, rows
+
+def print_comparison(target, rows):
+    print(f"\n=== Waktu sampai mAP50 >= {target:.4f} ===")
+    print(f"{'run':40s} {'best':>7s} {'epoch':>7s} {'waktu(s)':>10s} {'hemat':>7s}")
+    for row in rows:
+        epoch = f"{row['epoch_to_target']}/{row['epochs']}" if row['epoch_to_target'] else f"-/{row['epochs']}"
+        seconds = f"{row['time_to_target_s']:.0f}" if row['time_to_target_s'] is not None else '-'
+        saving = f"{row['saving'] * 100:.0f}%" if row['saving'] is not None else '-'
+        print(f"{os.path.basename(os.path.normpath(row['run']))[:40]:40s} {row['best_map50']:7.4f} {epoch:>7s} "
+              f"{seconds:>10s} {saving:>7s}")
+    print()
+
+def preview(stats_dir, split='train', mode='class', power=CLASS_POWER, sample_fraction=1.0):
+    """Perkiraan box per kelas per epoch: sampling seragam vs berbobot kelas (dari index label_stats)."""
+    from label_stats import LabelStats
+
+    stats = LabelStats(stats_dir)
+    counts = stats.image_class_counts()
+    if split:
+        counts = counts[np.asarray(stats.images['split']) == stats.meta['splits'].index(split)]
+    if not len(counts):
+        raise ValueError(f"Tidak ada gambar di split {split}")
+    weights = image_weights(counts, power) if 'class' in mode else np.ones(len(counts))
+    sampler = WeightedImageSampler(weights, mode, sample_fraction)
+    # Epoch seragam dengan jumlah gambar yang sama (sample_fraction berlaku untuk keduanya)
+    uniform = len(sampler) / len(counts) * counts.sum(axis=0)
+    weighted = len(sampler) * (weights / weights.sum()) @ counts
+    width = max(len(name) for name in stats.class_names)
+
+    print(f"\n=== Box per epoch ({split or 'semua'}, {len(counts)} gambar, mode {mode}, power {power}, "
+          f"{len(sampler)} gambar/epoch, gambar efektif {sampler.effective_images():.0f}) ===")
+    print(f"{'kelas':{width}s} {'seragam':>9s} {'berbobot':>9s} {'rasio':>7s}")
+    for c, name in enumerate(stats.class_names):
+        ratio = f"{weighted[c] / uniform[c]:.2f}x" if uniform[c] else '-'
+        print(f"{name:{width}s} {uniform[c]:9.0f} {weighted[c]:9.0f} {ratio:>7s}")
+    print()
+
+def parse_args():
+    from label_stats import STATS_DIR
+
+    parser = argparse.ArgumentParser(description="Sampling training berbobot: preview bobot kelas dan bandingkan run.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('preview', help="Box per kelas per epoch, seragam vs berbobot (index label_stats).")
+    p.add_argument('--stats', default=STATS_DIR)
+    p.add_argument('--split', default='train', help="Kosongkan ('') untuk semua split.")
+    p.add_argument('--mode', default='class', choices=SAMPLING_MODES)
+    p.add_argument('--power', type=float, default=CLASS_POWER, help="0 = seragam, 1 = penuh kebalikan frekuensi.")
+    p.add_argument('--fraction', type=float, default=1.0, help="Gambar per epoch relatif terhadap dataset.")
+    p = sub.add_parser('compare', help="Epoch & waktu sampai mAP baseline tercapai (folder run Ultralytics).")
+    p.add_argument('baseline', help="Folder run baseline (sampling seragam).")
+    p.add_argument('runs', nargs='+', help="Folder run pembanding.")
+    p.add_argument('--target', type=float, default=None, help="mAP50 target (default: terbaik baseline).")
+    p.add_argument('--tolerance', type=float, default=0.0, help="Target = mAP50 terbaik baseline - tolerance.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.command == 'preview':
+        try:
+            preview(args.stats, args.split or None, args.mode, args.power, args.fraction)
+        except (OSError, ValueError) as e:
+            sys.exit(str(e))
+    else:
+        print_comparison(*compare_runs(args.baseline, args.runs, args.target, args.tolerance))
+
+if __name__ == "__main__":
+    main()
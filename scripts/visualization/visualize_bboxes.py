@@ -0,0 +1,381 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import multiprocessing
+from collections import OrderedDict
+import numpy as np
+import cv2
+import yaml
+from tqdm import tqdm
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'preprocessing', 'camera'))
+from nuscenes_to_yolo import NUSC_VERSION
+from packed_labels import PackedLabels
+from verify_camera_data import jpeg_size
+
+# Render box YOLO (label dan/atau prediksi model) ke gambar kamera, paralel per job di process pool:
+#   sheet : contact sheet (grid thumbnail) JPEG, satu job = satu sheet
+#   video : satu MP4 per scene nuScenes (urutan dari manifest konversi), satu frame video = 6 kamera satu
+#           sample dalam grid 3x2. Frame langsung di-encode cv2.VideoWriter (tanpa PNG per frame)
+# JPEG di-decode langsung ke ukuran tereduksi (IMREAD_REDUCED_COLOR_*) yang cukup untuk ukuran tile.
+IMAGE_DIR = '../../data/processed/nuscenes/camera/images'
+LABEL_DIR = '../../data/processed/nuscenes/camera/labels'
+DATA_YAML = '../../data/datasets/camera/data.yaml'
+MANIFEST_PATH = '../../data/meta/nuscenes_camera_manifest.csv'
+DATAROOT = '../../data/raw/nuscenes'
+OUT_DIR = '../../data/visualizations/camera'
+TILE_WIDTH = 480
+GRID = (4, 4)
+VIDEO_FPS = 2.0          # keyframe nuScenes 2 Hz
+# Urutan tile video: baris atas kamera depan, baris bawah kamera belakang
+VIDEO_LAYOUT = ['CAM_FRONT_LEFT', 'CAM_FRONT', 'CAM_FRONT_RIGHT', 'CAM_BACK_LEFT', 'CAM_BACK', 'CAM_BACK_RIGHT']
+REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+def class_color(class_id):
+    """Warna BGR tetap per class id (hue tersebar dengan golden ratio)."""
+    hue = int((class_id * 0.618033988749895 % 1.0) * 180)
+    hsv = np.uint8([[[hue, 220, 255]]])
+    return tuple(int(c) for c in cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[0, 0])
+
+def load_names(data_yaml):
+    """class id -> nama dari data.yaml (list atau dict names). Kosong jika file tidak ada."""
+    if not data_yaml or not os.path.exists(data_yaml):
+        return {}
+    with open(data_yaml) as f:
+        names = (yaml.safe_load(f) or {}).get('names', {})
+    return dict(enumerate(names)) if isinstance(names, list) else {int(k): v for k, v in names.items()}
+
+def parse_classes(values, names):
+    """
+    --classes berisi id atau nama (dari data.yaml) -> set class id. Komponen terakhir nama
+    bertitik (label yang tergambar, mis. 'car' untuk 'vehicle.car') juga diterima jika unik.
+    """
+    if not values:
+        return None
+    by_name = {name: class_id for class_id, name in names.items()}
+    by_short = {}
+    for class_id, name in names.items():
+        by_short.setdefault(name.split('.')[-1], []).append(class_id)
+    ids = set()
+    for value in values:
+        if value.lstrip('-').isdigit():
+            ids.add(int(value))
+        elif value in by_name:
+            ids.add(by_name[value])
+        elif len(by_short.get(value, [])) == 1:
+            ids.add(by_short[value][0])
+        elif value in by_short:
+            options = ', '.join(names[class_id] for class_id in by_short[value])
+            raise ValueError(f"Kelas ambigu: {value} (pilih salah satu: {options})")
+        else:
+            raise ValueError(f"Kelas tidak dikenal: {value}")
+    return ids
+
+def read_yolo_txt(path):
+    """File label/prediksi YOLO -> (class id (K,), box ternormalisasi (K,4), conf (K,) atau None)."""
+    try:
+        with open(path) as f:
+            rows = [line.split() for line in f if line.strip()]
+    except FileNotFoundError:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 4)), None
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 4)), None
+    values = np.array([row[:6] + [float('nan')] * (6 - len(row)) for row in rows], dtype=np.float64)
+    conf = values[:, 5] if not np.isnan(values[:, 5]).all() else None
+    return values[:, 0].astype(np.int64), values[:, 1:5], conf
+
+def read_image(path, tile_width):
+    """Decode JPEG ke ukuran tereduksi terkecil yang masih >= tile_width, lalu resize ke lebar tile."""
+    size = jpeg_size(path) if path.lower().endswith(('.jpg', '.jpeg')) else None
+    flag = cv2.IMREAD_COLOR
+    if size is not None:
+        for factor, reduced in REDUCED_FLAGS:
+            if size[0] // factor >= tile_width:
+                flag = reduced
+                break
+    im = cv2.imread(path, flag)
+    if im is None:
+        return None
+    h, w = im.shape[:2]
+    if w != tile_width:
+        im = cv2.resize(im, (tile_width, max(1, round(h * tile_width / w))), interpolation=cv2.INTER_AREA)
+    return im
+
+def draw_boxes(im, class_ids, boxes, names, conf=None, classes=None, thickness=2):
+    """Gambar box ternormalisasi [xc, yc, w, h] + nama kelas (dan confidence prediksi) ke im (in-place)."""
+    h, w = im.shape[:2]
+    for i, class_id in enumerate(class_ids.tolist()):
+        if classes is not None and class_id not in classes:
+            continue
+        xc, yc, bw, bh = boxes[i]
+        x1, y1 = int((xc - bw / 2) * w), int((yc - bh / 2) * h)
+        x2, y2 = int((xc + bw / 2) * w), int((yc + bh / 2) * h)
+        color = class_color(class_id)
+        cv2.rectangle(im, (x1, y1), (x2, y2), color, thickness, cv2.LINE_AA)
+        text = names.get(class_id, str(class_id)).split('.')[-1]
+        if conf is not None:
+            text += f" {conf[i]:.2f}"
+        (tw, th), _ = cv2.getTextSize(text, FONT, 0.4, 1)
+        ty = y1 - 2 if y1 - th - 4 >= 0 else y2 + th + 2
+        cv2.rectangle(im, (x1, ty - th - 2), (x1 + tw + 2, ty + 2), color, -1)
+        cv2.putText(im, text, (x1 + 1, ty), FONT, 0.4, (0, 0, 0), 1, cv2.LINE_AA)
+    return im
+
+def frame_classes(name, label_dir, pred_dir, packed=None):
+    """Class id yang ada di label + prediksi satu gambar (untuk filter frame)."""
+    ids = set()
+    if packed is not None:
+        if name in packed:
+            ids.update(packed.labels(name)[0].tolist())
+    elif label_dir:
+        ids.update(read_yolo_txt(os.path.join(label_dir, os.path.splitext(name)[0] + '.txt'))[0].tolist())
+    if pred_dir:
+        ids.update(read_yolo_txt(os.path.join(pred_dir, os.path.splitext(name)[0] + '.txt'))[0].tolist())
+    return ids
+
+# --- worker -------------------------------------------------------------------
+_WORKER = {}
+
+def _init_worker(options):
+    _WORKER.update(options)
+    _WORKER['packed'] = PackedLabels(options['packed_dir']) if options['packed_dir'] else None
+    cv2.setNumThreads(1)
+
+def render_tile(name):
+    """Satu gambar + box label (tebal) dan prediksi (tipis, dengan confidence). Return tile BGR atau None."""
+    opts = _WORKER
+    im = read_image(os.path.join(opts['image_dir'], name), opts['tile_width'])
+    if im is None:
+        return None
+    stem = os.path.splitext(name)[0]
+    if opts['packed'] is not None:
+        if name in opts['packed']:
+            class_ids, boxes = opts['packed'].labels(name)
+            draw_boxes(im, class_ids.astype(np.int64), boxes, opts['names'], classes=opts['classes'])
+    elif opts['label_dir']:
+        class_ids, boxes, _ = read_yolo_txt(os.path.join(opts['label_dir'], stem + '.txt'))
+        draw_boxes(im, class_ids, boxes, opts['names'], classes=opts['classes'])
+    if opts['pred_dir']:
+        class_ids, boxes, conf = read_yolo_txt(os.path.join(opts['pred_dir'], stem + '.txt'))
+        if conf is not None:
+            keep = conf >= opts['min_conf']
+            class_ids, boxes, conf = class_ids[keep], boxes[keep], conf[keep]
+        draw_boxes(im, class_ids, boxes, opts['names'], conf=conf, classes=opts['classes'], thickness=1)
+    return im
+
+def caption(im, text):
+    cv2.putText(im, text, (4, im.shape[0] - 6), FONT, 0.4, (0, 0, 0), 3, cv2.LINE_AA)
+    cv2.putText(im, text, (4, im.shape[0] - 6), FONT, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
+
+def tile_grid(tiles, cols, tile_size):
+    """Susun tile (boleh None = kosong) ke grid; semua tile diseragamkan ke tile_size (w, h)."""
+    tw, th = tile_size
+    rows = (len(tiles) + cols - 1) // cols
+    canvas = np.zeros((rows * th, cols * tw, 3), dtype=np.uint8)
+    for i, tile in enumerate(tiles):
+        if tile is None:
+            continue
+        if tile.shape[:2] != (th, tw):
+            tile = cv2.resize(tile, (tw, th), interpolation=cv2.INTER_AREA)
+        r, c = divmod(i, cols)
+        canvas[r * th:(r + 1) * th, c * tw:(c + 1) * tw] = tile
+    return canvas
+
+def _tile_height():
+    # Rasio aspek kamera nuScenes (1600x900)
+    return round(_WORKER['tile_width'] * 9 / 16)
+
+def render_sheet(job):
+    """job: (path output, list nama gambar). Return jumlah gambar yang di-render."""
+    out_path, names = job
+    tiles = []
+    for name in names:
+        tile = render_tile(name)
+        if tile is not None and _WORKER['caption']:
+            caption(tile, os.path.splitext(name)[0][-40:])
+        tiles.append(tile)
+    heights = [tile.shape[0] for tile in tiles if tile is not None]
+    sheet = tile_grid(tiles, _WORKER['cols'], (_WORKER['tile_width'], heights[0] if heights else _tile_height()))
+    cv2.imwrite(out_path, sheet, [cv2.IMWRITE_JPEG_QUALITY, _WORKER['quality']])
+    return len(names)
+
+def render_video(job):
+    """job: (path output, list sample -> dict channel -> nama gambar). Satu MP4 di-stream per scene."""
+    out_path, samples = job
+    tile_size = (_WORKER['tile_width'], _tile_height())
+    cols = 3
+    frame_size = (tile_size[0] * cols, tile_size[1] * ((len(VIDEO_LAYOUT) + cols - 1) // cols))
+    writer = cv2.VideoWriter(out_path + '.tmp.mp4', cv2.VideoWriter_fourcc(*_WORKER['fourcc']),
+                             _WORKER['fps'], frame_size)
+    if not writer.isOpened():
+        raise RuntimeError(f"VideoWriter gagal dibuka untuk {out_path} (codec {_WORKER['fourcc']})")
+    count = 0
+    try:
+        for channels in samples:
+            tiles = []
+            for channel in VIDEO_LAYOUT:
+                tile = render_tile(channels[channel]) if channel in channels else None
+                if tile is not None and _WORKER['caption']:
+                    caption(tile, channel)
+                tiles.append(tile)
+                count += tile is not None
+            writer.write(tile_grid(tiles, cols, tile_size))
+    finally:
+        writer.release()
+    os.replace(out_path + '.tmp.mp4', out_path)
+    return count
+
+# --- pemilihan frame ----------------------------------------------------------
+def list_images(image_dir):
+    return sorted(e.name for e in os.scandir(image_dir) if e.name.lower().endswith(('.jpg', '.jpeg', '.png')))
+
+def load_scene_frames(manifest_path, images):
+    """
+    Manifest konversi -> OrderedDict scene token -> list sample (dict channel -> nama gambar),
+    hanya gambar yang ada di images. Sample diurutkan dengan timestamp di nama file nuScenes.
+    """
+    available = set(images)
+    scenes = OrderedDict()
+    with open(manifest_path) as f:
+        next(f, None)
+        for line in f:
+            parts = line.rstrip('\n').split(',')
+            if len(parts) != 4 or parts[3] not in available:
+                continue
+            sample_token, scene_token, channel, image = parts
+            scenes.setdefault(scene_token, OrderedDict()).setdefault(sample_token, {})[channel] = image
+
+    def timestamp(channels):
+        stamps = [int(os.path.splitext(name)[0].rsplit('__', 1)[-1]) for name in channels.values()
+                  if os.path.splitext(name)[0].rsplit('__', 1)[-1].isdigit()]
+        return min(stamps) if stamps else 0
+
+    return OrderedDict((scene, sorted(samples.values(), key=timestamp)) for scene, samples in scenes.items())
+
+def scene_names(dataroot, version):
+    """Token scene -> nama (scene-0061), jika scene.json tersedia."""
+    path = os.path.join(dataroot, version, 'scene.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {s['token']: s['name'] for s in json.load(f)}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Visualisasi box YOLO (label & prediksi) ke contact sheet atau MP4.")
+    parser.add_argument('--mode', choices=('sheet', 'video'), default='sheet')
+    parser.add_argument('--image-dir', default=IMAGE_DIR)
+    parser.add_argument('--label-dir', default=LABEL_DIR, help="Folder label YOLO .txt; kosongkan ('') untuk tanpa label.")
+    parser.add_argument('--packed-dir', default=None, help="Baca label dari store terpaket (labels_packed/).")
+    parser.add_argument('--pred-dir', default=None,
+                        help="Folder prediksi YOLO (cls cx cy w h conf), mis. output batch_inference.py /labels.")
+    parser.add_argument('--min-conf', type=float, default=0.25, help="Confidence minimum prediksi yang digambar.")
+    parser.add_argument('--data-yaml', default=DATA_YAML, help="Sumber nama kelas.")
+    parser.add_argument('--classes', nargs='+', help="Hanya kelas ini (id atau nama). Mode sheet: frame tanpa kelas ini dilewati.")
+    parser.add_argument('--sample', type=int, default=0, help="Ambil N gambar acak (mode sheet) / N scene acak (mode video).")
+    parser.add_argument('--every', type=int, default=1, help="Ambil setiap gambar/sample ke-K.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenes', nargs='+', help="Mode video: nama/token scene tertentu.")
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help="Manifest konversi nuScenes (mode video).")
+    parser.add_argument('--dataroot', default=DATAROOT, help="Untuk nama scene (scene.json).")
+    parser.add_argument('--version', default=NUSC_VERSION)
+    parser.add_argument('--tile-width', type=int, default=TILE_WIDTH)
+    parser.add_argument('--grid', default=f"{GRID[0]}x{GRID[1]}", help="Kolom x baris per contact sheet.")
+    parser.add_argument('--fps', type=float, default=VIDEO_FPS)
+    parser.add_argument('--fourcc', default='mp4v')
+    parser.add_argument('--quality', type=int, default=85, help="Kualitas JPEG contact sheet.")
+    parser.add_argument('--no-caption', action='store_true')
+    parser.add_argument('--workers', type=int, default=0, help="Jumlah proses (0 = semua core CPU).")
+    parser.add_argument('--out-dir', default=OUT_DIR)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    names = load_names(args.data_yaml)
+    try:
+        classes = parse_classes(args.classes, names)
+    except ValueError as e:
+        sys.exit(str(e))
+    label_dir = args.label_dir if args.label_dir and os.path.isdir(args.label_dir) else None
+    packed = PackedLabels(args.packed_dir) if args.packed_dir else None
+    images = list_images(args.image_dir)
+    rng = random.Random(args.seed)
+
+    if args.mode == 'sheet':
+        if classes is not None:
+            images = [name for name in tqdm(images, desc="Filter kelas", unit='file')
+                      if frame_classes(name, label_dir, args.pred_dir, packed) & classes]
+        if args.sample and args.sample < len(images):
+            images = sorted(rng.sample(images, args.sample))
+        images = images[::args.every]
+        cols, rows = (int(v) for v in args.grid.lower().split('x'))
+        per_sheet = cols * rows
+        out_dir = os.path.join(args.out_dir, 'sheets')
+        jobs = [(os.path.join(out_dir, f'sheet_{i // per_sheet:05d}.jpg'), images[i:i + per_sheet])
+                for i in range(0, len(images), per_sheet)]
+        total = len(images)
+        target = render_sheet
+    else:
+        if not os.path.exists(args.manifest):
+            sys.exit(f"Mode video butuh manifest konversi nuScenes: {args.manifest}")
+        scenes = load_scene_frames(args.manifest, images)
+        names_by_token = scene_names(args.dataroot, args.version)
+        if args.scenes:
+            token_by_name = {name: token for token, name in names_by_token.items()}
+            wanted = [token_by_name.get(scene, scene) for scene in args.scenes]
+            missing = [scene for scene, token in zip(args.scenes, wanted) if token not in scenes]
+            if missing:
+                sys.exit(f"Scene tidak ditemukan di manifest: {', '.join(missing)}")
+            scenes = OrderedDict((token, scenes[token]) for token in wanted)
+        if args.sample and args.sample < len(scenes):
+            keep = set(rng.sample(list(scenes), args.sample))
+            scenes = OrderedDict((token, samples) for token, samples in scenes.items() if token in keep)
+        cols = 3
+        out_dir = os.path.join(args.out_dir, 'videos')
+        jobs = [(os.path.join(out_dir, f'{names_by_token.get(token, token)}.mp4'), samples[::args.every])
+                for token, samples in scenes.items()]
+        total = sum(len(samples) * len(VIDEO_LAYOUT) for _, samples in jobs)
+        target = render_video
+
+    if not jobs:
+        sys.exit("Tidak ada gambar untuk divisualisasi.")
+    os.makedirs(out_dir, exist_ok=True)
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+    workers = max(1, min(workers, len(jobs)))
+    options = dict(image_dir=args.image_dir, label_dir=label_dir, packed_dir=args.packed_dir, pred_dir=args.pred_dir,
+                   names=names, classes=classes, min_conf=args.min_conf, tile_width=args.tile_width, cols=cols,
+                   caption=not args.no_caption, quality=args.quality, fps=args.fps, fourcc=args.fourcc)
+    print(f"\n=== Visualisasi {args.mode}: ~{total} gambar, {len(jobs)} file output, {workers} worker ===")
+
+    rendered = 0
+    start = time.time()
+    pool = None
+    if workers == 1:
+        _init_worker(options)
+        results = map(target, jobs)
+    else:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(options,))
+        results = pool.imap_unordered(target, jobs)
+    try:
+        with tqdm(total=len(jobs), desc="Render", unit='file') as pbar:
+            for count in results:
+                rendered += count
+                pbar.update(1)
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    elapsed = time.time() - start
+
+    print(f"\nSelesai: {rendered} gambar dalam {elapsed:.1f} detik ({rendered / max(elapsed, 1e-9) * 60:.0f} gambar/menit)")
+    print(f"- Output: {out_dir} ({len(jobs)} file)")
+
+if __name__ == "__main__":
+    main()